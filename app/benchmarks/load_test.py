@@ -0,0 +1,325 @@
+"""End-to-end load test of the classification backend.
+
+Starts the app in-process with the mock camera against a local Postgres (or
+a SQLite stand-in), opens sessions and /classify clients over real
+WebSockets, and reports frames/s, results/s, capture-to-client latency
+percentiles, DB rows/s and event-loop lag. Results are saved as JSON so
+runs can be compared across releases.
+
+    cd app && python -m benchmarks.load_test --sessions 4 --clients 16 --duration 30
+    cd app && python -m benchmarks.load_test --database-url sqlite+aiosqlite:///./load-test.db
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import socket
+import threading
+import time
+import urllib.error
+import urllib.request
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+RESULTS_DIR = Path(__file__).parent / "results"
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="End-to-end load test of the classification backend")
+    parser.add_argument("--sessions", type=int, default=1, help="Concurrent sessions, each on its own camera lane")
+    parser.add_argument("--lane-weights", default="", help="Comma separated scheduling weight per lane, e.g. 2,1")
+    parser.add_argument("--clients", type=int, default=1, help="/classify clients, spread over the sessions")
+    parser.add_argument("--duration", type=float, default=20.0, help="Measured seconds")
+    parser.add_argument("--warmup", type=float, default=3.0, help="Seconds discarded before measuring")
+    parser.add_argument("--fps", type=float, default=30.0, help="Mock camera FPS, 0 for unthrottled")
+    parser.add_argument("--seeds", type=int, default=8, help="Seeds per synthetic frame")
+    parser.add_argument("--protocol", choices=("json-batch", "binary"), default="json-batch")
+    parser.add_argument("--preview-fps", type=float, default=None, help="Preview rate per client, 0 disables it")
+    parser.add_argument("--preview-width", type=int, default=None)
+    parser.add_argument("--database-url", default=None, help="Defaults to the configured Postgres")
+    parser.add_argument("--label", default="", help="Free-form label stored with the results")
+    parser.add_argument("--output", type=Path, default=None, help="JSON file to write the results to")
+    return parser.parse_args()
+
+
+def configure_environment(args):
+    """Settings are read at import time, so this must run before importing the app"""
+    os.environ["USE_MOCK_CAMERA"] = "true"
+    os.environ["MOCK_CAMERA_FPS"] = str(args.fps)
+    os.environ["MOCK_CAMERA_SEEDS"] = str(args.seeds)
+    os.environ.setdefault("DATABASE_ECHO", "false")
+    weights = [weight for weight in args.lane_weights.split(",") if weight] or ["1"]
+    os.environ["CAMERA_LANES"] = ",".join(
+        f"lane{i}@{weights[min(i, len(weights) - 1)]}={i}" for i in range(args.sessions)
+    )
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {"count": 0, "p50": None, "p95": None, "p99": None, "max": None}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {
+        "count": len(values),
+        "p50": round(float(p50), 3),
+        "p95": round(float(p95), 3),
+        "p99": round(float(p99), 3),
+        "max": round(float(max(values)), 3),
+    }
+
+
+class ServerProbe:
+    """Runs on the server loop: maps lane frame indexes to capture times and measures loop lag"""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.captured_at: Dict[Tuple[str, int], float] = {}
+        self.loop_lag_ms: List[Tuple[float, float]] = []
+        self._tasks = []
+
+    async def _tap_frames(self, lane):
+        # A subscriber without a preview variant adds no encoding work
+        subscription = lane.producer.subscribe(None)
+        try:
+            async for frame in subscription:
+                self.captured_at[(lane.name, frame.index)] = frame.captured_at
+        finally:
+            subscription.close()
+
+    async def _measure_lag(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self.loop_lag_ms.append((time.time(), max(0.0, loop.time() - expected) * 1000))
+
+    async def start(self):
+        from classification.services.lanes import lanes
+
+        self._tasks = [asyncio.create_task(self._tap_frames(lane)) for lane in lanes.lanes.values()]
+        self._tasks.append(asyncio.create_task(self._measure_lag()))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+
+class ClientStats:
+    def __init__(self, lane: str):
+        self.lane = lane
+        self.received: List[Tuple[int, float]] = []  # (frame index, received at), one per result
+        self.previews: List[float] = []
+        self.errors = 0
+
+
+def decode_frames(message, protocol: str) -> List[int]:
+    """Frame index of every result in a batch message"""
+    from classification.services.result_protocol import HEADER, RECORD
+
+    if protocol == "binary":
+        _, _, count, size = HEADER.unpack_from(message)
+        return [RECORD.unpack_from(message, HEADER.size + i * size)[0] for i in range(count)]
+    return [result["frame"] for result in json.loads(message)["results"]]
+
+
+async def run_client(url: str, protocol: str, stats: ClientStats, stop_at: float):
+    import websockets
+
+    try:
+        async with websockets.connect(url, max_size=None) as ws:
+            while True:
+                remaining = stop_at - time.time()
+                if remaining <= 0:
+                    break
+                try:
+                    message = await asyncio.wait_for(ws.recv(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    break
+                received = time.time()
+                if isinstance(message, bytes) and message[:2] == b"\xff\xd8":
+                    stats.previews.append(received)
+                    continue
+                stats.received.extend((index, received) for index in decode_frames(message, protocol))
+    except Exception as e:
+        print(f"Client error on {url}: {str(e)}")
+        stats.errors += 1
+
+
+def counters_snapshot() -> Dict[str, int]:
+    from classification.services.frame_producer import get_producers
+    from classification.services.result_writer import result_writer
+
+    return {
+        "frames": sum(producer.frame_count for producer in get_producers().values()),
+        "rows": result_writer.rows_written,
+    }
+
+
+async def run_clients(args, base_url: str, server_loop) -> Dict[str, Any]:
+    import httpx
+
+    probe = ServerProbe()
+    async with httpx.AsyncClient(base_url=f"http://{base_url}/seedx", timeout=30) as http:
+        session_ids = []
+        for i in range(args.sessions):
+            response = await http.post("/session/start", json={"seed_lot": f"load-test-{i}", "lane": f"lane{i}"})
+            response.raise_for_status()
+            session_ids.append(response.json()["id"])
+
+        query = {"protocol": args.protocol}
+        if args.preview_fps is not None:
+            query["preview_fps"] = args.preview_fps
+        if args.preview_width is not None:
+            query["preview_width"] = args.preview_width
+        query_string = "&".join(f"{key}={value}" for key, value in query.items())
+
+        asyncio.run_coroutine_threadsafe(probe.start(), server_loop).result()
+        started = time.time()
+        measure_from = started + args.warmup
+        stop_at = measure_from + args.duration
+        clients = [ClientStats(f"lane{i % len(session_ids)}") for i in range(args.clients)]
+        tasks = [
+            asyncio.create_task(run_client(
+                f"ws://{base_url}/seedx/classification/{session_ids[i % len(session_ids)]}/classify?{query_string}",
+                args.protocol,
+                stats,
+                stop_at,
+            ))
+            for i, stats in enumerate(clients)
+        ]
+        await asyncio.sleep(max(0.0, measure_from - time.time()))
+        before = counters_snapshot()
+        await asyncio.sleep(max(0.0, stop_at - time.time()))
+        after = counters_snapshot()
+        await asyncio.gather(*tasks)
+        asyncio.run_coroutine_threadsafe(probe.stop(), server_loop).result()
+        pipeline = (await http.get("/classification/pipeline")).json()
+
+        for session_id in session_ids:
+            await http.post(f"/session/{session_id}/stop")
+
+    latencies = []
+    lanes: Dict[str, Dict[str, Any]] = {}
+    results = 0
+    missing = 0
+    for stats in clients:
+        lane = lanes.setdefault(stats.lane, {"results": 0, "latencies": []})
+        for index, received in stats.received:
+            if received < measure_from:
+                continue
+            results += 1
+            lane["results"] += 1
+            captured_at = probe.captured_at.get((stats.lane, index))
+            if captured_at is None:
+                missing += 1
+            else:
+                latencies.append((received - captured_at) * 1000)
+                lane["latencies"].append(latencies[-1])
+    previews = sum(1 for stats in clients for received in stats.previews if received >= measure_from)
+    loop_lag = [lag for at, lag in probe.loop_lag_ms if at >= measure_from]
+
+    return {
+        "frames_per_s": round((after["frames"] - before["frames"]) / args.duration, 2),
+        "results_per_s": round(results / args.duration, 2),
+        "previews_per_s": round(previews / args.duration, 2),
+        "db_rows_per_s": round((after["rows"] - before["rows"]) / args.duration, 2),
+        "latency_ms": {**percentiles(latencies), "unmatched": missing},
+        "lanes": {
+            name: {"results_per_s": round(lane["results"] / args.duration, 2), "latency_ms": percentiles(lane["latencies"])}
+            for name, lane in sorted(lanes.items())
+        },
+        "loop_lag_ms": percentiles(loop_lag),
+        "client_errors": sum(stats.errors for stats in clients),
+        "pipeline": pipeline,
+    }
+
+
+def start_server(port: int, ready_timeout: float = 120.0):
+    """Run the app with uvicorn on its own thread and event loop, and wait until it reports ready"""
+    import uvicorn
+    from main import app
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_until_complete, args=(server.serve(),), name="load-test-server")
+    thread.start()
+    while not server.started:
+        if not thread.is_alive():
+            raise Exception("Server failed to start")
+        time.sleep(0.05)
+    # Measure the warmed-up server, not the model loading behind the first batches
+    deadline = time.monotonic() + ready_timeout
+    while True:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/health/ready"):
+                break
+        except urllib.error.HTTPError as e:
+            if time.monotonic() > deadline:
+                server.should_exit = True
+                thread.join()
+                raise Exception(f"Server not ready after {ready_timeout:.0f}s: {e.read().decode()}")
+        time.sleep(0.1)
+    return server, loop, thread
+
+
+def main():
+    args = parse_args()
+    configure_environment(args)
+    from config import settings
+
+    port = free_port()
+    server, loop, thread = start_server(port)
+    try:
+        metrics = asyncio.run(run_clients(args, f"127.0.0.1:{port}", loop))
+    finally:
+        server.should_exit = True
+        thread.join()
+
+    report = {
+        "label": args.label,
+        "run_at": datetime.now().isoformat(),
+        "host": {"python": platform.python_version(), "machine": platform.machine(), "cpus": os.cpu_count()},
+        "config": {
+            "sessions": args.sessions,
+            "lane_weights": args.lane_weights or None,
+            "clients": args.clients,
+            "duration_s": args.duration,
+            "warmup_s": args.warmup,
+            "camera_fps": args.fps,
+            "seeds_per_frame": args.seeds,
+            "protocol": args.protocol,
+            "preview_fps": args.preview_fps,
+            "preview_width": args.preview_width,
+            "database": settings.DATABASE_URL.split("://")[0],
+        },
+        **metrics,
+    }
+    output = args.output or RESULTS_DIR / f"load-test-{datetime.now():%Y%m%d-%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+
+    latency = report["latency_ms"]
+    print(f"frames/s {report['frames_per_s']}  results/s {report['results_per_s']}  "
+          f"previews/s {report['previews_per_s']}  db rows/s {report['db_rows_per_s']}")
+    print(f"latency ms p50 {latency['p50']}  p95 {latency['p95']}  p99 {latency['p99']}  "
+          f"loop lag ms p99 {report['loop_lag_ms']['p99']}")
+    for name, lane in report["lanes"].items():
+        print(f"  {name}: results/s {lane['results_per_s']}  latency ms p50 {lane['latency_ms']['p50']}  "
+              f"p95 {lane['latency_ms']['p95']}")
+    print(f"Results saved to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,79 @@
 from datetime import datetime
+from typing import Optional
 from fastapi import APIRouter, Depends, FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.responses import JSONResponse
 
-from classification.services.stream_sorter import sorter_socket
-from classification.services.sorter import ClassificationService
+from classification.services.stream_sorter import manager, sorter_socket, sorters
+from classification.services.frame_producer import get_producers
+from classification.services.lanes import lanes
+from classification.services.pipeline import inference_worker
+from classification.services.preview import PreviewController
+from classification.services.batching import batching_engine
+from classification.services.result_writer import result_writer
+from classification.services.sample_store import sample_writer
+from classification.services.sampling import sampler
+from sessions.archive import session_archiver
 from db.database import get_db
 
 classify = APIRouter(prefix="/classification", tags=["classification"])
 
 
 @classify.websocket("/{session_id}/classify")
-async def websocket_classify(websocket: WebSocket, session_id: str, db=Depends(get_db)):
-    """WebSocket endpoint for real-time classification"""
+async def websocket_classify(
+    websocket: WebSocket,
+    session_id: str,
+    protocol: str = "json",
+    compress: Optional[str] = None,
+    preview_width: Optional[int] = None,
+    preview_fps: Optional[float] = None,
+    preview_quality: Optional[int] = None,
+    preview_adaptive: bool = False,
+    db=Depends(get_db),
+):
+    """WebSocket endpoint for real-time classification.
+
+    protocol selects how results are sent: "json" (one message per result),
+    "json-batch" (one message per batch, optionally compress=zlib) or
+    "binary" (one packed message per batch, see result_protocol).
+
+    preview_width, preview_fps and preview_quality downscale the JPEG preview
+    (preview_fps=0 disables it); preview_adaptive lowers them while the client
+    can't keep up and raises them back once it recovers.
+    """
     
     await sorter_socket(
         websocket=websocket,
         session_id=session_id,
-        classifier=ClassificationService(),
-        db=db
+        engine=batching_engine,
+        db=db,
+        protocol=protocol,
+        compress=compress,
+        preview=PreviewController(
+            width=preview_width,
+            fps=preview_fps,
+            quality=preview_quality,
+            adaptive=preview_adaptive,
+        ),
     )
 
+
+@classify.get("/pipeline")
+async def get_pipeline_stats():
+    """Get queue depths and per-stage timings of the capture pipelines"""
+    return {
+        "producers": {device: producer.snapshot() for device, producer in get_producers().items()},
+        "lanes": lanes.snapshot(),
+        "sorters": sorters.snapshot(),
+        "batching": batching_engine.snapshot(),
+        "inference": batching_engine.pool.snapshot() if batching_engine.pool else inference_worker.snapshot(),
+        "result_writer": result_writer.snapshot(),
+        "sample_writer": sample_writer.snapshot(),
+        "sampling": sampler.snapshot(),
+        "archive": session_archiver.snapshot(),
+        "connections": manager.snapshot(),
+        "previews": [
+            metadata["preview"].snapshot()
+            for metadata in manager.connection_metadata.values()
+            if "preview" in metadata
+        ],
+    }
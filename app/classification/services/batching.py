@@ -0,0 +1,250 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from classification.services.lanes import lanes
+from classification.services.pipeline import InferenceWorker, inference_worker
+from classification.services.process_pool import ProcessInferencePool, inference_pool
+from classification.services.result_batch import ResultBatch
+from classification.services.sorter import ClassificationService
+from config import settings
+from monitoring.metrics import metrics
+
+BATCH_WAIT_SECONDS = metrics.histogram(
+    "seedx_batch_wait_seconds", "Time an image waits for its batch to be dispatched", ("lane",)
+)
+BATCH_SIZE = metrics.histogram("seedx_batch_size", "Images per inference batch", buckets=(1, 2, 4, 8, 16, 32, 64, 128))
+LANE_IMAGES = metrics.counter("seedx_lane_images_total", "Images dispatched to inference, per lane", ("lane",))
+
+Pending = Tuple[Any, asyncio.Future, float]  # image, caller's future, enqueued at
+ResultRow = Tuple[ResultBatch, int]  # A caller's row of its batch's results
+
+
+class LaneQueue:
+    """Images of one lane waiting for a batch, with its share of every batch"""
+
+    def __init__(self, name: str, weight: float = 1.0):
+        self.name = name
+        self.weight = weight
+        self.pending: Deque[Pending] = deque()
+        # Deficit round-robin credit: images the lane may still put in batches
+        self.credit = 0.0
+        self.images = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "weight": self.weight,
+            "pending": len(self.pending),
+            "images": self.images,
+            "avg_wait_ms": round(self.total_wait / self.images * 1000, 3) if self.images else 0.0,
+            "max_wait_ms": round(self.max_wait * 1000, 3),
+        }
+
+
+class BatchingEngine:
+    """Micro-batching front end shared by every classification session.
+
+    Callers await a future for the row of their own image in the batch's
+    ResultBatch. Images wait in one queue per
+    lane; a batch is assembled as soon as max_batch_size images are pending,
+    or by a timer max_latency_ms after the oldest one arrived, and is then
+    run on the inference thread, or on the inference process pool when one
+    is configured.
+
+    At most max_in_flight batches run at once. While inference is saturated
+    images keep queueing, and every batch is filled from the lanes by
+    weighted round-robin, so a fast lane gets its weighted share and never
+    starves the others.
+    """
+
+    def __init__(
+        self,
+        classifier: ClassificationService = None,
+        worker: InferenceWorker = None,
+        max_batch_size: int = None,
+        max_latency_ms: int = None,
+        pool: ProcessInferencePool = None,
+        max_in_flight: int = None,
+    ):
+        self.pool = pool
+        # Built on first use, on the inference thread: loading the model (and
+        # torch) stays out of import and startup. With a process pool the
+        # model lives in the worker processes only.
+        self._classifier = classifier
+        self._classifier_lock = threading.Lock()
+        self.worker = worker or inference_worker
+        self.max_batch_size = max_batch_size or settings.MAX_BATCH_SIZE
+        self.max_latency_ms = max_latency_ms or settings.MAX_LATENCY_MS
+        self.max_in_flight = (
+            max_in_flight or settings.INFERENCE_MAX_IN_FLIGHT or 2 * (pool.processes if pool is not None else 1)
+        )
+        self.lanes: Dict[str, LaneQueue] = {}
+        self._order: List[LaneQueue] = []  # Round-robin order; rotates after every batch
+        self._pending = 0
+        self._deadline: Optional[asyncio.TimerHandle] = None
+        self._overdue = False  # The deadline passed while every batch slot was busy
+        self._in_flight = set()
+        self.batches = 0
+        self.images = 0
+        self.size_flushes = 0
+        self.deadline_flushes = 0
+        self.saturated_flushes = 0
+
+    @property
+    def classifier(self) -> ClassificationService:
+        if self._classifier is None:
+            with self._classifier_lock:
+                if self._classifier is None:
+                    self._classifier = ClassificationService()
+        return self._classifier
+
+    def _classify_batch(self, images: List[Any]) -> ResultBatch:
+        return self.classifier.classify_batch(images)
+
+    def _warmup_classifier(self):
+        self.classifier.warmup()
+
+    async def warmup(self, timeout: float = 120.0):
+        """Load the model and run a dummy batch through it, wherever batches will run"""
+        if self.pool is not None:
+            # Each worker process loads and warms up its own model
+            await self.pool.wait_ready(timeout)
+        else:
+            await asyncio.wait_for(self.worker.submit(self._warmup_classifier), timeout)
+
+    def set_lane_weight(self, lane: str, weight: float):
+        """Share of every batch the lane gets while inference is saturated"""
+        self._lane(lane).weight = weight
+
+    def _lane(self, name: str) -> LaneQueue:
+        lane = self.lanes.get(name)
+        if lane is None:
+            lane = self.lanes[name] = LaneQueue(name)
+            self._order.append(lane)
+        return lane
+
+    async def classify(self, image: Any, lane: str = "default") -> Optional[ResultRow]:
+        """Queue an image of a lane for the next batch and wait for its own result"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._lane(lane).pending.append((image, future, time.perf_counter()))
+        self._pending += 1
+        if self._pending >= self.max_batch_size:
+            if len(self._in_flight) < self.max_in_flight:
+                self.size_flushes += 1
+            self._flush()
+        elif self._deadline is None and not self._overdue:
+            self._deadline = loop.call_later(self.max_latency_ms / 1000, self._flush_on_deadline)
+        return await future
+
+    def _flush_on_deadline(self):
+        self._deadline = None
+        if self._pending:
+            self.deadline_flushes += 1
+            self._flush()
+
+    def _flush(self):
+        """Dispatch batches while images are pending and batch slots are free"""
+        if self._deadline is not None:
+            self._deadline.cancel()
+            self._deadline = None
+        self._overdue = False
+        while self._pending:
+            if len(self._in_flight) >= self.max_in_flight:
+                # Dispatched as soon as a running batch completes
+                self._overdue = True
+                return
+            task = asyncio.create_task(self._run_batch(self._take_batch()))
+            self._in_flight.add(task)
+            task.add_done_callback(self._batch_done)
+            if self._pending < self.max_batch_size:
+                break
+        if self._pending:
+            # Leftovers of a saturated round keep the deadline of their oldest image
+            oldest = min(lane.pending[0][2] for lane in self._order if lane.pending)
+            delay = max(0.0, oldest + self.max_latency_ms / 1000 - time.perf_counter())
+            self._deadline = asyncio.get_running_loop().call_later(delay, self._flush_on_deadline)
+
+    def _batch_done(self, task: asyncio.Task):
+        self._in_flight.discard(task)
+        if self._overdue or self._pending >= self.max_batch_size:
+            self.saturated_flushes += 1
+            self._flush()
+
+    def _take_batch(self) -> List[Tuple[str, Pending]]:
+        """Fill one batch from the lane queues by weighted (deficit) round-robin"""
+        batch: List[Tuple[str, Pending]] = []
+        active = [lane for lane in self._order if lane.pending]
+        while active and len(batch) < self.max_batch_size:
+            for lane in active:
+                lane.credit += lane.weight
+                while lane.credit >= 1 and lane.pending and len(batch) < self.max_batch_size:
+                    batch.append((lane.name, lane.pending.popleft()))
+                    lane.credit -= 1
+                if len(batch) >= self.max_batch_size:
+                    break
+            active = [lane for lane in active if lane.pending]
+        for lane in self._order:
+            if not lane.pending:
+                # An idle lane can't bank credit for later bursts
+                lane.credit = 0.0
+        if self._order:
+            self._order.append(self._order.pop(0))
+        self._pending -= len(batch)
+        return batch
+
+    async def _run_batch(self, batch: List[Tuple[str, Pending]]):
+        self.batches += 1
+        self.images += len(batch)
+        dispatched = time.perf_counter()
+        for lane_name, (_, _, enqueued) in batch:
+            lane = self.lanes[lane_name]
+            wait = dispatched - enqueued
+            lane.images += 1
+            lane.total_wait += wait
+            lane.max_wait = max(lane.max_wait, wait)
+            BATCH_WAIT_SECONDS.observe(wait, lane_name)
+            LANE_IMAGES.inc(1, lane_name)
+        BATCH_SIZE.observe(len(batch))
+        try:
+            images = [image for _, (image, _, _) in batch]
+            if self.pool is not None:
+                results = await self.pool.classify_batch(images)
+            else:
+                results = await self.worker.submit(self._classify_batch, images)
+        except Exception as e:
+            print(f"Error processing batch: {str(e)}")
+            for _, (_, future, _) in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        # A batch dropped by the inference queue resolves every caller to None
+        for row, (_, (_, future, _)) in enumerate(batch):
+            if not future.done():
+                future.set_result((results, row) if results is not None else None)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Batching counters for the pipeline stats endpoint"""
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_latency_ms": self.max_latency_ms,
+            "max_in_flight": self.max_in_flight,
+            "pending": self._pending,
+            "in_flight": len(self._in_flight),
+            "batches": self.batches,
+            "avg_batch_size": round(self.images / self.batches, 2) if self.batches else 0.0,
+            "size_flushes": self.size_flushes,
+            "deadline_flushes": self.deadline_flushes,
+            "saturated_flushes": self.saturated_flushes,
+            "lanes": {name: lane.snapshot() for name, lane in self.lanes.items()},
+        }
+
+
+batching_engine = BatchingEngine(pool=inference_pool if settings.INFERENCE_PROCESSES > 0 else None)
+for lane in lanes.lanes.values():
+    batching_engine.set_lane_weight(lane.name, lane.weight)
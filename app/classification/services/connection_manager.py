@@ -1,92 +1,229 @@
 from fastapi import WebSocket, WebSocketDisconnect
-from typing import List, Dict, Any, Optional
-import json
+from typing import Dict, Any, Optional, Set, Union
 import asyncio
+import time
+from collections import deque
 from datetime import datetime
 
+from config import settings
+from monitoring.metrics import metrics
+
+OUTBOX_DROPPED = metrics.counter(
+    "seedx_websocket_outbox_dropped_total", "Messages dropped from full client outboxes", ("kind",)
+)
+WS_SEND_SECONDS = metrics.histogram("seedx_websocket_send_seconds", "Time to send one queued message to a client")
+
+# A list is sent as consecutive messages, and queued and dropped as one
+Message = Union[bytes, str, dict, list]
+
+
+class Outbox:
+    """Bounded outbound queues of one connection, drained by its own task.
+
+    Offering never waits: when the client falls behind, the oldest queued
+    message is dropped, so a slow client only loses its own messages.
+    Results have their own, larger queue and are sent ahead of previews, so
+    a burst of previews never pushes out results.
+    """
+
+    def __init__(self, maxsize: int, results_maxsize: int = None):
+        self.maxsize = maxsize
+        self.results_maxsize = results_maxsize or settings.WEBSOCKET_RESULT_QUEUE_SIZE
+        self.messages = deque()
+        self.results = deque()
+        self.ready = asyncio.Event()
+        # Serializes the drain task with direct sends on the same socket
+        self.lock = asyncio.Lock()
+        self.task: Optional[asyncio.Task] = None
+        self.sent = 0
+        self.dropped = 0
+        self.dropped_results = 0
+        self.last_send_seconds = 0.0
+
+    def offer(self, message: Message):
+        if len(self.messages) >= self.maxsize:
+            self.messages.popleft()
+            self.dropped += 1
+            OUTBOX_DROPPED.inc(1, "preview")
+        self.messages.append((time.monotonic(), message))
+        self.ready.set()
+
+    def offer_result(self, message: Message):
+        if len(self.results) >= self.results_maxsize:
+            self.results.popleft()
+            self.dropped_results += 1
+            OUTBOX_DROPPED.inc(1, "result")
+        self.results.append((time.monotonic(), message))
+        self.ready.set()
+
+    def take(self) -> Optional[Message]:
+        """The next message to send, results first"""
+        queue = self.results or self.messages
+        return queue.popleft()[1] if queue else None
+
+    def lag(self) -> float:
+        """Age of the oldest queued message, or the duration of the last send when idle"""
+        oldest = [queue[0][0] for queue in (self.messages, self.results) if queue]
+        if oldest:
+            return time.monotonic() - min(oldest)
+        return self.last_send_seconds
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "queue_depth": len(self.messages),
+            "queue_capacity": self.maxsize,
+            "result_queue_depth": len(self.results),
+            "result_queue_capacity": self.results_maxsize,
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "dropped_results": self.dropped_results,
+            "lag_ms": round(self.lag() * 1000, 3),
+        }
+
 
 class ConnectionManager:
-    def __init__(self):
-        self.active_connections: List[WebSocket] = []
+    """WebSocket connections indexed by session.
+
+    Broadcasts only enqueue on the outbox of each subscriber of a session,
+    so a stalled client never delays other clients or the caller.
+    """
+
+    def __init__(self, queue_size: int = None):
+        self.queue_size = queue_size or settings.WEBSOCKET_SEND_QUEUE_SIZE
+        self.active_connections: Set[WebSocket] = set()
         self.connection_metadata: Dict[WebSocket, Dict[str, Any]] = {}
-        
+        self.sessions: Dict[str, Set[WebSocket]] = {}
+        self.outboxes: Dict[WebSocket, Outbox] = {}
+
     async def connect(self, websocket: WebSocket, metadata: Optional[Dict[str, Any]] = None):
         """Connect a new WebSocket client with optional metadata"""
         await websocket.accept()
-        self.active_connections.append(websocket)
+        self.active_connections.add(websocket)
         self.connection_metadata[websocket] = {
             "connected_at": datetime.now(),
             "last_activity": datetime.now(),
             **(metadata or {})
         }
-        
+        session_id = (metadata or {}).get("session_id")
+        if session_id is not None:
+            self.sessions.setdefault(str(session_id), set()).add(websocket)
+        outbox = self.outboxes[websocket] = Outbox(self.queue_size)
+        outbox.task = asyncio.create_task(self._drain(websocket, outbox))
+
     def disconnect(self, websocket: WebSocket):
         """Disconnect a WebSocket client and clean up metadata"""
-        try:
-            if websocket in self.active_connections:
-                self.active_connections.remove(websocket)
-            if websocket in self.connection_metadata:
-                del self.connection_metadata[websocket]
-        except Exception:
-            # If the websocket is not in the list or has already been removed
-            pass
-            
-    async def send_json(self, websocket: WebSocket, data: Any):
-        """Send JSON data to a specific WebSocket client"""
-        try:
-            if websocket.client_state.value != 3:  # Check if connection is not closed
-                await websocket.send_json(data)
-                self.connection_metadata[websocket]["last_activity"] = datetime.now()
-        except WebSocketDisconnect:
-            self.disconnect(websocket)
-            raise
-        except Exception as e:
-            self.disconnect(websocket)
-            raise WebSocketDisconnect(code=1011, reason=str(e))
-            
-    async def broadcast_json(self, data: Any):
-        """Broadcast JSON data to all connected clients"""
-        disconnected = []
-        for connection in self.active_connections:
+        self.active_connections.discard(websocket)
+        metadata = self.connection_metadata.pop(websocket, None)
+        session_id = (metadata or {}).get("session_id")
+        if session_id is not None:
+            connections = self.sessions.get(str(session_id))
+            if connections is not None:
+                connections.discard(websocket)
+                if not connections:
+                    del self.sessions[str(session_id)]
+        outbox = self.outboxes.pop(websocket, None)
+        if outbox is not None and outbox.task is not None and outbox.task is not asyncio.current_task():
+            outbox.task.cancel()
+
+    async def _drain(self, websocket: WebSocket, outbox: Outbox):
+        """Send queued messages of one connection until it goes away"""
+        while True:
+            message = outbox.take()
+            while message is None:
+                outbox.ready.clear()
+                await outbox.ready.wait()
+                message = outbox.take()
+            started = time.monotonic()
             try:
-                await self.send_json(connection, data)
-            except WebSocketDisconnect:
-                disconnected.append(connection)
+                for part in message if isinstance(message, list) else (message,):
+                    if isinstance(part, bytes):
+                        await self.send_bytes(websocket, part)
+                    elif isinstance(part, str):
+                        await self.send_text(websocket, part)
+                    else:
+                        await self.send_json(websocket, part)
             except Exception:
-                disconnected.append(connection)
-                
-        # Remove disconnected connections
-        for connection in disconnected:
-            self.disconnect(connection)
-            
-    async def send_bytes(self, websocket: WebSocket, data: bytes):
-        """Send binary data to a specific WebSocket client"""
+                # send_* already disconnected the client
+                return
+            outbox.sent += 1
+            outbox.last_send_seconds = time.monotonic() - started
+            WS_SEND_SECONDS.observe(outbox.last_send_seconds)
+
+    async def wait_closed(self, websocket: WebSocket):
+        """Wait until a client is gone: its outbox failed to send, or it was disconnected"""
+        outbox = self.outboxes.get(websocket)
+        if outbox is not None and outbox.task is not None:
+            await asyncio.wait([outbox.task])
+
+    async def _send(self, websocket: WebSocket, send, data: Any):
         try:
             if websocket.client_state.value != 3:  # Check if connection is not closed
-                await websocket.send_bytes(data)
-                self.connection_metadata[websocket]["last_activity"] = datetime.now()
+                outbox = self.outboxes.get(websocket)
+                if outbox is None:
+                    await send(data)
+                else:
+                    async with outbox.lock:
+                        await send(data)
+                metadata = self.connection_metadata.get(websocket)
+                if metadata is not None:
+                    metadata["last_activity"] = datetime.now()
         except WebSocketDisconnect:
             self.disconnect(websocket)
             raise
         except Exception as e:
             self.disconnect(websocket)
             raise WebSocketDisconnect(code=1011, reason=str(e))
-            
-    async def broadcast_bytes(self, data: bytes):
-        """Broadcast binary data to all connected clients"""
-        disconnected = []
-        for connection in self.active_connections:
-            try:
-                await self.send_bytes(connection, data)
-            except WebSocketDisconnect:
-                disconnected.append(connection)
-            except Exception:
-                disconnected.append(connection)
-                
-        # Remove disconnected connections
-        for connection in disconnected:
-            self.disconnect(connection)
-            
+
+    async def send_json(self, websocket: WebSocket, data: Any):
+        """Send JSON data to a specific WebSocket client"""
+        await self._send(websocket, websocket.send_json, data)
+
+    async def send_text(self, websocket: WebSocket, data: str):
+        """Send an already serialized text message to a specific WebSocket client"""
+        await self._send(websocket, websocket.send_text, data)
+
+    async def send_bytes(self, websocket: WebSocket, data: bytes):
+        """Send binary data to a specific WebSocket client"""
+        await self._send(websocket, websocket.send_bytes, data)
+
+    def offer(self, websocket: WebSocket, data: Message) -> bool:
+        """Queue a droppable message for a client without waiting; False if it is gone"""
+        outbox = self.outboxes.get(websocket)
+        if outbox is None:
+            return False
+        outbox.offer(data)
+        return True
+
+    def offer_result(self, websocket: WebSocket, data: Message) -> bool:
+        """Queue results for a client without waiting; False if it is gone"""
+        outbox = self.outboxes.get(websocket)
+        if outbox is None:
+            return False
+        outbox.offer_result(data)
+        return True
+
+    def send_lag(self, websocket: WebSocket) -> float:
+        """How far behind the client's outbound queue is, in seconds"""
+        outbox = self.outboxes.get(websocket)
+        return outbox.lag() if outbox is not None else 0.0
+
+    def broadcast(self, data: Message, session_id: str = None):
+        """Queue a message for every client of a session (or all clients) without waiting"""
+        if session_id is None:
+            connections = self.active_connections
+        else:
+            connections = self.sessions.get(str(session_id), ())
+        for connection in connections:
+            self.offer(connection, data)
+
+    def broadcast_json(self, data: Any, session_id: str = None):
+        """Broadcast JSON data to all connected clients of a session, or to everyone"""
+        self.broadcast(data, session_id)
+
+    def broadcast_bytes(self, data: bytes, session_id: str = None):
+        """Broadcast binary data to all connected clients of a session, or to everyone"""
+        self.broadcast(data, session_id)
+
     async def receive_json(self, websocket: WebSocket) -> Any:
         """Receive JSON data from a WebSocket client"""
         try:
@@ -99,7 +236,7 @@ class ConnectionManager:
         except Exception as e:
             self.disconnect(websocket)
             raise WebSocketDisconnect(code=1011, reason=str(e))
-            
+
     async def receive_bytes(self, websocket: WebSocket) -> bytes:
         """Receive binary data from a WebSocket client"""
         try:
@@ -112,15 +249,15 @@ class ConnectionManager:
         except Exception as e:
             self.disconnect(websocket)
             raise WebSocketDisconnect(code=1011, reason=str(e))
-            
+
     def get_active_connections_count(self) -> int:
         """Get the number of active connections"""
         return len(self.active_connections)
-        
+
     def get_connection_metadata(self, websocket: WebSocket) -> Optional[Dict[str, Any]]:
         """Get metadata for a specific connection"""
         return self.connection_metadata.get(websocket)
-        
+
     async def close_connection(self, websocket: WebSocket, code: int = 1000, reason: str = "Normal closure"):
         """Close a WebSocket connection gracefully"""
         try:
@@ -130,18 +267,17 @@ class ConnectionManager:
             pass  # Ignore errors during close
         finally:
             self.disconnect(websocket)
-            
-    async def ping_connections(self):
+
+    def ping_connections(self):
         """Ping all active connections to check their health"""
-        disconnected = []
-        for connection in self.active_connections:
-            try:
-                await connection.send_json({"type": "ping"})
-            except WebSocketDisconnect:
-                disconnected.append(connection)
-            except Exception:
-                disconnected.append(connection)
-                
-        # Remove disconnected connections
-        for connection in disconnected:
-            self.disconnect(connection)
\ No newline at end of file
+        self.broadcast_json({"type": "ping"})
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Connections per session and outbound queue health"""
+        return {
+            "connections": len(self.active_connections),
+            "sessions": {session_id: len(connections) for session_id, connections in self.sessions.items()},
+            "outbox_drops": sum(outbox.dropped for outbox in self.outboxes.values()),
+            "outbox_result_drops": sum(outbox.dropped_results for outbox in self.outboxes.values()),
+            "max_lag_ms": round(max((outbox.lag() for outbox in self.outboxes.values()), default=0.0) * 1000, 3),
+        }
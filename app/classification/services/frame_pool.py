@@ -0,0 +1,124 @@
+import threading
+import weakref
+from collections import deque
+from multiprocessing import shared_memory
+from typing import Any, Deque, Dict, Optional, Tuple
+
+import numpy as np
+
+
+class SharedFrameRing:
+    """Fixed number of frame slots in one shared memory segment.
+
+    Other processes attach by name and address frames by slot index, so
+    frames cross process boundaries without being pickled or copied.
+    """
+
+    def __init__(self, shape: Tuple[int, ...], slots: int = None, dtype=np.uint8, name: str = None):
+        """Create a ring of `slots` frames, or attach to the existing segment `name`"""
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.frame_bytes = int(np.prod(self.shape)) * self.dtype.itemsize
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=self.frame_bytes * slots)
+            self.owner = True
+        else:
+            # Workers share the creator's resource tracker, which already
+            # knows the segment, so attaching never hands off its ownership
+            self.shm = shared_memory.SharedMemory(name=name)
+            self.owner = False
+        self.slots = slots or self.shm.size // self.frame_bytes
+        self.frames = np.ndarray((self.slots,) + self.shape, dtype=self.dtype, buffer=self.shm.buf)
+        self._base = self.frames.__array_interface__["data"][0]
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def locate(self, image: np.ndarray) -> Optional[int]:
+        """Slot index of an image that is a whole frame of this ring, else None"""
+        if image.shape != self.shape or image.dtype != self.dtype:
+            return None
+        offset = image.__array_interface__["data"][0] - self._base
+        if 0 <= offset < self.frame_bytes * self.slots and offset % self.frame_bytes == 0:
+            return offset // self.frame_bytes
+        return None
+
+    def close(self):
+        """Detach; the owner also removes the segment once every mapping is gone"""
+        self.frames = None
+        try:
+            self.shm.close()
+        except BufferError:
+            pass  # Frames still referenced; the mapping goes away with them
+        if self.owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+
+
+class FramePool:
+    """Pool of preallocated frame buffers reused across captures.
+
+    acquire() hands out a view on a free buffer. The buffer goes back to the
+    pool as soon as the last reference to that view (ring buffer, subscriber
+    queue, pending batch...) is dropped, so frames can be passed around by
+    reference without any explicit release call. With shared=True the
+    buffers live in a SharedFrameRing so inference processes can read them in place.
+    """
+
+    def __init__(self, shape: Tuple[int, ...], size: int, dtype=np.uint8, shared: bool = False):
+        self.shape = shape
+        self.size = size
+        self.dtype = dtype
+        self.ring: Optional[SharedFrameRing] = SharedFrameRing(shape, size, dtype) if shared else None
+        if self.ring is not None:
+            blocks = (self.ring.frames[i] for i in range(size))
+        else:
+            blocks = (np.empty(shape, dtype=dtype) for _ in range(size))
+        self._free: Deque[np.ndarray] = deque(blocks)
+        self._lock = threading.Lock()
+        self.acquired = 0
+        self.misses = 0
+
+    def acquire(self) -> np.ndarray:
+        """Get a writable frame buffer, allocating a new one if the pool is exhausted"""
+        with self._lock:
+            self.acquired += 1
+            block = self._free.popleft() if self._free else None
+            if block is None:
+                self.misses += 1
+        if block is None:
+            # Not recycled, so the pool keeps cycling its own (possibly shared) buffers
+            return np.empty(self.shape, dtype=self.dtype)
+        view = block.view()
+        weakref.finalize(view, self._release, block)
+        return view
+
+    def _release(self, block: np.ndarray):
+        with self._lock:
+            if len(self._free) < self.size:
+                self._free.append(block)
+
+    def locate(self, image: np.ndarray) -> Optional[Tuple[str, int]]:
+        """Shared memory segment and slot of a pooled frame, None if it is not shared"""
+        if self.ring is None:
+            return None
+        slot = self.ring.locate(image)
+        return (self.ring.name, slot) if slot is not None else None
+
+    def close(self):
+        if self.ring is not None:
+            self._free.clear()
+            self.ring.close()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "size": self.size,
+                "free": len(self._free),
+                "acquired": self.acquired,
+                "misses": self.misses,
+                "shared": self.ring.name if self.ring is not None else None,
+            }
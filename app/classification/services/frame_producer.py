@@ -0,0 +1,315 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, Optional, Set
+
+import numpy as np
+
+from classification.services.frame_pool import FramePool
+from classification.services.mock_camera import MockCamera
+from classification.services.pipeline import StageStats, StageThread
+from classification.services.preview import PreviewVariant
+from config import settings
+from utils.lazy_import import lazy_import
+
+cv2 = lazy_import("cv2")
+
+
+@dataclass
+class Frame:
+    """A captured camera frame shared by every subscriber.
+
+    image is a pooled raw BGR buffer passed around by reference. previews
+    holds one JPEG per preview variant requested by the attached subscribers,
+    each encoded once and shared by every subscriber that asked for it.
+    """
+    index: int
+    captured_at: float
+    image: np.ndarray
+    previews: Dict[PreviewVariant, bytes] = field(default_factory=dict)
+
+
+class FrameSubscription:
+    """Per-subscriber view on a FrameProducer.
+
+    Frames are delivered through a small bounded queue; when the subscriber
+    falls behind the oldest queued frame is dropped so the producer never waits.
+    """
+
+    def __init__(
+        self,
+        producer: "FrameProducer",
+        maxsize: int,
+        variant: Optional[PreviewVariant] = None,
+        fps: float = None,
+    ):
+        self.producer = producer
+        self.variant = variant
+        self.fps = fps or settings.CAMERA_FPS
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.dropped = 0
+        self.closed = False
+
+    def push(self, frame: Optional[Frame]):
+        """Enqueue a frame, dropping the oldest one if the queue is full"""
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(frame)
+
+    async def get(self) -> Frame:
+        """Wait for the next frame"""
+        return await self.queue.get()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> Frame:
+        if self.closed:
+            raise StopAsyncIteration
+        frame = await self.get()
+        if frame is None:
+            # The producer stopped; end the iteration
+            self.close()
+            raise StopAsyncIteration
+        return frame
+
+    def set_preview(self, variant: Optional[PreviewVariant], fps: float = None):
+        """Change the preview variant and rate this subscriber needs"""
+        self.variant = variant
+        self.fps = fps or settings.CAMERA_FPS
+        self.producer.update_preview_plan()
+
+    def close(self):
+        """Detach from the producer without touching the device"""
+        if not self.closed:
+            self.closed = True
+            self.producer.unsubscribe(self)
+
+
+class FrameProducer:
+    """Single long-lived capture pipeline for one camera device.
+
+    Capture and JPEG encoding run in dedicated worker threads connected by a
+    bounded queue; the event loop only fans finished frames out to subscribers.
+    Frames are captured into a reusable buffer pool and the latest ones are
+    kept in a ring buffer.
+    """
+
+    def __init__(self, device: str, ring_size: int = None, subscriber_queue_size: int = None):
+        self.device = device
+        self.ring: Deque[Frame] = deque(maxlen=ring_size or settings.FRAME_RING_SIZE)
+        self.subscriber_queue_size = subscriber_queue_size or settings.SUBSCRIBER_QUEUE_SIZE
+        self.subscribers: Set[FrameSubscription] = set()
+        self.pool = FramePool(
+            (settings.CAMERA_HEIGHT, settings.CAMERA_WIDTH, 3),
+            size=settings.FRAME_POOL_SIZE,
+            # Inference processes read pooled frames in place from shared memory
+            shared=settings.INFERENCE_PROCESSES > 0,
+        )
+        self.frame_count = 0
+        self.encoded_count = 0
+        # Preview variant -> highest rate any subscriber wants it at. Rebuilt on
+        # the loop and swapped atomically; the encode thread only reads it.
+        self._preview_plan: Dict[PreviewVariant, float] = {}
+        self._last_encoded: Dict[PreviewVariant, float] = {}
+        self.capture_stats = StageStats(f"capture-{device}")
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._capture_thread: Optional[threading.Thread] = None
+        self._encoder: Optional[StageThread] = None
+        self._stop_event = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        return self._capture_thread is not None and self._capture_thread.is_alive()
+
+    def start(self):
+        """Start the capture and encode threads if they are not already running"""
+        if self.running:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._stop_event.clear()
+        self._encoder = StageThread(f"encode-{self.device}", self._encode)
+        self._capture_thread = threading.Thread(
+            target=self._run, name=f"capture-{self.device}", daemon=True
+        )
+        self._encoder.start()
+        self._capture_thread.start()
+
+    async def stop(self):
+        """Stop the worker threads and release the device"""
+        self._stop_event.set()
+        if self._encoder is not None:
+            self._encoder.stop()
+        for thread in (self._capture_thread, self._encoder):
+            if thread is not None:
+                await asyncio.to_thread(thread.join, 2.0)
+        self._capture_thread = None
+        self._encoder = None
+
+    def subscribe(self, variant: Optional[PreviewVariant] = None, fps: float = None) -> FrameSubscription:
+        """Attach a new subscriber, starting the capture on first use.
+
+        Frames are only JPEG-encoded in the variants, and at the rates, that
+        attached subscribers asked for; without a variant no preview is encoded.
+        """
+        subscription = FrameSubscription(self, maxsize=self.subscriber_queue_size, variant=variant, fps=fps)
+        self.subscribers.add(subscription)
+        self.update_preview_plan()
+        if self.ring:
+            subscription.push(self.ring[-1])
+        self.start()
+        return subscription
+
+    def unsubscribe(self, subscription: FrameSubscription):
+        """Detach a subscriber"""
+        if subscription in self.subscribers:
+            self.subscribers.discard(subscription)
+            self.update_preview_plan()
+
+    def update_preview_plan(self):
+        """Recompute which preview variants to encode, and at which rate"""
+        plan: Dict[PreviewVariant, float] = {}
+        for subscription in self.subscribers:
+            if subscription.variant is not None:
+                plan[subscription.variant] = max(plan.get(subscription.variant, 0.0), subscription.fps)
+        self._preview_plan = plan
+
+    def latest(self) -> Optional[Frame]:
+        """Get the most recently captured frame"""
+        return self.ring[-1] if self.ring else None
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Queue depths and per-stage timings of this producer"""
+        return {
+            "device": self.device,
+            "running": self.running,
+            "frames": self.frame_count,
+            "encoded": self.encoded_count,
+            "preview_variants": {variant.label: fps for variant, fps in self._preview_plan.items()},
+            "frame_pool": self.pool.snapshot(),
+            "subscribers": len(self.subscribers),
+            "subscriber_drops": sum(s.dropped for s in self.subscribers),
+            "stages": {
+                "capture": self.capture_stats.snapshot(),
+                "encode": self._encoder.snapshot() if self._encoder else StageStats("encode").snapshot(),
+            },
+        }
+
+    def _encode(self, item):
+        """Encode a captured frame once for preview subscribers (encode thread)"""
+        captured_at, image = item
+        frame = Frame(index=self.frame_count, captured_at=captured_at, image=image)
+        for variant, fps in self._preview_plan.items():
+            # Skip frames nobody wants at this variant's rate (10% jitter tolerance)
+            if captured_at - self._last_encoded.get(variant, 0.0) < 0.9 / fps:
+                continue
+            frame.previews[variant] = encode_preview(image, variant)
+            self._last_encoded[variant] = captured_at
+            self.encoded_count += 1
+        self.frame_count += 1
+        self._loop.call_soon_threadsafe(self._publish, frame)
+
+    def _publish(self, frame: Optional[Frame]):
+        """Fan a frame out to every subscriber (event loop)"""
+        if frame is not None:
+            self.ring.append(frame)
+        for subscription in list(self.subscribers):
+            subscription.push(frame)
+
+    def _run(self):
+        """Run the capture loop and notify subscribers when it stops (capture thread)"""
+        try:
+            self._capture()
+        except Exception as e:
+            print(f"Frame producer for {self.device} failed: {str(e)}")
+        finally:
+            if not self._loop.is_closed():
+                self._loop.call_soon_threadsafe(self._publish, None)
+
+    def _capture(self):
+        """Capture frames from the configured source until stopped"""
+        if settings.USE_MOCK_CAMERA:
+            print(f"Using mock camera for device {self.device}")
+            cap = MockCamera()
+            fps = settings.MOCK_CAMERA_FPS
+        else:
+            cap = open_capture(self.device)
+            fps = settings.CAMERA_FPS
+        # A mock camera at 0 FPS runs unthrottled, as fast as the pipeline takes frames
+        interval = 1.0 / fps if fps > 0 else 0.0
+        try:
+            next_frame_at = time.perf_counter()
+            while not self._stop_event.is_set():
+                started = time.perf_counter()
+                image = self.pool.acquire()
+                # Reads in place when the device delivers the configured size
+                ret, image = cap.read(image)
+                if not ret:
+                    cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                    self._stop_event.wait(interval)
+                    continue
+                self.capture_stats.record((time.perf_counter() - started) * 1000)
+                self._encoder.offer((time.time(), image))
+
+                # Control FPS
+                next_frame_at = max(next_frame_at + interval, time.perf_counter())
+                self._stop_event.wait(next_frame_at - time.perf_counter())
+        finally:
+            cap.release()  # Ensure camera is released even if an error occurs
+
+
+def encode_preview(image: np.ndarray, variant: PreviewVariant) -> bytes:
+    """Resize a frame to a preview variant if needed and JPEG-encode it"""
+    if (image.shape[1], image.shape[0]) != (variant.width, variant.height):
+        image = cv2.resize(image, (variant.width, variant.height), interpolation=cv2.INTER_AREA)
+    _, buffer = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, variant.quality])
+    return buffer.tobytes()
+
+
+def open_capture(camera_device: str) -> "cv2.VideoCapture":
+    """Open a camera by index or device path and apply the configured properties"""
+    try:
+        # Try to convert to integer if it's a number
+        camera_index = int(camera_device)
+        # On macOS, we use the default backend which will use AVFoundation
+        cap = cv2.VideoCapture(camera_index)
+    except ValueError:
+        # If it's not a number, use it as a device path
+        cap = cv2.VideoCapture(camera_device)
+
+    if not cap.isOpened():
+        cap.release()
+        raise Exception(f"Failed to open camera at {camera_device}")
+
+    # Set camera properties
+    cap.set(cv2.CAP_PROP_FRAME_WIDTH, settings.CAMERA_WIDTH)
+    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, settings.CAMERA_HEIGHT)
+    cap.set(cv2.CAP_PROP_FPS, settings.CAMERA_FPS)
+    return cap
+
+
+_producers: Dict[str, FrameProducer] = {}
+
+
+def get_producer(device: str = None) -> FrameProducer:
+    """Get the shared producer for a camera device, creating it on first use"""
+    device = device or settings.CAMERA_DEVICE
+    if device not in _producers:
+        _producers[device] = FrameProducer(device)
+    return _producers[device]
+
+
+def get_producers() -> Dict[str, FrameProducer]:
+    """Get every producer created so far, keyed by device"""
+    return dict(_producers)
+
+
+async def shutdown_producers():
+    """Stop every capture task and release the devices"""
+    for producer in list(_producers.values()):
+        await producer.stop()
+        producer.pool.close()
+    _producers.clear()
@@ -0,0 +1,195 @@
+import re
+import time
+from typing import Any, Dict, List, Optional
+
+from classification.services.frame_producer import get_producer
+from config import settings
+from utils.seed_id_provider import MAX_LANES, SeedIdGenerator
+
+
+LANE_NAME = re.compile(r"[A-Za-z0-9_-]+")
+# A lane's share of every batch while inference is saturated, relative to the others
+MIN_LANE_WEIGHT = 0.01
+MAX_LANE_WEIGHT = 100.0
+
+
+class LaneBusyError(Exception):
+    """The requested lane is already bound to another session"""
+
+
+class CameraLane:
+    """One sorting lane: a camera device, its scheduling weight and the session sorting on it"""
+
+    def __init__(self, name: str, device: str, weight: float = 1.0, index: int = 0):
+        self.name = name
+        self.device = device
+        self.weight = weight
+        # The lane's index is part of every seed id it issues
+        self.seed_ids = SeedIdGenerator(lane=index)
+        self.session_id: Optional[str] = None
+        self.bound_at: Optional[float] = None
+        # /classify clients of the bound session, and since when it has had none
+        self.clients = 0
+        self.idle_since: Optional[float] = None
+        self.reset()
+
+    def reset(self):
+        # Capture-to-send latency of the frames classified on the lane
+        self.frames = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+
+    def record(self, latency: float):
+        """Record the capture-to-send latency of one classified frame, in seconds"""
+        self.frames += 1
+        self.total_latency += latency
+        if latency > self.max_latency:
+            self.max_latency = latency
+
+    @property
+    def producer(self):
+        return get_producer(self.device)
+
+    def snapshot(self) -> Dict[str, Any]:
+        elapsed = time.monotonic() - self.bound_at if self.bound_at is not None else 0.0
+        return {
+            "device": self.device,
+            "weight": self.weight,
+            "session_id": self.session_id,
+            "clients": self.clients,
+            "idle_seconds": round(time.monotonic() - self.idle_since, 3) if self.idle_since is not None else None,
+            "frames": self.frames,
+            "frames_per_second": round(self.frames / elapsed, 2) if elapsed > 0 else 0.0,
+            "avg_latency_ms": round(self.total_latency / self.frames * 1000, 3) if self.frames else 0.0,
+            "max_latency_ms": round(self.max_latency * 1000, 3),
+        }
+
+
+def parse_lanes(spec: str) -> List[CameraLane]:
+    """Parse CAMERA_LANES: comma separated name[@weight]=device, e.g. "left@2=0,right=rtsp://cam:554/stream"
+
+    The weight belongs to the lane name, so whatever follows the first "="
+    is the device, taken verbatim: URLs keep their ports and credentials.
+    Without a spec there is a single "default" lane on CAMERA_DEVICE.
+    """
+    lanes = []
+    for entry in filter(None, (part.strip() for part in spec.split(","))):
+        head, _, device = entry.partition("=")
+        name, _, weight = head.strip().partition("@")
+        device = device.strip()
+        if not LANE_NAME.fullmatch(name) or not device:
+            raise ValueError(f"Invalid CAMERA_LANES entry {entry!r}, expected name[@weight]=device")
+        if name in (lane.name for lane in lanes):
+            raise ValueError(f"Camera lane {name!r} is defined twice in CAMERA_LANES")
+        try:
+            weight = float(weight) if weight else 1.0
+        except ValueError:
+            raise ValueError(f"Invalid weight {weight!r} of camera lane {name!r}, expected a number") from None
+        if not MIN_LANE_WEIGHT <= weight <= MAX_LANE_WEIGHT:
+            raise ValueError(
+                f"Weight {weight:g} of camera lane {name!r} is out of range [{MIN_LANE_WEIGHT:g}, {MAX_LANE_WEIGHT:g}]"
+            )
+        if len(lanes) == MAX_LANES:
+            raise ValueError(f"At most {MAX_LANES} camera lanes are supported")
+        lanes.append(CameraLane(name, device, weight, index=len(lanes)))
+    return lanes or [CameraLane("default", settings.CAMERA_DEVICE)]
+
+
+class LaneRegistry:
+    """Configured camera lanes and the session each one is bound to.
+
+    A lane sorts one lot at a time: a session claims a lane when it starts
+    and releases it when it ends. Bindings only live in memory, so a session
+    that is never stopped (its client crashed, the UI was closed) would hold
+    its lane for good: once a lane has had no client for
+    LANE_IDLE_RELEASE_SECONDS another session may take it over, and admins
+    can release a lane at any time.
+    """
+
+    def __init__(self, lanes: List[CameraLane], idle_release_seconds: float = None):
+        self.lanes: Dict[str, CameraLane] = {lane.name: lane for lane in lanes}
+        self.default = lanes[0].name
+        self.idle_release_seconds = (
+            settings.LANE_IDLE_RELEASE_SECONDS if idle_release_seconds is None else idle_release_seconds
+        )
+
+    def get(self, name: Optional[str]) -> Optional[CameraLane]:
+        """A lane by name, or the default lane for sessions that never named one"""
+        return self.lanes.get(name or self.default)
+
+    def bind(self, session_id: str, name: Optional[str] = None) -> CameraLane:
+        """Claim a lane for a session: the named one, or else the first free one"""
+        if name is not None:
+            lane = self.lanes.get(name)
+            if lane is None:
+                raise KeyError(f"Unknown camera lane {name}")
+            if not self._available(lane, session_id):
+                raise LaneBusyError(f"Camera lane {name} is in use by session {lane.session_id}")
+        else:
+            free = [lane for lane in self.lanes.values() if self._available(lane, session_id)]
+            # A free lane before one taken over from an idle session
+            lane = min(free, key=lambda lane: lane.session_id is not None, default=None)
+            if lane is None:
+                raise LaneBusyError("Every camera lane is in use")
+        if lane.session_id != str(session_id):
+            if lane.session_id is not None:
+                idle = time.monotonic() - lane.idle_since
+                print(f"Camera lane {lane.name} had no client for {idle:.0f}s, releasing it from session {lane.session_id}")
+            lane.session_id = str(session_id)
+            lane.bound_at = lane.idle_since = time.monotonic()
+            lane.clients = 0
+            lane.reset()
+        return lane
+
+    def _available(self, lane: CameraLane, session_id: str) -> bool:
+        """Whether a session may bind the lane: free, its own, or left idle by another session"""
+        if lane.session_id is None or lane.session_id == str(session_id):
+            return True
+        return (
+            self.idle_release_seconds > 0
+            and lane.clients == 0
+            and time.monotonic() - lane.idle_since >= self.idle_release_seconds
+        )
+
+    def attach(self, lane: CameraLane, session_id: str):
+        """Count a client of the session bound to the lane"""
+        if lane.session_id == str(session_id):
+            lane.clients += 1
+            lane.idle_since = None
+
+    def detach(self, lane: CameraLane, session_id: str):
+        """Forget a client; a lane rebound since then isn't affected"""
+        if lane.session_id == str(session_id) and lane.clients > 0:
+            lane.clients -= 1
+            if lane.clients == 0:
+                lane.idle_since = time.monotonic()
+
+    def release(self, session_id: str):
+        """Free the lane of a session that ended"""
+        for lane in self.lanes.values():
+            if lane.session_id == str(session_id):
+                self._unbind(lane)
+
+    def release_lane(self, name: str) -> Optional[str]:
+        """Free a lane whatever session holds it, returning that session's id.
+
+        The session's sorter stops and its clients are disconnected; the
+        session itself stays open until it is stopped.
+        """
+        lane = self.lanes[name]
+        session_id = lane.session_id
+        self._unbind(lane)
+        return session_id
+
+    @staticmethod
+    def _unbind(lane: CameraLane):
+        lane.session_id = None
+        lane.bound_at = None
+        lane.clients = 0
+        lane.idle_since = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {name: lane.snapshot() for name, lane in self.lanes.items()}
+
+
+lanes = LaneRegistry(parse_lanes(settings.CAMERA_LANES))
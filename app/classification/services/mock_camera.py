@@ -0,0 +1,83 @@
+from typing import List, Tuple
+
+import numpy as np
+
+from config import settings
+from utils.lazy_import import lazy_import
+
+cv2 = lazy_import("cv2")
+
+
+def create_mock_frame(width: int = None, height: int = None) -> np.ndarray:
+    """Create the mock background: red/green vertical gradient on constant blue"""
+    width = width or settings.CAMERA_WIDTH
+    height = height or settings.CAMERA_HEIGHT
+    rows = np.arange(height)
+    frame = np.empty((height, width, 3), dtype=np.uint8)
+    frame[:, :, 0] = (255 * rows // height).astype(np.uint8)[:, None]  # Red gradient
+    frame[:, :, 1] = (255 * (height - rows) // height).astype(np.uint8)[:, None]  # Green gradient
+    frame[:, :, 2] = 128  # Constant blue
+    return frame
+
+
+class MockCamera:
+    """Synthetic camera producing seed scenes, a drop-in for cv2.VideoCapture.
+
+    A fixed bank of scenes, each with `seeds` seeds of random position, size,
+    orientation and color on the gradient background, is rendered once up
+    front; read() only copies the next scene into the caller's buffer, so
+    the generator never costs more than a memcpy per frame.
+    """
+
+    def __init__(
+        self,
+        width: int = None,
+        height: int = None,
+        seeds: int = None,
+        scenes: int = None,
+        random_seed: int = None,
+    ):
+        self.width = width or settings.CAMERA_WIDTH
+        self.height = height or settings.CAMERA_HEIGHT
+        self.seeds = settings.MOCK_CAMERA_SEEDS if seeds is None else seeds
+        count = max(1, scenes or settings.MOCK_CAMERA_SCENES)
+        rng = np.random.default_rng(settings.MOCK_CAMERA_RANDOM_SEED if random_seed is None else random_seed)
+        background = create_mock_frame(self.width, self.height)
+        self.scenes: List[np.ndarray] = [self._render(background, rng) for _ in range(count)]
+        self.position = 0
+
+    def _render(self, background: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+        scene = background.copy()
+        # Seed size scales with the frame so scenes look alike at any resolution
+        length = max(4, min(self.width, self.height) // 24)
+        for _ in range(self.seeds):
+            center = (int(rng.integers(0, self.width)), int(rng.integers(0, self.height)))
+            axes = (int(length * rng.uniform(0.8, 1.2)), int(length * rng.uniform(0.4, 0.6)))
+            color = tuple(int(c) for c in rng.integers(20, 230, size=3))
+            cv2.ellipse(scene, center, axes, float(rng.uniform(0, 180)), 0, 360, color, -1, cv2.LINE_AA)
+        return scene
+
+    def read(self, image: np.ndarray = None) -> Tuple[bool, np.ndarray]:
+        """Copy the next scene into image (allocated if None)"""
+        if not self.scenes:
+            return False, image
+        scene = self.scenes[self.position]
+        self.position = (self.position + 1) % len(self.scenes)
+        if image is None or image.shape != scene.shape:
+            return True, scene.copy()
+        np.copyto(image, scene)
+        return True, image
+
+    def isOpened(self) -> bool:
+        return True
+
+    def set(self, prop: int, value) -> bool:
+        if prop == cv2.CAP_PROP_POS_FRAMES:
+            self.position = int(value) % max(1, len(self.scenes))
+            return True
+        return False
+
+    def release(self):
+        """Free the scene bank"""
+        self.scenes = []
+        self.position = 0
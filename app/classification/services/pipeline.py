@@ -0,0 +1,171 @@
+import asyncio
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from config import settings
+from monitoring.metrics import metrics
+
+STAGE_SECONDS = metrics.histogram("seedx_stage_seconds", "Time spent on one item, per pipeline stage", ("stage",))
+STAGE_DROPPED = metrics.counter("seedx_stage_dropped_total", "Items evicted from a full stage inbox", ("stage",))
+
+
+class StageStats:
+    """Timing and throughput counters for one pipeline stage"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.processed = 0
+        self.dropped = 0
+        self.total_ms = 0.0
+        self.last_ms = 0.0
+        self.max_ms = 0.0
+
+    def record(self, elapsed_ms: float):
+        """Record the duration of one processed item"""
+        self.processed += 1
+        self.total_ms += elapsed_ms
+        self.last_ms = elapsed_ms
+        if elapsed_ms > self.max_ms:
+            self.max_ms = elapsed_ms
+        STAGE_SECONDS.observe(elapsed_ms / 1000, self.name)
+
+    def snapshot(self, inbox: Optional[queue.Queue] = None) -> Dict[str, Any]:
+        """Get the current counters, with the inbox depth if the stage has one"""
+        data = {
+            "processed": self.processed,
+            "dropped": self.dropped,
+            "last_ms": round(self.last_ms, 3),
+            "avg_ms": round(self.total_ms / self.processed, 3) if self.processed else 0.0,
+            "max_ms": round(self.max_ms, 3),
+        }
+        if inbox is not None:
+            data["queue_depth"] = inbox.qsize()
+            data["queue_capacity"] = inbox.maxsize
+        return data
+
+
+class DropOldestQueue(queue.Queue):
+    """Bounded thread-safe queue that evicts the oldest item instead of blocking"""
+
+    def offer(self, item) -> Any:
+        """Put an item, returning the evicted item if the queue was full"""
+        with self.mutex:
+            evicted = None
+            if 0 < self.maxsize <= self._qsize():
+                evicted = self._get()
+            self._put(item)
+            if evicted is None:
+                self.unfinished_tasks += 1
+            self.not_empty.notify()
+            return evicted
+
+
+class StageThread(threading.Thread):
+    """Worker thread that applies a handler to every item of its bounded inbox"""
+
+    def __init__(
+        self,
+        name: str,
+        handler: Callable[[Any], None],
+        maxsize: int = None,
+        on_drop: Optional[Callable[[Any], None]] = None,
+    ):
+        super().__init__(name=name, daemon=True)
+        self.handler = handler
+        self.on_drop = on_drop
+        self.inbox = DropOldestQueue(maxsize=maxsize or settings.PIPELINE_QUEUE_SIZE)
+        self.stats = StageStats(name)
+        self._stop_event = threading.Event()
+
+    def offer(self, item):
+        """Hand an item to the stage without blocking the caller"""
+        evicted = self.inbox.offer(item)
+        if evicted is not None:
+            self.stats.dropped += 1
+            STAGE_DROPPED.inc(1, self.name)
+            if self.on_drop is not None:
+                self.on_drop(evicted)
+
+    def run(self):
+        while not self._stop_event.is_set():
+            try:
+                item = self.inbox.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            started = time.perf_counter()
+            try:
+                self.handler(item)
+            except Exception as e:
+                print(f"Error in pipeline stage {self.name}: {str(e)}")
+            finally:
+                self.stats.record((time.perf_counter() - started) * 1000)
+                self.inbox.task_done()
+
+    def stop(self):
+        """Ask the thread to exit after its current item"""
+        self._stop_event.set()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return self.stats.snapshot(self.inbox)
+
+
+class InferenceWorker:
+    """Dedicated inference thread fed from the event loop through a bounded queue.
+
+    Callers await a future that is resolved on the loop thread; when the queue
+    overflows the oldest pending job is dropped and resolves to None.
+    """
+
+    def __init__(self, maxsize: int = None):
+        self.maxsize = maxsize or settings.PIPELINE_QUEUE_SIZE
+        self._thread: Optional[StageThread] = None
+
+    def _ensure_started(self) -> StageThread:
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = StageThread("inference", self._run_job, self.maxsize, on_drop=self._drop_job)
+            self._thread.start()
+        return self._thread
+
+    @staticmethod
+    def _resolve(future: asyncio.Future, result: Any = None, error: BaseException = None):
+        if future.done():
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def _run_job(self, job):
+        fn, args, future, loop = job
+        try:
+            result = fn(*args)
+        except Exception as e:
+            loop.call_soon_threadsafe(self._resolve, future, None, e)
+            return
+        loop.call_soon_threadsafe(self._resolve, future, result)
+
+    def _drop_job(self, job):
+        _, _, future, loop = job
+        loop.call_soon_threadsafe(self._resolve, future, None)
+
+    async def submit(self, fn: Callable, *args) -> Any:
+        """Run fn(*args) on the inference thread and await its result"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._ensure_started().offer((fn, args, future, loop))
+        return await future
+
+    def stop(self):
+        if self._thread is not None:
+            self._thread.stop()
+            self._thread = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        if self._thread is None:
+            return StageStats("inference").snapshot()
+        return self._thread.snapshot()
+
+
+inference_worker = InferenceWorker()
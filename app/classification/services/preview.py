@@ -0,0 +1,110 @@
+import time
+from typing import NamedTuple, Optional, Tuple
+
+from config import settings
+
+
+class PreviewVariant(NamedTuple):
+    """One JPEG encoding of the preview; frames encode each requested variant once"""
+    width: int
+    height: int
+    quality: int
+
+    @property
+    def label(self) -> str:
+        return f"{self.width}x{self.height}q{self.quality}"
+
+
+def make_variant(width: int = None, quality: int = None) -> PreviewVariant:
+    """Build a preview variant, quantized so that similar requests share one encoding"""
+    width = width or settings.CAMERA_WIDTH
+    width = max(32, min(settings.CAMERA_WIDTH, int(round(width / 16)) * 16))
+    height = max(2, int(round(width * settings.CAMERA_HEIGHT / settings.CAMERA_WIDTH / 2)) * 2)
+    quality = quality or settings.PREVIEW_JPEG_QUALITY
+    quality = max(10, min(100, int(round(quality / 5)) * 5))
+    return PreviewVariant(width, height, quality)
+
+
+# Degradation ladder for adaptive clients: (scale, quality drop, fps factor)
+# applied to what the client asked for. Level 0 is the request itself.
+PREVIEW_LADDER = (
+    (1.0, 0, 1.0),
+    (1.0, 20, 1.0),
+    (0.5, 20, 1.0),
+    (0.5, 30, 0.5),
+    (0.25, 40, 0.5),
+    (0.25, 40, 0.25),
+)
+
+
+class PreviewController:
+    """Preview settings of one client: resolution, JPEG quality and frame rate.
+
+    Non-adaptive clients keep what they asked for. Adaptive clients step down
+    the ladder when their outbound queue lags by more than PREVIEW_LAG_RATIO
+    of the frame interval, and step back up after staying healthy for PREVIEW_UPGRADE_AFTER_S.
+    """
+
+    def __init__(self, width: int = None, fps: float = None, quality: int = None, adaptive: bool = False):
+        self.width = width or settings.CAMERA_WIDTH
+        self.fps = settings.CAMERA_FPS if fps is None else max(0.0, min(fps, settings.CAMERA_FPS))
+        self.quality = quality or settings.PREVIEW_JPEG_QUALITY
+        self.adaptive = adaptive
+        self.level = 0
+        self.sent = 0
+        self.skipped = 0
+        self._last_sent_at = 0.0
+        self._last_change = time.monotonic()
+        self._last_lag = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.fps > 0
+
+    def current(self) -> Tuple[PreviewVariant, float]:
+        """Variant and frame rate at the current ladder level"""
+        scale, quality_drop, fps_factor = PREVIEW_LADDER[self.level]
+        variant = make_variant(int(self.width * scale), self.quality - quality_drop)
+        return variant, self.fps * fps_factor
+
+    def select(self, frame) -> Optional[bytes]:
+        """Get the preview to send for a frame, or None to skip it for this client"""
+        variant, fps = self.current()
+        jpeg = frame.previews.get(variant)
+        # 10% tolerance so capture jitter doesn't halve the effective rate
+        if jpeg is None or frame.captured_at - self._last_sent_at < 0.9 / fps:
+            self.skipped += 1
+            return None
+        self._last_sent_at = frame.captured_at
+        self.sent += 1
+        return jpeg
+
+    def observe(self, lag_seconds: float) -> bool:
+        """Adapt to the client's send lag; returns True when the variant or rate changed"""
+        if not self.adaptive:
+            return False
+
+        now = time.monotonic()
+        _, fps = self.current()
+        if lag_seconds > settings.PREVIEW_LAG_RATIO / fps:
+            self._last_lag = now
+            if self.level < len(PREVIEW_LADDER) - 1 and now - self._last_change >= 1.0:
+                self.level += 1
+                self._last_change = now
+                return True
+        elif self.level > 0 and now - max(self._last_lag, self._last_change) >= settings.PREVIEW_UPGRADE_AFTER_S:
+            self.level -= 1
+            self._last_change = now
+            return True
+        return False
+
+    def snapshot(self):
+        variant, fps = self.current()
+        return {
+            "variant": variant.label,
+            "fps": round(fps, 2),
+            "adaptive": self.adaptive,
+            "level": self.level,
+            "sent": self.sent,
+            "skipped": self.skipped,
+        }
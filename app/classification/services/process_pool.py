@@ -0,0 +1,295 @@
+import asyncio
+import itertools
+import multiprocessing
+import queue
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from classification.services.frame_pool import FramePool, SharedFrameRing
+from classification.services.frame_producer import get_producers
+from classification.services.pipeline import StageStats
+from classification.services.result_batch import ResultBatch
+from classification.services.sorter import ClassificationService
+from config import settings
+
+FrameLocation = Tuple[str, int]  # (shared memory segment, slot)
+
+
+def worker_main(worker_id: int, requests, results):
+    """Entry point of an inference process: classify batches of shared frames by slot"""
+    classifier = ClassificationService()
+    classifier.warmup()
+    rings: Dict[Tuple[str, Tuple[int, ...]], SharedFrameRing] = {}
+    results.put(("ready", worker_id, None, None))
+    try:
+        while True:
+            job = requests.get()
+            if job is None:
+                break
+            job_id, shape, locations = job
+            try:
+                images = []
+                for name, slot in locations:
+                    ring = rings.get((name, shape))
+                    if ring is None:
+                        ring = rings[(name, shape)] = SharedFrameRing(shape, name=name)
+                    images.append(ring.frames[slot])
+                # Pickles as a handful of small arrays
+                results.put(("done", worker_id, job_id, classifier.classify_batch(images)))
+            except Exception as e:
+                results.put(("error", worker_id, job_id, str(e)))
+    finally:
+        for ring in rings.values():
+            ring.close()
+
+
+class _Job:
+    def __init__(self, job_id: int, shape, locations, staged, future, loop):
+        self.id = job_id
+        self.shape = shape
+        self.locations: List[FrameLocation] = locations
+        self.staged: List[int] = staged  # Staging slots to free once the job completes
+        self.future: asyncio.Future = future
+        self.loop = loop
+        self.attempts = 0
+        self.worker: Optional[int] = None
+        self.started = time.perf_counter()
+
+
+class _Worker:
+    def __init__(self, worker_id: int, context):
+        self.id = worker_id
+        self.requests = context.Queue()
+        self.process = None
+        self.in_flight: Dict[int, _Job] = {}
+        self.ready = False
+        self.restarts = -1
+
+
+class ProcessInferencePool:
+    """Inference spread over worker processes, each with its own copy of the model.
+
+    Batches never carry pixels: frames captured into a shared FramePool are
+    sent as (segment, slot) pairs, and any other frame is first copied once
+    into the pool's own shared staging ring. Results come back as a
+    ResultBatch on one queue, read by a thread that resolves the callers'
+    futures. A worker that dies is restarted and its in-flight batches
+    re-dispatched.
+    """
+
+    def __init__(self, processes: int = None, staging_slots: int = None):
+        self.processes = processes or settings.INFERENCE_PROCESSES
+        self.staging_slots = staging_slots or settings.MAX_BATCH_SIZE * 2 * max(1, self.processes)
+        self.context = multiprocessing.get_context(settings.INFERENCE_START_METHOD)
+        self.stats = StageStats("inference-pool")
+        self.workers: List[_Worker] = []
+        self.staging: Optional[SharedFrameRing] = None
+        self._free_staging: Deque[int] = deque()
+        self._results = None
+        self._reader: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+        self._job_ids = itertools.count()
+        self.zero_copy_frames = 0
+        self.staged_frames = 0
+        self.retried_jobs = 0
+        self.failed_jobs = 0
+
+    @property
+    def started(self) -> bool:
+        return self._reader is not None
+
+    def start(self):
+        """Spawn the workers and the result reader"""
+        if self.started:
+            return
+        self._stopping.clear()
+        self._results = self.context.Queue()
+        self.staging = SharedFrameRing((settings.CAMERA_HEIGHT, settings.CAMERA_WIDTH, 3), self.staging_slots)
+        self._free_staging = deque(range(self.staging_slots))
+        self.workers = [_Worker(i, self.context) for i in range(self.processes)]
+        for worker in self.workers:
+            self._spawn(worker)
+        self._reader = threading.Thread(target=self._read_results, name="inference-pool-results", daemon=True)
+        self._reader.start()
+
+    async def wait_ready(self, timeout: float = 120.0):
+        """Start the pool if needed and wait until every worker has loaded and warmed up its model"""
+        self.start()
+        deadline = time.monotonic() + timeout
+        while not all(worker.ready for worker in self.workers):
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Inference workers not ready after {timeout:.0f}s")
+            await asyncio.sleep(0.1)
+
+    def _spawn(self, worker: _Worker):
+        worker.ready = False
+        worker.restarts += 1
+        worker.process = self.context.Process(
+            target=worker_main,
+            args=(worker.id, worker.requests, self._results),
+            name=f"inference-{worker.id}",
+            daemon=True,
+        )
+        worker.process.start()
+
+    def _locate(self, images: List[Any], pools: List[FramePool]) -> Optional[Tuple[Tuple[int, ...], List[FrameLocation], List[int]]]:
+        """Shared memory location of every image, staging those not already shared"""
+        locations, staged = [], []
+        shape = tuple(images[0].shape) if images else ()
+        if any(tuple(image.shape) != shape for image in images):
+            return None
+        for image in images:
+            location = None
+            for pool in pools:
+                location = pool.locate(image)
+                if location is not None:
+                    break
+            if location is None:
+                if image.shape != self.staging.shape or not self._free_staging:
+                    with self._lock:
+                        self._free_staging.extend(staged)
+                    return None
+                slot = self._free_staging.popleft()
+                np.copyto(self.staging.frames[slot], image)
+                staged.append(slot)
+                location = (self.staging.name, slot)
+                self.staged_frames += 1
+            else:
+                self.zero_copy_frames += 1
+            locations.append(location)
+        return shape, locations, staged
+
+    async def classify_batch(self, images: List[Any]) -> Optional[ResultBatch]:
+        """Classify a batch on the least busy worker; None if it had to be dropped"""
+        if not self.started:
+            self.start()
+        pools = [producer.pool for producer in get_producers().values()]
+        located = self._locate([np.asarray(image) for image in images], pools)
+        if located is None:
+            self.failed_jobs += 1
+            return None
+        shape, locations, staged = located
+        loop = asyncio.get_running_loop()
+        job = _Job(next(self._job_ids), shape, locations, staged, loop.create_future(), loop)
+        # Frames stay referenced by the caller until the future resolves, so
+        # their slots can't be recycled while a worker reads them
+        self._dispatch(job)
+        return await job.future
+
+    def _dispatch(self, job: _Job):
+        with self._lock:
+            worker = min(self.workers, key=lambda w: (not w.process.is_alive(), len(w.in_flight)))
+            job.worker = worker.id
+            job.attempts += 1
+            worker.in_flight[job.id] = job
+        worker.requests.put((job.id, job.shape, job.locations))
+
+    def _finish(self, job: _Job, results: Optional[ResultBatch]):
+        with self._lock:
+            self._free_staging.extend(job.staged)
+        self.stats.record((time.perf_counter() - job.started) * 1000)
+        job.loop.call_soon_threadsafe(self._resolve, job.future, results)
+
+    @staticmethod
+    def _resolve(future: asyncio.Future, results):
+        if not future.done():
+            future.set_result(results)
+
+    def _read_results(self):
+        while not self._stopping.is_set():
+            try:
+                kind, worker_id, job_id, payload = self._results.get(timeout=0.5)
+            except queue.Empty:
+                self._check_workers()
+                continue
+            except (EOFError, OSError):
+                break
+            worker = self.workers[worker_id]
+            if kind == "ready":
+                worker.ready = True
+                continue
+            with self._lock:
+                job = worker.in_flight.pop(job_id, None)
+            if job is None:
+                continue
+            if kind == "error":
+                print(f"Error in inference worker {worker_id}: {payload}")
+                self.failed_jobs += 1
+                payload = None
+            try:
+                self._finish(job, payload)
+            except Exception as e:
+                print(f"Error finishing inference batch {job_id}: {str(e)}")
+                job.loop.call_soon_threadsafe(self._resolve, job.future, None)
+            self._check_workers()
+
+    def _check_workers(self):
+        """Restart dead workers and hand their in-flight batches to the living"""
+        for worker in self.workers:
+            if self._stopping.is_set() or worker.process.is_alive():
+                continue
+            print(f"Inference worker {worker.id} exited with code {worker.process.exitcode}, restarting")
+            with self._lock:
+                orphans = list(worker.in_flight.values())
+                worker.in_flight.clear()
+            worker.requests = self.context.Queue()
+            self._spawn(worker)
+            for job in orphans:
+                if job.attempts <= settings.INFERENCE_JOB_RETRIES:
+                    self.retried_jobs += 1
+                    self._dispatch(job)
+                else:
+                    self.failed_jobs += 1
+                    self._finish(job, None)
+
+    def stop(self):
+        """Stop the workers, failing whatever is still in flight"""
+        if not self.started:
+            return
+        self._stopping.set()
+        for worker in self.workers:
+            try:
+                worker.requests.put(None)
+            except (OSError, ValueError):
+                pass
+        for worker in self.workers:
+            worker.process.join(timeout=2.0)
+            if worker.process.is_alive():
+                worker.process.terminate()
+            for job in worker.in_flight.values():
+                self._finish(job, None)
+            worker.in_flight.clear()
+        self._reader.join(timeout=2.0)
+        self._reader = None
+        self.staging.close()
+
+    def snapshot(self) -> Dict[str, Any]:
+        data = {
+            "processes": self.processes,
+            "workers": [
+                {
+                    "id": worker.id,
+                    "pid": worker.process.pid if worker.process else None,
+                    "alive": bool(worker.process and worker.process.is_alive()),
+                    "ready": worker.ready,
+                    "in_flight": len(worker.in_flight),
+                    "restarts": max(0, worker.restarts),
+                }
+                for worker in self.workers
+            ],
+            "zero_copy_frames": self.zero_copy_frames,
+            "staged_frames": self.staged_frames,
+            "free_staging_slots": len(self._free_staging),
+            "retried_jobs": self.retried_jobs,
+            "failed_jobs": self.failed_jobs,
+        }
+        data.update(self.stats.snapshot())
+        return data
+
+
+inference_pool = ProcessInferencePool()
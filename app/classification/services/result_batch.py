@@ -0,0 +1,131 @@
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+# Class codes shared by the model output, the binary wire protocol and the counters
+CLASS_NAMES = ("pending", "accept", "reject")
+CLASS_CODES = {name: code for code, name in enumerate(CLASS_NAMES)}
+UNSAMPLED_IMAGE_PATH = "."
+
+Rows = Union[slice, Sequence[int], np.ndarray]
+
+
+class ResultBatch:
+    """Classification results of a batch of seeds, one NumPy column per field.
+
+    A batch flows unchanged from inference through the socket to the wire
+    encoders and the result writer; sessions and writers take row subsets
+    with take(). Seed ids are issued by the camera lane once the socket ties
+    the rows to their frames. Per-seed Python objects (seed id strings, JSON dicts, ORM
+    rows) are only built at the boundaries that need them.
+    """
+
+    __slots__ = ("seed_ids", "class_codes", "sampled", "frame_index", "captured_at", "image_paths")
+
+    def __init__(
+        self,
+        class_codes: np.ndarray,
+        seed_ids: np.ndarray = None,
+        sampled: np.ndarray = None,
+        frame_index: np.ndarray = None,
+        captured_at: np.ndarray = None,
+        image_paths: np.ndarray = None,
+    ):
+        count = len(class_codes)
+        self.class_codes = np.asarray(class_codes, dtype=np.uint8)
+        # 64-bit snowflake ids (utils.seed_id_provider); 0 until the batch is tied to its frames
+        self.seed_ids = seed_ids if seed_ids is not None else np.zeros(count, dtype=np.int64)
+        self.sampled = sampled if sampled is not None else np.zeros(count, dtype=bool)
+        self.frame_index = frame_index if frame_index is not None else np.zeros(count, dtype=np.int64)
+        # Capture time of each seed's frame; NaN until the batch is tied to frames
+        self.captured_at = captured_at if captured_at is not None else np.full(count, np.nan)
+        # Image references of sampled seeds; None while no seed has one
+        self.image_paths = image_paths
+
+    @classmethod
+    def concat(cls, batches: Sequence["ResultBatch"]) -> "ResultBatch":
+        if len(batches) == 1:
+            return batches[0]
+        image_paths = None
+        if any(batch.image_paths is not None for batch in batches):
+            image_paths = np.concatenate([batch.image_path_column() for batch in batches])
+        return cls(
+            np.concatenate([batch.class_codes for batch in batches]),
+            np.concatenate([batch.seed_ids for batch in batches]),
+            np.concatenate([batch.sampled for batch in batches]),
+            np.concatenate([batch.frame_index for batch in batches]),
+            np.concatenate([batch.captured_at for batch in batches]),
+            image_paths,
+        )
+
+    @classmethod
+    def gather(cls, rows: Sequence[Tuple["ResultBatch", int]]) -> "ResultBatch":
+        """One batch from (batch, row) references, taking runs of the same batch at once"""
+        parts, start = [], 0
+        for end in range(1, len(rows) + 1):
+            if end == len(rows) or rows[end][0] is not rows[start][0]:
+                parts.append(rows[start][0].take([row for _, row in rows[start:end]]))
+                start = end
+        return cls.concat(parts)
+
+    def __len__(self) -> int:
+        return len(self.class_codes)
+
+    def take(self, rows: Rows) -> "ResultBatch":
+        """Subset of the rows, as a new batch"""
+        return ResultBatch(
+            self.class_codes[rows],
+            self.seed_ids[rows],
+            self.sampled[rows],
+            self.frame_index[rows],
+            self.captured_at[rows],
+            self.image_paths[rows] if self.image_paths is not None else None,
+        )
+
+    def tie_to_frames(self, frame_index: Sequence[int], captured_at: Sequence[float], seed_ids: np.ndarray):
+        """Record which frame each seed came from, when it was captured and the id it was given"""
+        self.frame_index = np.asarray(frame_index, dtype=np.int64)
+        self.captured_at = np.asarray(captured_at, dtype=np.float64)
+        self.seed_ids = seed_ids
+
+    def mark_sampled(self, image_paths: Sequence[Optional[str]] = None) -> "ResultBatch":
+        """Copy of the batch flagged as sampled, with the stored image references once known"""
+        batch = self.take(slice(None))
+        batch.sampled = np.ones(len(self), dtype=bool)
+        batch.image_paths = np.array(image_paths if image_paths is not None else [None] * len(self), dtype=object)
+        return batch
+
+    def counts(self) -> np.ndarray:
+        """Seeds per class code"""
+        return np.bincount(self.class_codes, minlength=len(CLASS_NAMES))
+
+    def seed_id_strings(self) -> List[str]:
+        """Display form of the seed ids: decimal strings, which JSON clients can't round"""
+        return [str(seed_id) for seed_id in self.seed_ids.tolist()]
+
+    def class_names(self) -> List[str]:
+        return [CLASS_NAMES[code] for code in self.class_codes.tolist()]
+
+    def image_path_column(self) -> np.ndarray:
+        """Image reference of every row: the stored image of sampled seeds, "." otherwise"""
+        if self.image_paths is None:
+            return np.full(len(self), UNSAMPLED_IMAGE_PATH, dtype=object)
+        return self.image_paths
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        """One ClassificationResult-shaped dict per seed, plus its frame, for JSON clients"""
+        return [
+            {"seed_id": seed_id, "classification": CLASS_NAMES[code], "is_sampled": sampled,
+             "image_path": image_path, "frame": frame}
+            for seed_id, code, sampled, image_path, frame in zip(
+                self.seed_id_strings(),
+                self.class_codes.tolist(),
+                self.sampled.tolist(),
+                self.image_path_column().tolist(),
+                self.frame_index.tolist(),
+            )
+        ]
+
+    def __repr__(self) -> str:
+        return f"ResultBatch({len(self)} seeds, counts={dict(zip(CLASS_NAMES, self.counts().tolist()))})"
+
@@ -0,0 +1,71 @@
+import json
+import struct
+import zlib
+
+import numpy as np
+
+from classification.services.result_batch import ResultBatch
+
+# Wire protocols a /classify client can ask for with ?protocol=...
+#   json        one JSON text message per result (default, legacy)
+#   json-batch  one JSON text message per batch; ?compress=zlib sends it
+#               zlib-compressed in a binary message prefixed with COMPRESSED_MAGIC
+#   binary      one packed binary message per batch: HEADER then count RECORDs
+# compress=zlib is application-level compression of the batch document, not
+# WebSocket permessage-deflate: it works whatever extensions the client and
+# server negotiate, and the client inflates the payload itself.
+PROTOCOLS = ("json", "json-batch", "binary")
+COMPRESSIONS = (None, "zlib")
+
+PROTOCOL_VERSION = 2
+RESULT_MAGIC = b"SXR"  # Never collides with preview JPEGs, which start with FF D8
+COMPRESSED_MAGIC = b"SXZ"
+HEADER = struct.Struct("<3sBHH")  # magic, version, record count, record size
+RECORD = struct.Struct("<IqBB")  # frame index, seed id, class code (result_batch.CLASS_NAMES), flags
+# RECORD as a packed NumPy dtype, so a whole batch is laid out with a few column copies
+RECORD_DTYPE = np.dtype([("frame", "<u4"), ("seed_id", "<i8"), ("class_code", "u1"), ("flags", "u1")])
+FLAG_SAMPLED = 0x01
+
+
+def encode_binary(batch: ResultBatch) -> bytes:
+    """Pack the results of a batch into one binary message"""
+    records = np.empty(len(batch), dtype=RECORD_DTYPE)
+    records["frame"] = batch.frame_index & 0xFFFFFFFF
+    records["seed_id"] = batch.seed_ids
+    records["class_code"] = batch.class_codes
+    records["flags"] = np.where(batch.sampled, FLAG_SAMPLED, 0)
+    return HEADER.pack(RESULT_MAGIC, PROTOCOL_VERSION, len(records), RECORD.size) + records.tobytes()
+
+
+def encode_json_batch(batch: ResultBatch) -> str:
+    """Serialize the results of a batch into one JSON document"""
+    return json.dumps({"type": "results", "results": batch.to_dicts()}, separators=(",", ":"))
+
+
+class ResultEncoder:
+    """Encodes classification results in the protocol a client negotiated"""
+
+    def __init__(self, protocol: str = "json", compress: str = None):
+        if protocol not in PROTOCOLS:
+            raise ValueError(f"Unsupported protocol {protocol}, expected one of {PROTOCOLS}")
+        if compress not in COMPRESSIONS:
+            raise ValueError(f"Unsupported compression {compress}, expected one of {COMPRESSIONS[1:]}")
+        self.protocol = protocol
+        self.compress = compress
+
+    @property
+    def key(self):
+        """Clients with the same key get the very same messages, encoded once"""
+        return self.protocol, self.compress
+
+    def encode(self, batch: ResultBatch):
+        """The message(s) carrying a batch to the client, as queued on its outbox"""
+        if self.protocol == "binary":
+            return encode_binary(batch)
+        if self.protocol == "json-batch":
+            document = encode_json_batch(batch)
+            if self.compress == "zlib":
+                return COMPRESSED_MAGIC + bytes([PROTOCOL_VERSION]) + zlib.compress(document.encode(), 1)
+            return document
+        # One message per result, sent back to back
+        return batch.to_dicts()
@@ -0,0 +1,284 @@
+import asyncio
+import functools
+import time
+import uuid
+from collections import defaultdict, deque
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import insert
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from classification.services.result_batch import CLASS_CODES, ResultBatch
+from config import settings
+from monitoring.metrics import metrics
+from db.database import engine
+from models.classification import Classification
+from models.rollup import ClassificationRollup
+from utils.time_buckets import bucket_start
+
+COPY_COLUMNS = ("seed_id", "classify", "is_sampled", "image_path", "session_id", "timestamp")
+
+Part = Tuple[uuid.UUID, ResultBatch]  # Queued results of one session
+
+DB_FLUSH_SECONDS = metrics.histogram("seedx_db_flush_seconds", "Time to write one batch of results, commit included")
+
+
+class ResultWriter:
+    """Write-behind persistence of classification results.
+
+    Sessions hand over ResultBatches without waiting; a background task
+    flushes them in batches of rows, on size or time, using asyncpg COPY when available and
+    a multi-row INSERT otherwise. Every flush also maintains the per-session
+    time-bucketed rollups.
+    """
+
+    def __init__(self, batch_size: int = None, flush_interval_ms: int = None, max_backlog: int = None):
+        self.batch_size = batch_size or settings.RESULT_WRITER_BATCH_SIZE
+        self.flush_interval = (flush_interval_ms or settings.RESULT_WRITER_FLUSH_MS) / 1000
+        self.max_backlog = max_backlog or settings.RESULT_WRITER_MAX_BACKLOG
+        self._parts: Deque[Part] = deque()
+        self._backlog = 0  # Rows queued over every part
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        # One write at a time, in queue order. The write runs as its own task,
+        # so cancelling whoever awaits it never loses its rows.
+        self._flush_lock = asyncio.Lock()
+        self._writing: Optional[asyncio.Task] = None
+        self.flushes = 0
+        self.failed_flushes = 0
+        self.rows_written = 0
+        self.rows_dropped = 0
+        self.last_flush_rows = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self.total_flush_ms = 0.0
+
+    def submit(self, session_id: str, batch: ResultBatch):
+        """Queue results for persistence without waiting on the database.
+
+        The capture time of each seed's frame becomes its stored timestamp;
+        seeds not tied to a frame are stamped now.
+        """
+        if not len(batch):
+            return
+        missing = np.isnan(batch.captured_at)
+        if missing.any():
+            batch = batch.take(slice(None))
+            batch.captured_at = np.where(missing, time.time(), batch.captured_at)
+        self._parts.append((uuid.UUID(str(session_id)), batch))
+        self._backlog += len(batch)
+        overflow = self._backlog - self.max_backlog
+        while overflow > 0:
+            # Keep the backlog bounded if the database can't keep up
+            session_uuid, oldest = self._parts[0]
+            dropped = min(overflow, len(oldest))
+            if dropped == len(oldest):
+                self._parts.popleft()
+            else:
+                self._parts[0] = (session_uuid, oldest.take(slice(dropped, None)))
+            self._backlog -= dropped
+            self.rows_dropped += dropped
+            overflow -= dropped
+        if self._backlog >= self.batch_size:
+            self._wakeup.set()
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="result-writer")
+
+    async def stop(self):
+        """Stop the background task after flushing the backlog"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        # A write cut short above still runs; its rows come back on failure
+        await self._settle()
+        while self._backlog:
+            if not await self.flush():
+                break
+
+    async def drain(self) -> bool:
+        """Write every row queued so far, returning False if a write failed"""
+        # Rows of a write in flight count as queued: wait until they are committed or back in the queue
+        await self._settle()
+        remaining = self._backlog
+        while remaining > 0:
+            if not await self.flush():
+                return False
+            remaining -= self.batch_size
+        return True
+
+    async def _settle(self):
+        """Wait for the write in flight, if any, without raising its outcome"""
+        if self._writing is not None:
+            await asyncio.wait([self._writing])
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            while self._backlog:
+                if not await self.flush() or self._backlog < self.batch_size:
+                    break
+
+    async def flush(self) -> bool:
+        """Write up to one batch of queued rows, returning False if the write failed"""
+        async with self._flush_lock:
+            await self._settle()
+            count = min(self._backlog, self.batch_size)
+            if count == 0:
+                return True
+            parts: List[Part] = []
+            taken = 0
+            while taken < count:
+                session_uuid, batch = self._parts.popleft()
+                if len(batch) > count - taken:
+                    self._parts.appendleft((session_uuid, batch.take(slice(count - taken, None))))
+                    batch = batch.take(slice(None, count - taken))
+                parts.append((session_uuid, batch))
+                taken += len(batch)
+            self._backlog -= count
+            write = self._writing = asyncio.ensure_future(self._write(parts))
+            write.add_done_callback(functools.partial(self._write_done, parts, count, time.perf_counter()))
+            try:
+                await asyncio.shield(write)
+            except asyncio.CancelledError:
+                if not write.done():
+                    # Our caller was cancelled; the write goes on and settles its own rows
+                    raise
+                return False
+            except Exception:
+                return False
+            return True
+
+    def _write_done(self, parts: List[Part], count: int, started: float, write: asyncio.Task):
+        if self._writing is write:
+            self._writing = None
+        if write.cancelled() or write.exception() is not None:
+            error = "cancelled" if write.cancelled() else str(write.exception())
+            print(f"Error flushing {count} classification results: {error}")
+            self.failed_flushes += 1
+            # Put the rows back so the next flush retries them
+            self._parts.extendleft(reversed(parts))
+            self._backlog += count
+            return
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        DB_FLUSH_SECONDS.observe(elapsed_ms / 1000)
+        self.flushes += 1
+        self.rows_written += count
+        self.last_flush_rows = count
+        self.last_flush_ms = elapsed_ms
+        self.total_flush_ms += elapsed_ms
+        self.max_flush_ms = max(self.max_flush_ms, elapsed_ms)
+
+    async def _write(self, parts: List[Part]):
+        """Insert the rows and fold them into the rollup buckets in one transaction"""
+        rows = [row for session_uuid, batch in parts for row in db_rows(session_uuid, batch)]
+        async with engine.connect() as conn:
+            await upsert_rollups(conn, parts)
+            if conn.dialect.driver == "asyncpg":
+                # Runs inside the transaction opened by the rollup upsert
+                raw = await conn.get_raw_connection()
+                await raw.driver_connection.copy_records_to_table(
+                    Classification.__tablename__, records=rows, columns=COPY_COLUMNS
+                )
+            else:
+                await conn.execute(
+                    insert(Classification.__table__),
+                    [dict(zip(COPY_COLUMNS, row)) for row in rows],
+                )
+            await conn.commit()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Flush latency, rows per flush and backlog"""
+        return {
+            "backlog": self._backlog,
+            "flushes": self.flushes,
+            "failed_flushes": self.failed_flushes,
+            "rows_written": self.rows_written,
+            "rows_dropped": self.rows_dropped,
+            "last_flush_rows": self.last_flush_rows,
+            "avg_flush_rows": round(self.rows_written / self.flushes, 2) if self.flushes else 0.0,
+            "last_flush_ms": round(self.last_flush_ms, 3),
+            "avg_flush_ms": round(self.total_flush_ms / self.flushes, 3) if self.flushes else 0.0,
+            "max_flush_ms": round(self.max_flush_ms, 3),
+        }
+
+
+def db_rows(session_uuid: uuid.UUID, batch: ResultBatch) -> List[Tuple]:
+    """COPY_COLUMNS tuples of a batch: the only per-seed objects on the persistence path"""
+    return list(zip(
+        batch.seed_ids.tolist(),
+        batch.class_names(),
+        batch.sampled.tolist(),
+        batch.image_path_column().tolist(),
+        [session_uuid] * len(batch),
+        [datetime.fromtimestamp(captured_at) for captured_at in batch.captured_at.tolist()],
+    ))
+
+
+async def upsert_rollups(conn, parts: List[Part]):
+    """Aggregate rows per (session, resolution, bucket) and add them to the rollup table"""
+    buckets: Dict[Tuple, List[int]] = defaultdict(lambda: [0, 0, 0, 0])
+    for session_id, batch in parts:
+        if not len(batch):
+            continue
+        timestamps = batch.captured_at
+        # Buckets are aligned on local wall-clock time, like bucket_start
+        offset = datetime.fromtimestamp(timestamps[0]).astimezone().utcoffset().total_seconds()
+        accepted = batch.class_codes == CLASS_CODES["accept"]
+        rejected = batch.class_codes == CLASS_CODES["reject"]
+        for resolution in settings.ROLLUP_RESOLUTIONS:
+            keys = np.floor((timestamps + offset) / resolution).astype(np.int64)
+            _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+            totals = np.bincount(inverse)
+            accepted_counts = np.bincount(inverse, weights=accepted)
+            rejected_counts = np.bincount(inverse, weights=rejected)
+            sampled_counts = np.bincount(inverse, weights=batch.sampled)
+            for j, row in enumerate(first.tolist()):
+                start = bucket_start(datetime.fromtimestamp(timestamps[row]), resolution)
+                counts = buckets[(session_id, resolution, start)]
+                counts[0] += int(totals[j])
+                counts[1] += int(accepted_counts[j])
+                counts[2] += int(rejected_counts[j])
+                counts[3] += int(sampled_counts[j])
+    if not buckets:
+        return
+
+    values = [
+        {
+            "session_id": session_id,
+            "resolution": resolution,
+            "bucket_start": start,
+            "total": total,
+            "accepted": accepted,
+            "rejected": rejected,
+            "sampled": sampled,
+        }
+        for (session_id, resolution, start), (total, accepted, rejected, sampled) in buckets.items()
+    ]
+    dialect_insert = sqlite_insert if conn.dialect.name == "sqlite" else pg_insert
+    statement = dialect_insert(ClassificationRollup.__table__).values(values)
+    table = ClassificationRollup.__table__
+    statement = statement.on_conflict_do_update(
+        index_elements=[table.c.session_id, table.c.resolution, table.c.bucket_start],
+        set_={
+            column: table.c[column] + statement.excluded[column]
+            for column in ("total", "accepted", "rejected", "sampled")
+        },
+    )
+    await conn.execute(statement)
+
+
+result_writer = ResultWriter()
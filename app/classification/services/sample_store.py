@@ -0,0 +1,199 @@
+import asyncio
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, BinaryIO, Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+from classification.services.result_batch import ResultBatch
+from classification.services.pipeline import StageThread
+from classification.services.result_writer import result_writer
+from config import settings
+from utils.lazy_import import lazy_import
+
+cv2 = lazy_import("cv2")
+
+
+def format_image_ref(segment: str, offset: int, length: int) -> str:
+    """Build the image_path stored for a sampled seed"""
+    return f"{segment}:{offset}:{length}"
+
+
+def parse_image_ref(image_ref: str) -> Tuple[str, int, int]:
+    """Split an image_path into segment path (relative to the store), offset and length"""
+    segment, offset, length = image_ref.rsplit(":", 2)
+    return segment, int(offset), int(length)
+
+
+class _Segment:
+    """Open segment file of one session and its offset index"""
+
+    def __init__(self, root: Path, session_id: str, number: int):
+        self.name = f"{session_id}/segment-{number:06d}.seg"
+        self.number = number
+        path = root / self.name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.data: BinaryIO = open(path, "ab")
+        self.index: BinaryIO = open(path.with_suffix(".idx"), "ab")
+        self.size = self.data.tell()
+
+    def flush(self):
+        self.data.flush()
+        self.index.flush()
+
+    def close(self):
+        self.data.close()
+        self.index.close()
+
+
+class SegmentStore:
+    """Append-only packed storage of sampled images.
+
+    Images of a session are appended to large segment files under
+    SAMPLED_IMAGES_DIR/<session_id>/, rotated at SEGMENT_MAX_BYTES, with a
+    side index of "seed_id offset length" lines. Each image is addressed by
+    its segment, offset and length, so reading it back is a single pread.
+    """
+
+    def __init__(self, root: Path = None, max_segment_bytes: int = None):
+        self.root = Path(root or settings.SAMPLED_IMAGES_DIR)
+        self.max_segment_bytes = max_segment_bytes or settings.SEGMENT_MAX_BYTES
+        self._segments: Dict[str, _Segment] = {}
+        self._lock = threading.Lock()
+
+    def _segment_for(self, session_id: str, size: int) -> _Segment:
+        segment = self._segments.get(session_id)
+        if segment is None:
+            existing = sorted((self.root / session_id).glob("segment-*.seg"))
+            number = int(existing[-1].stem.split("-")[1]) if existing else 1
+            segment = self._segments[session_id] = _Segment(self.root, session_id, number)
+        if segment.size > 0 and segment.size + size > self.max_segment_bytes:
+            segment.close()
+            segment = self._segments[session_id] = _Segment(self.root, session_id, segment.number + 1)
+        return segment
+
+    def append(self, session_id: str, seed_id: str, data: bytes) -> str:
+        """Append an image to the session's current segment and return its reference"""
+        with self._lock:
+            segment = self._segment_for(str(session_id), len(data))
+            offset = segment.size
+            segment.data.write(data)
+            segment.index.write(f"{seed_id} {offset} {len(data)}\n".encode())
+            segment.size += len(data)
+            return format_image_ref(segment.name, offset, len(data))
+
+    def flush(self):
+        """Push buffered writes to the OS so they can be read back"""
+        with self._lock:
+            for segment in self._segments.values():
+                segment.flush()
+
+    def close_session(self, session_id: str):
+        """Close the open segment of a finished session"""
+        with self._lock:
+            segment = self._segments.pop(str(session_id), None)
+            if segment is not None:
+                segment.close()
+
+    def close(self):
+        with self._lock:
+            for segment in self._segments.values():
+                segment.close()
+            self._segments.clear()
+
+    def read(self, image_ref: str) -> bytes:
+        """Read one image back with a single pread"""
+        segment, offset, length = parse_image_ref(image_ref)
+        path = (self.root / segment).resolve()
+        if self.root.resolve() not in path.parents:
+            raise ValueError(f"Invalid image reference {image_ref}")
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            return os.pread(fd, length, offset)
+        finally:
+            os.close(fd)
+
+
+class SampleWriter:
+    """Background thread that encodes sampled frames and appends them to the segment store.
+
+    The result row of a sampled seed is flagged and handed to the result
+    writer once its image location is known; if the bounded queue overflows
+    or the write fails, the row is persisted unsampled instead of being lost.
+    Either way the submitter's callback learns whether the image was stored.
+    """
+
+    def __init__(self, store: SegmentStore = None, maxsize: int = None):
+        self.store = store or SegmentStore()
+        self.maxsize = maxsize or settings.SAMPLE_WRITER_QUEUE_SIZE
+        self.written = 0
+        self.bytes_written = 0
+        self._thread: Optional[StageThread] = None
+
+    def _ensure_started(self) -> StageThread:
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = StageThread("sample-writer", self._write, self.maxsize, on_drop=self._drop)
+            self._thread.start()
+        return self._thread
+
+    def submit(self, session_id: str, result: ResultBatch, image: np.ndarray,
+               on_settled: Optional[Callable[[bool], None]] = None):
+        """Queue the frame of a sampled seed (a one-row batch) without waiting for the write"""
+        loop = asyncio.get_running_loop()
+        self._ensure_started().offer((session_id, result, image, on_settled, loop))
+
+    async def drain(self, timeout: float = 5.0):
+        """Wait until the queued images are stored and their rows handed to the result writer"""
+        deadline = time.monotonic() + timeout
+        while self._thread is not None and self._thread.inbox.unfinished_tasks and time.monotonic() < deadline:
+            await asyncio.sleep(0.01)
+        # Rows come back through call_soon_threadsafe
+        await asyncio.sleep(0)
+
+    def _write(self, item):
+        session_id, result, image, on_settled, loop = item
+        stored = False
+        try:
+            _, buffer = cv2.imencode('.jpg', image)
+            data = buffer.tobytes()
+            image_ref = self.store.append(session_id, result.seed_id_strings()[0], data)
+            self.written += 1
+            self.bytes_written += len(data)
+            result = result.mark_sampled([image_ref])
+            stored = True
+        finally:
+            loop.call_soon_threadsafe(self._settle, session_id, result, stored, on_settled)
+            if self._thread is None or self._thread.inbox.empty():
+                self.store.flush()
+
+    def _drop(self, item):
+        session_id, result, _, on_settled, loop = item
+        loop.call_soon_threadsafe(self._settle, session_id, result, False, on_settled)
+
+    @staticmethod
+    def _settle(session_id: str, result: ResultBatch, stored: bool, on_settled: Optional[Callable[[bool], None]]):
+        result_writer.submit(session_id, result)
+        if on_settled is not None:
+            on_settled(stored)
+
+    def stop(self):
+        """Stop the thread, writing whatever is still queued"""
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.stop()
+            thread.join(timeout=2.0)
+            while not thread.inbox.empty():
+                self._write(thread.inbox.get_nowait())
+        self.store.close()
+
+    def snapshot(self) -> Dict[str, Any]:
+        data = {"written": self.written, "bytes_written": self.bytes_written}
+        if self._thread is not None:
+            data.update(self._thread.snapshot())
+        return data
+
+
+segment_store = SegmentStore()
+sample_writer = SampleWriter(segment_store)
@@ -0,0 +1,221 @@
+import functools
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from classification.services.result_batch import ResultBatch
+from classification.services.result_writer import result_writer
+from classification.services.sample_store import sample_writer
+from config import settings
+from monitoring.metrics import metrics
+from stats.counters import session_counters
+
+SAMPLES_TOTAL = metrics.counter(
+    "seedx_samples_total", "Sampling outcome of reservoir candidates", ("outcome",)
+)
+
+Candidate = Tuple[ResultBatch, int, Any]  # batch, row, frame image
+
+
+class Reservoir:
+    """Uniform random sample of fixed size over a stream (Vitter's algorithm R).
+
+    The frame of every admitted candidate is copied into the reservoir's
+    own buffer, one slot per item, so candidates held until their bucket
+    closes never keep a pooled frame from going back to its pool.
+    """
+
+    def __init__(self, size: int, rng: np.random.Generator):
+        self.size = size
+        self.rng = rng
+        self.seen = 0
+        self.items: List[Candidate] = []
+        self.frames: Optional[np.ndarray] = None  # Allocated with the first admitted frame
+
+    def _keep(self, slot: int, image: Any) -> Any:
+        """Copy of an admitted frame, in the reservoir's buffer when it fits"""
+        image = np.asarray(image)
+        if self.frames is None:
+            self.frames = np.empty((self.size,) + image.shape, dtype=image.dtype)
+        if self.frames.shape[1:] != image.shape or self.frames.dtype != image.dtype:
+            return image.copy()
+        np.copyto(self.frames[slot], image)
+        return self.frames[slot]
+
+    def offer(self, batch: ResultBatch, rows: np.ndarray, images: Sequence[Any]) -> List[Candidate]:
+        """Offer rows of a batch in stream order; returns earlier candidates they evicted.
+
+        The replacement draws of all rows are made at once, so candidates
+        are only built for the rows that actually enter the sample.
+        """
+        free = min(len(rows), self.size - len(self.items))
+        for row in rows[:free].tolist():
+            self.items.append((batch, row, self._keep(len(self.items), images[row])))
+        evicted = []
+        rest = rows[free:]
+        if len(rest):
+            slots = self.rng.integers(0, self.seen + free + np.arange(1, len(rest) + 1))
+            hits = slots < self.size
+            for row, slot in zip(rest[hits].tolist(), slots[hits].tolist()):
+                if self.items[slot][0] is not batch:
+                    evicted.append(self.items[slot])
+                # An evicted candidate only needs its row, so its slot is reused in place
+                self.items[slot] = (batch, row, self._keep(slot, images[row]))
+        self.seen += len(rows)
+        return evicted
+
+
+class TokenBucket:
+    """Rate cap on stored samples: `rate` per second, bursting up to `capacity`"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def take(self, wanted: int) -> int:
+        """Take up to `wanted` whole tokens and return how many were granted"""
+        if self.rate <= 0:
+            return wanted
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        granted = min(wanted, int(self.tokens))
+        self.tokens -= granted
+        return granted
+
+    def refund(self, count: int):
+        """Give back tokens that were granted but not spent"""
+        if self.rate > 0:
+            self.tokens = min(self.capacity, self.tokens + count)
+
+
+class _SessionSample:
+    """Open time bucket of one session: one reservoir per classification"""
+
+    def __init__(self, bucket: int):
+        self.bucket = bucket
+        self.strata: Dict[int, Reservoir] = {}  # by class code
+
+
+class SamplingStrategy:
+    """Bounded, stratified choice of the seeds whose images are kept.
+
+    Every session's stream is cut into SAMPLING_BUCKET_SECONDS time buckets,
+    and within each bucket every classification has its own reservoir of
+    SAMPLING_RESERVOIR_SIZE seeds, so each (class, period) stratum gets a
+    uniform sample however fast the lot runs and rare classes are never
+    crowded out. Candidates wait in memory, their rows held back, until the
+    bucket closes: only then are images written, so nothing stored is ever
+    evicted. A global SAMPLING_MAX_PER_SECOND token bucket caps the image
+    writes; the seeds it turns away, like those the reservoirs leave out or
+    the sample writer has to drop, are persisted as unsampled rows. Only
+    stored images count as sampled, and a dropped one gives its token back.
+
+    Seeds are therefore flagged as sampled when their bucket closes, not in
+    the live result stream.
+    """
+
+    def __init__(
+        self,
+        reservoir_size: int = None,
+        bucket_seconds: float = None,
+        max_per_second: float = None,
+        seed: int = None,
+    ):
+        self.reservoir_size = reservoir_size or settings.SAMPLING_RESERVOIR_SIZE
+        self.bucket_seconds = bucket_seconds or settings.SAMPLING_BUCKET_SECONDS
+        max_per_second = settings.SAMPLING_MAX_PER_SECOND if max_per_second is None else max_per_second
+        # A whole bucket's worth of tokens, so a bucket closing can spend what it accrued
+        self.rate_limit = TokenBucket(max_per_second, max(1.0, max_per_second * self.bucket_seconds))
+        self.rng = np.random.default_rng(seed)
+        self.sessions: Dict[str, _SessionSample] = {}
+        self.kept = 0
+        self.rate_limited = 0
+        self.dropped = 0
+
+    def offer(self, session_id: str, batch: ResultBatch, images: Sequence[Any]):
+        """Route a batch tied to its frames: candidates are held, every other row is persisted"""
+        session_id = str(session_id)
+        captured_at = batch.captured_at[0] if len(batch) else np.nan
+        bucket = int((time.time() if np.isnan(captured_at) else captured_at) // self.bucket_seconds)
+        sample = self.sessions.get(session_id)
+        if sample is None or bucket > sample.bucket:
+            if sample is not None:
+                self._close(session_id, sample)
+            sample = self.sessions[session_id] = _SessionSample(bucket)
+
+        evicted: List[Candidate] = []
+        for code in np.unique(batch.class_codes).tolist():
+            stratum = sample.strata.get(code)
+            if stratum is None:
+                stratum = sample.strata[code] = Reservoir(self.reservoir_size, self.rng)
+            evicted.extend(stratum.offer(batch, np.flatnonzero(batch.class_codes == code), images))
+        held = np.zeros(len(batch), dtype=bool)
+        for stratum in sample.strata.values():
+            held[[row for candidate_batch, row, _ in stratum.items if candidate_batch is batch]] = True
+        if not held.all():
+            result_writer.submit(session_id, batch.take(np.flatnonzero(~held)))
+        if evicted:
+            result_writer.submit(session_id, ResultBatch.gather([(owner, row) for owner, row, _ in evicted]))
+
+    def _close(self, session_id: str, sample: _SessionSample):
+        """Store the sample of a finished bucket, as far as the rate cap allows"""
+        strata = [list(reservoir.items) for reservoir in sample.strata.values()]
+        for items in strata:
+            self.rng.shuffle(items)
+        # Interleave the classes so a short rate budget is still shared between them
+        candidates = [items[i] for i in range(self.reservoir_size) for items in strata if i < len(items)]
+        granted = self.rate_limit.take(len(candidates))
+        settled = functools.partial(self._settled, session_id)
+        for batch, row, image in candidates[:granted]:
+            # The writer flags the row as sampled once its image is stored
+            sample_writer.submit(session_id, batch.take([row]), image, settled)
+        if granted < len(candidates):
+            result_writer.submit(session_id, ResultBatch.gather([(batch, row) for batch, row, _ in candidates[granted:]]))
+        self.rate_limited += len(candidates) - granted
+        SAMPLES_TOTAL.inc(len(candidates) - granted, "rate_limited")
+
+    def _settled(self, session_id: str, stored: bool):
+        """Count a sample once its image is stored; one the writer dropped gives its token back"""
+        if stored:
+            counters = session_counters.get(session_id)
+            # A write settling after its session ended must not bring its counters back
+            if counters is not None:
+                counters.sampled += 1
+            self.kept += 1
+            SAMPLES_TOTAL.inc(1, "kept")
+        else:
+            self.rate_limit.refund(1)
+            self.dropped += 1
+            SAMPLES_TOTAL.inc(1, "dropped")
+
+    def close_session(self, session_id: str):
+        """Store the sample of a session's last, partial bucket"""
+        sample = self.sessions.pop(str(session_id), None)
+        if sample is not None:
+            self._close(str(session_id), sample)
+
+    def flush(self):
+        """Close the open bucket of every session, e.g. on shutdown"""
+        for session_id in list(self.sessions):
+            self.close_session(session_id)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "reservoir_size": self.reservoir_size,
+            "bucket_seconds": self.bucket_seconds,
+            "max_per_second": self.rate_limit.rate,
+            "open_sessions": len(self.sessions),
+            "candidates": sum(
+                len(reservoir.items) for sample in self.sessions.values() for reservoir in sample.strata.values()
+            ),
+            "kept": self.kept,
+            "rate_limited": self.rate_limited,
+            "dropped": self.dropped,
+        }
+
+
+sampler = SamplingStrategy()
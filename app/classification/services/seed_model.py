@@ -0,0 +1,58 @@
+import random
+import time
+from typing import Any, List, Sequence
+
+import numpy as np
+
+from classification.services.result_batch import CLASS_CODES
+from config import settings
+
+
+class SeedModel:
+    """Interface of the models used by ClassificationService.
+
+    A model receives a whole batch of frames (JPEG bytes or decoded BGR
+    arrays) and returns one label per frame, or one class code per frame
+    from predict_codes().
+    """
+
+    labels: Sequence[str] = ("accept", "reject")
+
+    def predict(self, batch: List[Any]) -> List[str]:
+        raise NotImplementedError
+
+    def predict_codes(self, batch: List[Any]) -> np.ndarray:
+        """Class codes (see result_batch.CLASS_NAMES) of a batch, as a uint8 array"""
+        return np.array([CLASS_CODES[label] for label in self.predict(batch)], dtype=np.uint8)
+
+    def warmup(self):
+        """Run a dummy batch so the first real batch doesn't pay for lazy initialization"""
+        self.predict([np.zeros((settings.CAMERA_HEIGHT, settings.CAMERA_WIDTH, 3), dtype=np.uint8)])
+
+
+class MockModel(SeedModel):
+    """Mock GPU model used when no checkpoint is configured"""
+
+    def predict(self, batch: List[Any]) -> List[str]:
+        # Simulate GPU processing delay (1-5ms per image)
+        processing_time = random.uniform(0.001, 0.005) * len(batch)
+        time.sleep(processing_time)
+
+        # Mock classification (80% accept rate)
+        return ["accept" if random.random() < 0.8 else "reject" for _ in batch]
+
+    def predict_codes(self, batch: List[Any]) -> np.ndarray:
+        time.sleep(random.uniform(0.001, 0.005) * len(batch))
+        accepted = np.random.random(len(batch)) < 0.8
+        return np.where(accepted, CLASS_CODES["accept"], CLASS_CODES["reject"]).astype(np.uint8)
+
+
+def load_model() -> SeedModel:
+    """Build the configured model: the checkpoint if one is set, the mock otherwise"""
+    if settings.MODEL_CHECKPOINT_PATH:
+        # Torch is only imported once a checkpoint is actually loaded
+        from classification.services.torch_model import TorchModel
+
+        print(f"Loading model from {settings.MODEL_CHECKPOINT_PATH}")
+        return TorchModel(settings.MODEL_CHECKPOINT_PATH)
+    return MockModel()
@@ -1,24 +1,156 @@
-from fastapi import WebSocket, WebSocketDisconnect
-from models.classification import Classification
-from classification.services.connection_manager import ConnectionManager
-import cv2
 import asyncio
-import numpy as np
-from classification.services.sorter import ClassificationService
+import time
+from collections import deque
+from typing import Deque, Dict, List
+from fastapi import WebSocket
+from classification.services.connection_manager import ConnectionManager
+from classification.services.batching import BatchingEngine
+from classification.services.lanes import CameraLane, LaneBusyError, lanes
+from classification.services.preview import PreviewController
+from classification.services.result_batch import CLASS_NAMES, ResultBatch
+from classification.services.result_protocol import ResultEncoder
+from classification.services.sampling import sampler
 from sessions.service import get_session
-from datetime import datetime
-from config import settings
+from stats.counters import session_counters
+from monitoring.metrics import metrics
+
+CAPTURE_TO_SEND_SECONDS = metrics.histogram(
+    "seedx_capture_to_send_seconds", "Latency from frame capture to its results being queued for clients", ("lane",)
+)
+RESULTS_TOTAL = metrics.counter("seedx_results_total", "Classified seeds", ("classification",))
+FAILED_FRAMES = metrics.counter(
+    "seedx_classify_failed_frames_total", "Frames whose inference batch raised, skipped without results", ("lane",)
+)
+
+manager = ConnectionManager()
+
+
+class LaneSorter:
+    """Classifies the frames of one lane for the session bound to it, once for all its clients.
+
+    Every frame is classified, counted, offered to the sampler (which has
+    it persisted) exactly once however many /classify clients watch the
+    session; the results are encoded once per protocol and queued on the
+    outbox of every client. Runs while the session keeps the lane and has
+    at least one client.
+    """
+
+    def __init__(self, lane: CameraLane, session_id: str, engine: BatchingEngine):
+        self.lane = lane
+        self.session_id = str(session_id)
+        self.engine = engine
+        self.encoders: Dict[WebSocket, ResultEncoder] = {}
+        self.done = asyncio.Event()
+        self._task = asyncio.create_task(self._run(), name=f"sorter-{lane.name}")
+
+    async def _run(self):
+        try:
+            async for groups in classify_frames(self.engine, self.lane):
+                if self.lane.session_id != self.session_id:
+                    # The session ended and released its lane; its results are settled
+                    break
+                self.publish(groups)
+        except Exception as e:
+            print(f"Error sorting lane {self.lane.name}: {str(e)}")
+        finally:
+            self.done.set()
+
+    def publish(self, groups: List):
+        """Count, sample and persist the results of a group of frames, and queue them for every client"""
+        # Frames whose batch was dropped by inference have no result row
+        groups = [(frame, row) for frame, row in groups if row is not None]
+        if not groups:
+            return
+        batch = ResultBatch.gather([row for _, row in groups])
+        batch.tie_to_frames(
+            [frame.index for frame, _ in groups],
+            [frame.captured_at for frame, _ in groups],
+            self.lane.seed_ids.next_ids(len(batch)),
+        )
+        session_counters.record(self.session_id, batch)
+        # Persisted in the background; nothing here waits on the database.
+        # Seeds held as sample candidates are persisted when their bucket closes.
+        sampler.offer(self.session_id, batch, [frame.image for frame, _ in groups])
+        for code, count in enumerate(batch.counts().tolist()):
+            if count:
+                RESULTS_TOTAL.inc(count, CLASS_NAMES[code])
+
+        messages = {}
+        for websocket, encoder in list(self.encoders.items()):
+            if encoder.key not in messages:
+                messages[encoder.key] = encoder.encode(batch)
+            if not manager.offer_result(websocket, messages[encoder.key]):
+                self.encoders.pop(websocket, None)
+        queued_at = time.time()
+        for frame, _ in groups:
+            CAPTURE_TO_SEND_SECONDS.observe(queued_at - frame.captured_at, self.lane.name)
+            self.lane.record(queued_at - frame.captured_at)
+
+    async def stop(self):
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+
+class LaneSorters:
+    """The running LaneSorter of every lane, started by its session's first client"""
+
+    def __init__(self):
+        self.sorters: Dict[str, LaneSorter] = {}
+
+    def subscribe(self, lane: CameraLane, session_id: str, engine: BatchingEngine,
+                  websocket: WebSocket, encoder: ResultEncoder) -> LaneSorter:
+        sorter = self.sorters.get(lane.name)
+        if sorter is None or sorter.done.is_set() or sorter.session_id != str(session_id):
+            if sorter is not None:
+                # Left over from a session that ended; its clients see it finish
+                sorter._task.cancel()
+            sorter = self.sorters[lane.name] = LaneSorter(lane, session_id, engine)
+        sorter.encoders[websocket] = encoder
+        return sorter
+
+    async def unsubscribe(self, sorter: LaneSorter, websocket: WebSocket):
+        """Remove a client, stopping the sorter with its last one"""
+        sorter.encoders.pop(websocket, None)
+        if not sorter.encoders:
+            if self.sorters.get(sorter.lane.name) is sorter:
+                del self.sorters[sorter.lane.name]
+            await sorter.stop()
+
+    def snapshot(self) -> Dict[str, Dict]:
+        return {
+            name: {"session_id": sorter.session_id, "clients": len(sorter.encoders)}
+            for name, sorter in self.sorters.items()
+        }
+
+
+sorters = LaneSorters()
 
-manager = ConnectionManager()  
 
 async def sorter_socket(
     websocket: WebSocket,
     session_id: str,
-    classifier: ClassificationService,
+    engine: BatchingEngine,
     db,
+    protocol: str = "json",
+    compress: str = None,
+    preview: PreviewController = None,
 ):
-    """WebSocket endpoint for real-time classification"""
-    
+    """WebSocket endpoint for real-time classification.
+
+    The socket only subscribes: results come from the lane's LaneSorter,
+    and the preview from the lane's camera producer.
+    """
+    preview = preview or PreviewController()
+
+    try:
+        encoder = ResultEncoder(protocol=protocol, compress=compress)
+    except ValueError as e:
+        await manager.close_connection(websocket, code=1008, reason=str(e))
+        return
+
     # Validate session exists and is active
     session = await get_session(db, session_id)
     if not session:
@@ -27,151 +159,134 @@ async def sorter_socket(
     if session.status != "active":
         await manager.close_connection(websocket, code=1008, reason="Session is not active")
         return
-    
-    try:  
+    if session.end_time is not None:
+        await manager.close_connection(websocket, code=1008, reason="Session has ended")
+        return
+    try:
+        # Already bound since the session started, unless the server restarted since
+        lane = lanes.bind(session_id, session.lane or lanes.default)
+    except (KeyError, LaneBusyError) as e:
+        await manager.close_connection(websocket, code=1008, reason=e.args[0])
+        return
+
+    sorter = None
+    waiters = []
+    try:
         # Connect with session metadata
         await manager.connect(websocket, metadata={
             "session_id": session_id,
             "seed_lot": session.seed_lot,
-            "status": session.status
+            "status": session.status,
+            "lane": lane.name,
+            "preview": preview,
         })
-        
-        stream = stream_processing(classifier=classifier)
-        async for results in stream:
-            if not results:
-                continue
-                
-            try:
-                # Handle both single result and list of results
-                if isinstance(results, list):
-                    for result in results:
-                        try:
-                            # Convert Pydantic model to dict for JSON serialization
-                            data = result.model_dump()
-                            await manager.send_json(websocket, data)
-                            
-                            # Create SQLAlchemy model instance
-                            db_classification = Classification(
-                                seed_id=data["seed_id"],
-                                classify=data["classification"],
-                                is_sampled=data["is_sampled"],
-                                image_path=data["image_path"],
-                                session_id=session_id,
-                                timestamp=datetime.now()
-                            )
-                            db.add(db_classification)
-                        except WebSocketDisconnect:
-                            print("Client disconnected during result processing")
-                            raise
-                        except Exception as e:
-                            print(f"Error processing single result: {str(e)}")
-                            continue
-                else:
-                    try:
-                        # Convert Pydantic model to dict for JSON serialization
-                        data = results.model_dump()
-                        await manager.send_json(websocket, data)
-                        
-                        # Create SQLAlchemy model instance
-                        db_classification = Classification(
-                            seed_id=data["seed_id"],
-                            classify=data["classification"],
-                            is_sampled=data["is_sampled"],
-                            image_path=data["image_path"],
-                            session_id=session_id,
-                            timestamp=datetime.now()
-                        )
-                        db.add(db_classification)
-                    except WebSocketDisconnect:
-                        print("Client disconnected during result processing")
-                        raise
-                    except Exception as e:
-                        print(f"Error processing single result: {str(e)}")
-                        continue
-                
-                try:
-                    await db.commit()
-                except Exception as e:
-                    print(f"Error committing to database: {str(e)}")
-                    await db.rollback()
-                    continue
-                    
-            except WebSocketDisconnect:
-                print("Client disconnected")
-                break
-            except Exception as e:
-                print(f"Error processing results: {str(e)}")
-                continue
-        
-    except WebSocketDisconnect:                                                   
-        print("Client disconnected normally")
+        # A session resumed after a restart keeps counting from what is stored,
+        # not from zero; done before the lane's sorter records anything
+        await session_counters.restore(db, session_id)
+        sorter = sorters.subscribe(lane, session_id, engine, websocket, encoder)
+        lanes.attach(lane, session_id)
+
+        # Until the session ends or the client goes away
+        waiters = [
+            asyncio.ensure_future(sorter.done.wait()),
+            asyncio.ensure_future(manager.wait_closed(websocket)),
+        ]
+        if preview.enabled:
+            waiters.append(asyncio.ensure_future(forward_previews(websocket, lane, preview)))
+        done, _ = await asyncio.wait(waiters, return_when=asyncio.FIRST_COMPLETED)
+        for waiter in done:
+            if waiter.exception() is not None:
+                print(f"Error streaming preview: {str(waiter.exception())}")
     except Exception as e:
         print(f"Error in sorter_socket: {str(e)}")
     finally:
         # Ensure we clean up properly
+        for waiter in waiters:
+            waiter.cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+        if sorter is not None:
+            lanes.detach(lane, session_id)
+            await sorters.unsubscribe(sorter, websocket)
         await manager.close_connection(websocket)
 
-def create_mock_frame():
-    """Create a mock frame for testing"""
-    # Create a frame with configured dimensions
-    frame = np.zeros((settings.CAMERA_HEIGHT, settings.CAMERA_WIDTH, 3), dtype=np.uint8)
-    for i in range(settings.CAMERA_HEIGHT):
-        frame[i, :, 0] = int(255 * i / settings.CAMERA_HEIGHT)  # Red gradient
-        frame[i, :, 1] = int(255 * (settings.CAMERA_HEIGHT - i) / settings.CAMERA_HEIGHT)  # Green gradient
-        frame[i, :, 2] = 128  # Constant blue
-    return frame
-
-async def stream_processing(classifier: ClassificationService): 
-    """Capture video stream from webcam and process frames for classification"""
-    
-    if settings.USE_MOCK_CAMERA:
-        print("Using mock camera")
-        while True:
-            # Create a mock frame
-            frame = create_mock_frame()
-            _, buffer = cv2.imencode('.jpg', frame)
-            await manager.broadcast_bytes(buffer.tobytes())
-            await asyncio.sleep(1.0 / settings.CAMERA_FPS)  # Control FPS
-            results = classifier.process_image(buffer.tobytes())
-            yield results
-    else:
-        # Get camera device from environment variable
-        camera_device = settings.CAMERA_DEVICE
+
+async def forward_previews(websocket: WebSocket, lane: CameraLane, preview: PreviewController):
+    """Forward the lane's preview JPEGs to one client, at the variant and rate it can take"""
+    subscription = lane.producer.subscribe(*preview.current())
+    try:
+        async for frame in subscription:
+            jpeg = preview.select(frame)
+            if jpeg is None:
+                continue
+            # Previews go through the connection's drop-oldest outbox, so a
+            # slow client loses preview frames instead of stalling anyone else
+            if not manager.offer(websocket, jpeg):
+                break
+            if preview.observe(manager.send_lag(websocket)):
+                subscription.set_preview(*preview.current())
+    finally:
+        # Detach without touching the device so other subscribers keep streaming
+        subscription.close()
+
+
+async def classify_frames(engine: BatchingEngine, lane: CameraLane):
+    """Classify every frame of the lane's camera producer.
+
+    Yields lists of (frame, (result batch, row)); frames whose results became ready
+    together (typically one engine batch) are yielded as one list, in frame order.
+    A frame whose batch was dropped or raised (a model error, a worker that kept
+    crashing) comes with None instead, so one bad batch never ends the stream.
+    """
+    subscription = lane.producer.subscribe(None)
+    # Classifications in flight, in frame order. The semaphore bounds them so a slow
+    # engine makes the subscription drop frames instead of letting requests pile up.
+    in_flight: Deque = deque()
+    arrived = asyncio.Event()
+    slots = asyncio.Semaphore(engine.max_batch_size * 2)
+
+    async def forward_frames():
         try:
-            # Try to convert to integer if it's a number
-            camera_index = int(camera_device)
-            # On macOS, we use the default backend which will use AVFoundation
-            cap = cv2.VideoCapture(camera_index)
-        except ValueError:
-            # If it's not a number, use it as a device path
-            camera_index = camera_device
-            cap = cv2.VideoCapture(camera_index)
+            async for frame in subscription:
+                await slots.acquire()
+                # The raw pooled frame is handed over by reference, never re-encoded
+                in_flight.append((frame, asyncio.ensure_future(engine.classify(frame.image, lane.name))))
+                arrived.set()
+        finally:
+            in_flight.append(None)
+            arrived.set()
+
+    failures = []  # The last inference error, logged once for all the frames of its batch
 
+    async def take(item):
+        frame, pending = item
         try:
-            if not cap.isOpened():
-                raise Exception(f"Failed to open camera at {camera_device}")
-                
-            # Set camera properties
-            cap.set(cv2.CAP_PROP_FRAME_WIDTH, settings.CAMERA_WIDTH)
-            cap.set(cv2.CAP_PROP_FRAME_HEIGHT, settings.CAMERA_HEIGHT)
-            cap.set(cv2.CAP_PROP_FPS, settings.CAMERA_FPS)
-                
-            while True:                                                  
-                ret, frame = cap.read()                                  
-                if not ret:                                              
-                    cap.set(cv2.CAP_PROP_POS_FRAMES, 0)                  
-                    continue                                             
-                _, buffer = cv2.imencode('.jpg', frame)                  
-                await manager.broadcast_bytes(buffer.tobytes())
-                await asyncio.sleep(1.0 / settings.CAMERA_FPS)  # Control FPS
-                results = classifier.process_image(buffer.tobytes())
-                yield results     
-                
+            return frame, await pending
         except Exception as e:
-            cap.release()  # Release the camera resource
-            raise Exception(f"Stream processing failed: {str(e)}")  # This will break the application
+            FAILED_FRAMES.inc(1, lane.name)
+            if not failures or failures[-1] is not e:
+                print(f"Error classifying frames of lane {lane.name}, skipping them: {str(e)}")
+                failures[:] = [e]
+            return frame, None
         finally:
-            if cap.isOpened():
-                cap.release()  # Ensure camera is released even if an error occurs
-        
-    
\ No newline at end of file
+            slots.release()
+
+    forwarder = asyncio.create_task(forward_frames())
+    try:
+        while True:
+            while not in_flight:
+                arrived.clear()
+                await arrived.wait()
+            item = in_flight.popleft()
+            if item is None:
+                await forwarder
+                break
+            groups = [await take(item)]
+            while in_flight and in_flight[0] is not None and in_flight[0][1].done():
+                groups.append(await take(in_flight.popleft()))
+            yield groups
+    finally:
+        forwarder.cancel()
+        for item in in_flight:
+            if item is not None:
+                item[1].cancel()
+        subscription.close()
@@ -0,0 +1,95 @@
+from typing import Any, List, Sequence
+
+import cv2
+import numpy as np
+import torch
+
+from classification.services.result_batch import CLASS_CODES
+from classification.services.seed_model import SeedModel
+from config import settings
+
+
+class TorchModel(SeedModel):
+    """Torch classifier loaded from a checkpoint.
+
+    Frames are written straight into one preallocated (pinned when running on
+    CUDA) NHWC uint8 staging buffer; conversion to a normalized float NCHW
+    tensor is then done for the whole batch at once, followed by a single
+    forward pass under torch.inference_mode().
+    """
+
+    def __init__(
+        self,
+        checkpoint_path: str,
+        device: str = None,
+        input_size: int = None,
+        max_batch_size: int = None,
+        labels: Sequence[str] = None,
+    ):
+        self.device = torch.device(device or resolve_model_device())
+        self.input_size = input_size or settings.MODEL_INPUT_SIZE
+        self.max_batch_size = max_batch_size or settings.MAX_BATCH_SIZE
+        self.labels = labels or settings.MODEL_LABELS.split(",")
+        # Model output index -> class code
+        self.codes = np.array([CLASS_CODES[label] for label in self.labels], dtype=np.uint8)
+        self.model = load_checkpoint(checkpoint_path, self.device)
+
+        self._staging = torch.empty(
+            (self.max_batch_size, self.input_size, self.input_size, 3),
+            dtype=torch.uint8,
+            pin_memory=self.device.type == "cuda",
+        )
+        self._staging_np = self._staging.numpy()
+        self._mean = torch.tensor(settings.MODEL_MEAN, device=self.device).view(1, 3, 1, 1) * 255
+        self._std = torch.tensor(settings.MODEL_STD, device=self.device).view(1, 3, 1, 1) * 255
+
+    def preprocess(self, batch: List[Any]) -> torch.Tensor:
+        """Turn a batch of frames into one normalized float NCHW tensor"""
+        if len(batch) > self.max_batch_size:
+            raise ValueError(f"Batch of {len(batch)} exceeds the staging buffer ({self.max_batch_size})")
+        size = (self.input_size, self.input_size)
+        for i, image in enumerate(batch):
+            if isinstance(image, (bytes, bytearray, memoryview)):
+                image = cv2.imdecode(np.frombuffer(image, np.uint8), cv2.IMREAD_COLOR)
+            cv2.resize(image, size, dst=self._staging_np[i], interpolation=cv2.INTER_AREA)
+
+        tensor = self._staging[:len(batch)].to(self.device, non_blocking=True)
+        # BGR NHWC uint8 -> RGB NCHW float, normalized for the whole batch at once
+        tensor = tensor.flip(-1).permute(0, 3, 1, 2).float()
+        return tensor.sub_(self._mean).div_(self._std)
+
+    def predict(self, batch: List[Any]) -> List[str]:
+        with torch.inference_mode():
+            logits = self.model(self.preprocess(batch))
+            indices = logits.argmax(dim=1).tolist()
+        return [self.labels[i] for i in indices]
+
+    def predict_codes(self, batch: List[Any]) -> np.ndarray:
+        with torch.inference_mode():
+            logits = self.model(self.preprocess(batch))
+            indices = logits.argmax(dim=1).cpu().numpy()
+        return self.codes[indices]
+
+    def warmup(self):
+        dummy = np.zeros((self.input_size, self.input_size, 3), dtype=np.uint8)
+        self.predict([dummy] * self.max_batch_size)
+        if self.device.type == "cuda":
+            torch.cuda.synchronize(self.device)
+
+
+def resolve_model_device() -> str:
+    """Resolve the configured MODEL_DEVICE, where 'auto' prefers CUDA when available"""
+    if settings.MODEL_DEVICE == "auto":
+        return "cuda" if torch.cuda.is_available() else "cpu"
+    return settings.MODEL_DEVICE
+
+
+def load_checkpoint(checkpoint_path: str, device: torch.device) -> torch.nn.Module:
+    """Load a TorchScript archive or a pickled nn.Module in eval mode"""
+    try:
+        model = torch.jit.load(checkpoint_path, map_location=device)
+    except RuntimeError:
+        model = torch.load(checkpoint_path, map_location=device, weights_only=False)
+    if not isinstance(model, torch.nn.Module):
+        raise ValueError(f"Checkpoint {checkpoint_path} does not contain a model")
+    return model.to(device).eval()
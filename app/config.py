@@ -7,13 +7,41 @@ class Settings(BaseSettings):
     # Batch processing
     MAX_BATCH_SIZE: ClassVar[int] = 32
     MAX_LATENCY_MS: ClassVar[int] = 100
+    INFERENCE_PROCESSES: int = int(os.getenv("INFERENCE_PROCESSES", "0"))  # 0 = in-process inference thread
+    INFERENCE_START_METHOD: str = os.getenv("INFERENCE_START_METHOD", "spawn")
+    INFERENCE_JOB_RETRIES: int = int(os.getenv("INFERENCE_JOB_RETRIES", "1"))  # Re-dispatches after a worker crash
+    INFERENCE_MAX_IN_FLIGHT: int = int(os.getenv("INFERENCE_MAX_IN_FLIGHT", "0"))  # Batches dispatched at once; 0 = 2 per worker
     
+    # Model
+    MODEL_CHECKPOINT_PATH: str = os.getenv("MODEL_CHECKPOINT_PATH", "")
+    MODEL_DEVICE: str = os.getenv("MODEL_DEVICE", "auto")  # auto, cpu, cuda, cuda:1...
+    MODEL_INPUT_SIZE: int = int(os.getenv("MODEL_INPUT_SIZE", "224"))
+    MODEL_LABELS: str = os.getenv("MODEL_LABELS", "accept,reject")  # Output index order
+    MODEL_MEAN: ClassVar[tuple] = (0.485, 0.456, 0.406)  # RGB
+    MODEL_STD: ClassVar[tuple] = (0.229, 0.224, 0.225)  # RGB
+
     # Sampling
-    SAMPLING_RATE: ClassVar[float] = 0.05  # 5%
+    SAMPLING_RESERVOIR_SIZE: int = int(os.getenv("SAMPLING_RESERVOIR_SIZE", "8"))  # Seeds kept per class per bucket
+    SAMPLING_BUCKET_SECONDS: float = float(os.getenv("SAMPLING_BUCKET_SECONDS", "60"))
+    SAMPLING_MAX_PER_SECOND: float = float(os.getenv("SAMPLING_MAX_PER_SECOND", "5"))  # Stored images, all sessions; 0 = no cap
+    SEED_ID_WORKER: int = int(os.getenv("SEED_ID_WORKER", "0"))  # 0-63, distinct per app instance sharing a database
     
     # Storage
     DATA_DIR: Path = Path(os.getenv("DATA_DIR", "./data"))
     SAMPLED_IMAGES_DIR: Path = DATA_DIR / "sampled_images"
+    SEGMENT_MAX_BYTES: int = int(os.getenv("SEGMENT_MAX_BYTES", str(256 * 1024 * 1024)))
+    SAMPLE_WRITER_QUEUE_SIZE: int = int(os.getenv("SAMPLE_WRITER_QUEUE_SIZE", "256"))
+    THUMBNAIL_DIR: Path = DATA_DIR / "thumbnails"
+    THUMBNAIL_SIZE: int = int(os.getenv("THUMBNAIL_SIZE", "160"))  # Longest side in pixels
+    THUMBNAIL_QUALITY: int = int(os.getenv("THUMBNAIL_QUALITY", "80"))
+    THUMBNAIL_MEMORY_CACHE_BYTES: int = int(os.getenv("THUMBNAIL_MEMORY_CACHE_BYTES", str(32 * 1024 * 1024)))
+    THUMBNAIL_DISK_CACHE_BYTES: int = int(os.getenv("THUMBNAIL_DISK_CACHE_BYTES", str(512 * 1024 * 1024)))
+    SAMPLED_PAGE_MAX_LIMIT: int = int(os.getenv("SAMPLED_PAGE_MAX_LIMIT", "500"))
+    ARCHIVE_DIR: Path = DATA_DIR / "archive"
+    ARCHIVE_AFTER_SECONDS: float = float(os.getenv("ARCHIVE_AFTER_SECONDS", str(7 * 24 * 3600)))  # Since the session ended
+    ARCHIVE_INTERVAL_SECONDS: float = float(os.getenv("ARCHIVE_INTERVAL_SECONDS", "600"))  # 0 = no archival
+    EXPORT_CHUNK_ROWS: int = int(os.getenv("EXPORT_CHUNK_ROWS", "10000"))  # Rows read and encoded at a time
+    ARCHIVE_CHUNK_ROWS: int = int(os.getenv("ARCHIVE_CHUNK_ROWS", "50000"))  # Rows per Parquet row group
     
     # Database
     POSTGRES_USER: str = os.getenv("POSTGRES_USER", "postgres")
@@ -22,18 +50,51 @@ class Settings(BaseSettings):
     POSTGRES_PORT: str = os.getenv("POSTGRES_PORT", "5432")
     POSTGRES_DB: str = os.getenv("POSTGRES_DB", "seedx")
     DATABASE_URL: str = f"postgresql+asyncpg://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_SERVER}:{POSTGRES_PORT}/{POSTGRES_DB}"
+    DATABASE_ECHO: bool = os.getenv("DATABASE_ECHO", "true").lower() == "true"
+    DB_RESET_ON_STARTUP: bool = os.getenv("DB_RESET_ON_STARTUP", "false").lower() == "true"  # Drops every table!
+
+    # Startup
+    STARTUP_WARMUP: bool = os.getenv("STARTUP_WARMUP", "true").lower() == "true"  # Load the model before ready
+    STARTUP_WARMUP_TIMEOUT_SECONDS: float = float(os.getenv("STARTUP_WARMUP_TIMEOUT_SECONDS", "120"))
+
+    # Result persistence
+    RESULT_WRITER_BATCH_SIZE: int = int(os.getenv("RESULT_WRITER_BATCH_SIZE", "500"))
+    RESULT_WRITER_FLUSH_MS: int = int(os.getenv("RESULT_WRITER_FLUSH_MS", "250"))
+    RESULT_WRITER_MAX_BACKLOG: int = int(os.getenv("RESULT_WRITER_MAX_BACKLOG", "100000"))
+    ROLLUP_RESOLUTIONS: ClassVar[tuple] = (1, 60)  # Bucket widths in seconds
+    SERIES_MAX_POINTS: int = int(os.getenv("SERIES_MAX_POINTS", "500"))
 
     # Camera settings
     CAMERA_DEVICE: str = os.getenv("CAMERA_DEVICE", "0")
+    CAMERA_LANES: str = os.getenv("CAMERA_LANES", "")  # name[@weight]=device,... ; empty = one lane on CAMERA_DEVICE
+    LANE_IDLE_RELEASE_SECONDS: float = float(os.getenv("LANE_IDLE_RELEASE_SECONDS", "600"))  # Without clients; 0 = never
     USE_MOCK_CAMERA: bool = os.getenv("USE_MOCK_CAMERA", "true").lower() == "true"
     CAMERA_FPS: int = int(os.getenv("CAMERA_FPS", "30"))
     CAMERA_WIDTH: int = int(os.getenv("CAMERA_WIDTH", "640"))
     CAMERA_HEIGHT: int = int(os.getenv("CAMERA_HEIGHT", "480"))
+    FRAME_RING_SIZE: int = int(os.getenv("FRAME_RING_SIZE", "8"))
+    SUBSCRIBER_QUEUE_SIZE: int = int(os.getenv("SUBSCRIBER_QUEUE_SIZE", "2"))
+    FRAME_POOL_SIZE: int = int(os.getenv("FRAME_POOL_SIZE", "32"))
+    PIPELINE_QUEUE_SIZE: int = int(os.getenv("PIPELINE_QUEUE_SIZE", "4"))
+    MOCK_CAMERA_SEEDS: int = int(os.getenv("MOCK_CAMERA_SEEDS", "8"))  # Seeds per synthetic frame
+    MOCK_CAMERA_SCENES: int = int(os.getenv("MOCK_CAMERA_SCENES", "16"))  # Pre-rendered frames cycled through
+    MOCK_CAMERA_FPS: float = float(os.getenv("MOCK_CAMERA_FPS", os.getenv("CAMERA_FPS", "30")))  # 0 = unthrottled
+    MOCK_CAMERA_RANDOM_SEED: int = int(os.getenv("MOCK_CAMERA_RANDOM_SEED", "0"))
+    PREVIEW_JPEG_QUALITY: int = int(os.getenv("PREVIEW_JPEG_QUALITY", "95"))
+    PREVIEW_LAG_RATIO: float = float(os.getenv("PREVIEW_LAG_RATIO", "0.5"))  # Of the frame interval
+    PREVIEW_UPGRADE_AFTER_S: float = float(os.getenv("PREVIEW_UPGRADE_AFTER_S", "5"))
     
     # WebSocket settings
     WEBSOCKET_PING_INTERVAL: int = int(os.getenv("WEBSOCKET_PING_INTERVAL", "20"))
     WEBSOCKET_PING_TIMEOUT: int = int(os.getenv("WEBSOCKET_PING_TIMEOUT", "10"))
+    WEBSOCKET_SEND_QUEUE_SIZE: int = int(os.getenv("WEBSOCKET_SEND_QUEUE_SIZE", "4"))  # Per connection, drop-oldest
+    WEBSOCKET_RESULT_QUEUE_SIZE: int = int(os.getenv("WEBSOCKET_RESULT_QUEUE_SIZE", "256"))  # Result batches, drop-oldest
     
+    # Admin and profiling
+    ADMIN_TOKEN: str = os.getenv("ADMIN_TOKEN", "")  # Required as X-Admin-Token on /admin; unset disables /admin
+    PROFILE_MAX_SECONDS: float = float(os.getenv("PROFILE_MAX_SECONDS", "60"))
+    PROFILE_TRACEMALLOC_FRAMES: int = int(os.getenv("PROFILE_TRACEMALLOC_FRAMES", "1"))
+
     # Environment
     ENVIRONMENT: str = os.getenv("ENVIRONMENT", "development")
     
@@ -1,12 +1,21 @@
+import asyncio
+from typing import List
+
+from sqlalchemy import Integer, inspect, insert, select, text
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
 from config import settings
 from models.base import Base
+# Every model is registered on Base before the baseline creates the tables
+from models import classification, rollup, session  # noqa: F401
+from models.classification import Classification
+from models.schema_version import SchemaVersion
+from db.partitions import create_default_partition
 
 # Create engine with explicit event loop policy
 engine = create_async_engine(
     settings.DATABASE_URL,
-    echo=True,
+    echo=settings.DATABASE_ECHO,
     pool_pre_ping=True,
     pool_size=5,
     max_overflow=10
@@ -20,12 +29,95 @@ AsyncSessionLocal = sessionmaker(
     autoflush=False
 )
 
+async def _baseline(conn):
+    # checkfirst: databases created before versioning are adopted as they are
+    await conn.run_sync(Base.metadata.create_all)
+    await create_default_partition(conn)
+
+
+# Schema migrations by version, applied in order and recorded in schema_version.
+# Add new versions at the end; never change one that has shipped.
+MIGRATIONS = {
+    1: ("Baseline schema", _baseline),
+}
+SCHEMA_VERSION = max(MIGRATIONS)
+
+# Key of the advisory lock held while migrating, so concurrent workers don't race
+MIGRATION_LOCK_ID = 0x5EED5C
+
+
+def baseline_mismatches(sync_conn) -> List[str]:
+    """How the tables of a database created before versioning differ from the baseline schema.
+
+    Releases before versioning dropped and recreated every table on start,
+    so such a database only holds its last run: tables that match are
+    adopted, anything else has to be reset rather than migrated.
+    """
+    inspector = inspect(sync_conn)
+    existing = set(inspector.get_table_names())
+    mismatches = []
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing or table.name == SchemaVersion.__tablename__:
+            continue
+        columns = {column["name"]: column["type"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            found = columns.get(column.name)
+            if found is None:
+                mismatches.append(f"{table.name}.{column.name} is missing")
+            elif isinstance(column.type, Integer) and not isinstance(found, Integer):
+                mismatches.append(f"{table.name}.{column.name} is {found}, not an integer")
+    if sync_conn.dialect.name == "postgresql" and Classification.__tablename__ in existing:
+        partitioned = sync_conn.execute(
+            text("SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:name)"),
+            {"name": Classification.__tablename__},
+        ).first()
+        if partitioned is None:
+            mismatches.append(f"{Classification.__tablename__} is not partitioned")
+    return mismatches
+
+
 async def init_db():
+    """Bring the schema up to SCHEMA_VERSION, keeping existing data.
+
+    Safe to run on every start: only migrations missing from schema_version
+    are applied, all in one transaction. DB_RESET_ON_STARTUP drops every
+    table first, for development.
+    """
     async with engine.begin() as conn:
-        # Drop all tables first
-        await conn.run_sync(Base.metadata.drop_all)
-        # Create all tables
-        await conn.run_sync(Base.metadata.create_all)
+        if conn.dialect.name == "postgresql":
+            await conn.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": MIGRATION_LOCK_ID})
+        if settings.DB_RESET_ON_STARTUP:
+            print("DB_RESET_ON_STARTUP is set, dropping every table")
+            await conn.run_sync(Base.metadata.drop_all)
+        if not await conn.run_sync(lambda sync_conn: inspect(sync_conn).has_table(SchemaVersion.__tablename__)):
+            mismatches = await conn.run_sync(baseline_mismatches)
+            if mismatches:
+                raise RuntimeError(
+                    "The database was created before schema versioning and does not match the baseline schema ("
+                    + "; ".join(mismatches)
+                    + "). Set DB_RESET_ON_STARTUP=true once to recreate every table, dropping their data"
+                )
+        await conn.run_sync(SchemaVersion.__table__.create, checkfirst=True)
+        applied = set((await conn.execute(select(SchemaVersion.version))).scalars())
+        for version, (description, migrate) in sorted(MIGRATIONS.items()):
+            if version in applied:
+                continue
+            await migrate(conn)
+            await conn.execute(insert(SchemaVersion).values(version=version, description=description))
+            print(f"Applied schema version {version}: {description}")
+    print(f"Database schema at version {SCHEMA_VERSION}")
+
+
+async def warm_pool():
+    """Open the pool's persistent connections now instead of on the first requests"""
+    size = getattr(engine.pool, "size", None)
+    connections = size() if size is not None else 1
+
+    async def ping():
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
+    await asyncio.gather(*(ping() for _ in range(connections)))
 
 async def get_db():
     async with AsyncSessionLocal() as db:
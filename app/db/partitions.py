@@ -0,0 +1,48 @@
+import uuid
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.classification import Classification
+
+# Classifications are LIST-partitioned by session on Postgres: a session's
+# rows live in their own table, so per-session queries only touch that
+# table and archiving a session drops it instead of deleting rows. Rows of
+# a session without a partition land in the default one. Other backends
+# keep a single table.
+DEFAULT_PARTITION = f"{Classification.__tablename__}_default"
+
+
+def is_partitioned(conn) -> bool:
+    """Whether a connection (or ORM session) is on Postgres, where classifications are partitioned"""
+    bind = conn.bind if isinstance(conn, AsyncSession) else conn
+    return bind.dialect.name == "postgresql"
+
+
+def partition_name(session_id) -> str:
+    return f"{Classification.__tablename__}_{uuid.UUID(str(session_id)).hex}"
+
+
+async def create_default_partition(conn):
+    if is_partitioned(conn):
+        await conn.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF {Classification.__tablename__} DEFAULT"
+        ))
+
+
+async def create_session_partition(conn, session_id):
+    """Create the partition of a new session, before any of its rows are written"""
+    if is_partitioned(conn):
+        await conn.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {partition_name(session_id)} PARTITION OF {Classification.__tablename__} "
+            f"FOR VALUES IN ('{uuid.UUID(str(session_id))}')"
+        ))
+
+
+async def drop_session_rows(conn, session_id):
+    """Remove every classification of a session: its partition, and strays in the default one"""
+    if is_partitioned(conn):
+        await conn.execute(text(f"DROP TABLE IF EXISTS {partition_name(session_id)}"))
+    await conn.execute(
+        Classification.__table__.delete().where(Classification.session_id == session_id)
+    )
@@ -1,7 +1,16 @@
 from seedx import seedx_router
+from monitoring.api import monitoring
 from fastapi import FastAPI
 import uvicorn
-from db.database import init_db
+from db.database import engine, init_db
+from classification.services.frame_producer import shutdown_producers
+from classification.services.pipeline import inference_worker
+from classification.services.batching import batching_engine
+from monitoring.health import startup
+from classification.services.result_writer import result_writer
+from classification.services.sample_store import sample_writer
+from classification.services.sampling import sampler
+from sessions.archive import session_archiver
 
 
 app = FastAPI(
@@ -13,8 +22,27 @@ app = FastAPI(
 @app.on_event("startup")
 async def startup_event():
     await init_db()
+    result_writer.start()
+    session_archiver.start()
+    # Opens the database pool and loads the model in the background; /health/ready reports when done
+    startup.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await startup.stop()
+    # Held sample candidates still reference pooled frames
+    sampler.flush()
+    await shutdown_producers()
+    inference_worker.stop()
+    if batching_engine.pool is not None:
+        batching_engine.pool.stop()
+    sample_writer.stop()
+    await result_writer.stop()
+    await session_archiver.stop()
+    await engine.dispose()
 
 app.include_router(seedx_router, prefix="/seedx", tags=["seedx"])
+app.include_router(monitoring)
 
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000) 
\ No newline at end of file
@@ -1,3 +1,33 @@
+import uuid
+
+from sqlalchemy import UUID, PrimaryKeyConstraint
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.types import TypeDecorator
 
 Base = declarative_base()
+
+
+class UUIDColumn(TypeDecorator):
+    """UUID column that also accepts string ids, as used throughout the API, on every backend"""
+    impl = UUID
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None or isinstance(value, uuid.UUID):
+            return value
+        return uuid.UUID(str(value))
+
+
+@compiles(PrimaryKeyConstraint, "postgresql")
+def compile_partitioned_primary_key(constraint, compiler, **kw):
+    """Postgres requires the partition key of a partitioned table in its primary key.
+
+    Tables declare it as info={"partition_key": ...}; the ORM keeps its own
+    primary key, so other backends create the table unpartitioned as before.
+    """
+    partition_key = constraint.table.info.get("partition_key")
+    if partition_key is None or partition_key in constraint.columns:
+        return compiler.visit_primary_key_constraint(constraint, **kw)
+    columns = [column.name for column in constraint.columns] + [partition_key]
+    return "PRIMARY KEY (%s)" % ", ".join(compiler.preparer.quote(column) for column in columns)
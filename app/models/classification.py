@@ -1,21 +1,27 @@
 
-from sqlalchemy import UUID, Column, Integer, String, DateTime, Boolean, ForeignKey
+from sqlalchemy import BigInteger, Column, Integer, String, DateTime, Boolean, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
-from models.base import Base
+from models.base import Base, UUIDColumn
 
 
 
 class Classification(Base):
     __tablename__ = "classifications"
+    __table_args__ = (
+        # Keyset pagination over a session's sampled seeds
+        Index("ix_classifications_session_sampled_id", "session_id", "is_sampled", "id"),
+        # On Postgres every session gets its own partition (db.partitions), dropped once archived
+        {"postgresql_partition_by": "LIST (session_id)", "info": {"partition_key": "session_id"}},
+    )
 
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
-    seed_id = Column(String, index=True)
+    seed_id = Column(BigInteger, index=True)  # Time-ordered, see utils.seed_id_provider
     classify = Column(String)  
     is_sampled = Column(Boolean, default=False)
     image_path = Column(String, nullable=True)
-    timestamp = Column(DateTime, default=datetime.now())
+    timestamp = Column(DateTime, default=datetime.now)  # Set to the frame's capture time on insert
     
     # Foreign key to session
-    session_id = Column(UUID, ForeignKey("sessions.id"))
+    session_id = Column(UUIDColumn, ForeignKey("sessions.id"), index=True)
     session = relationship("Session", back_populates="classifications")
\ No newline at end of file
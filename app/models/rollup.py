@@ -0,0 +1,16 @@
+from sqlalchemy import Column, Integer, DateTime, ForeignKey
+from models.base import Base, UUIDColumn
+
+
+
+class ClassificationRollup(Base):
+    """Per-session classification counts aggregated into fixed time buckets"""
+    __tablename__ = "classification_rollups"
+
+    session_id = Column(UUIDColumn, ForeignKey("sessions.id"), primary_key=True)
+    resolution = Column(Integer, primary_key=True)  # Bucket width in seconds
+    bucket_start = Column(DateTime, primary_key=True)
+    total = Column(Integer, nullable=False, default=0)
+    accepted = Column(Integer, nullable=False, default=0)
+    rejected = Column(Integer, nullable=False, default=0)
+    sampled = Column(Integer, nullable=False, default=0)
@@ -1,19 +1,30 @@
 from uuid import uuid4
-from sqlalchemy import UUID, Column, String, DateTime
+from sqlalchemy import Column, Integer, String, DateTime
 from sqlalchemy.orm import relationship
 from datetime import datetime
-from models.base import Base
+from models.base import Base, UUIDColumn
 
 
 
 class Session(Base):
     __tablename__ = "sessions"
 
-    id = Column(UUID, default=lambda: uuid4(), primary_key=True, index=True)
+    id = Column(UUIDColumn, default=lambda: uuid4(), primary_key=True, index=True)
     seed_lot = Column(String, index=True)
-    start_time = Column(DateTime, default=datetime.utcnow)
+    start_time = Column(DateTime, default=datetime.now)  # Naive local time, like every stored timestamp
     end_time = Column(DateTime, nullable=True)
     status = Column(String, nullable=False)
+    lane = Column(String, nullable=True)  # Camera lane the lot is sorted on
+
+    # Summary counters, persisted when the session ends
+    total_count = Column(Integer, nullable=True)
+    accepted_count = Column(Integer, nullable=True)
+    rejected_count = Column(Integer, nullable=True)
+    sampled_count = Column(Integer, nullable=True)
+    pending_count = Column(Integer, nullable=True)
+
+    # Set once the session's classifications moved to its Parquet archive
+    archived_at = Column(DateTime, nullable=True)
     
     # Relationships
     classifications = relationship("Classification", back_populates="session")
\ No newline at end of file
@@ -0,0 +1,215 @@
+import hmac
+from typing import Optional
+
+from fastapi import APIRouter, Header
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
+
+from classification.services.frame_producer import get_producers
+from classification.services.pipeline import inference_worker
+from classification.services.batching import batching_engine
+from classification.services.lanes import lanes
+from classification.services.result_writer import result_writer
+from classification.services.sample_store import sample_writer
+from classification.services.sampling import sampler
+from classification.services.stream_sorter import manager
+from config import settings
+from sessions.archive import session_archiver
+from db.database import engine
+from monitoring.health import startup
+from monitoring.metrics import metrics
+from monitoring.profiler import profiler
+
+monitoring = APIRouter(tags=["monitoring"])
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+@metrics.collector
+def collect_producers():
+    """Frame, drop and pool counters the producers already keep"""
+    snapshots = {device: producer.snapshot() for device, producer in get_producers().items()}
+
+    def per_device(read):
+        return [({"device": device}, read(snapshot)) for device, snapshot in snapshots.items()]
+
+    yield "seedx_frames_captured_total", "counter", "Frames captured", per_device(lambda s: s["frames"])
+    yield "seedx_previews_encoded_total", "counter", "Preview JPEGs encoded", per_device(lambda s: s["encoded"])
+    yield ("seedx_subscriber_frames_dropped_total", "counter", "Frames dropped by slow subscribers",
+           per_device(lambda s: s["subscriber_drops"]))
+    yield "seedx_subscribers", "gauge", "Attached frame subscribers", per_device(lambda s: s["subscribers"])
+    yield ("seedx_frame_pool_checkouts_total", "counter", "Frame buffers taken from the pool",
+           per_device(lambda s: s["frame_pool"]["acquired"]))
+    yield ("seedx_frame_pool_misses_total", "counter", "Frame buffers allocated because the pool was empty",
+           per_device(lambda s: s["frame_pool"]["misses"]))
+    yield "seedx_frame_pool_free", "gauge", "Free frame buffers", per_device(lambda s: s["frame_pool"]["free"])
+
+
+@metrics.collector
+def collect_queues():
+    """Queue depths of every stage"""
+    depths = [
+        ({"stage": f"encode-{device}"}, producer.snapshot()["stages"]["encode"]["queue_depth"])
+        for device, producer in get_producers().items()
+    ]
+    inference = batching_engine.pool.snapshot() if batching_engine.pool else inference_worker.snapshot()
+    for stage, snapshot in (("inference", inference), ("sample-writer", sample_writer.snapshot())):
+        if "queue_depth" in snapshot:
+            depths.append(({"stage": stage}, snapshot["queue_depth"]))
+    batching = batching_engine.snapshot()
+    depths.append(({"stage": "batching"}, batching["pending"]))
+    depths.append(({"stage": "result-writer"}, result_writer.snapshot()["backlog"]))
+    yield "seedx_queue_depth", "gauge", "Items waiting per stage", depths
+    yield "seedx_batches_in_flight", "gauge", "Batches submitted to inference", [({}, batching["in_flight"])]
+
+
+@metrics.collector
+def collect_inference_pool():
+    """Worker restarts and frame handoff of the inference process pool, when enabled"""
+    if batching_engine.pool is None:
+        return
+    snapshot = batching_engine.pool.snapshot()
+    yield ("seedx_inference_worker_restarts_total", "counter", "Inference worker processes restarted",
+           [({"worker": str(worker["id"])}, worker["restarts"]) for worker in snapshot["workers"]])
+    yield ("seedx_inference_frames_total", "counter", "Frames handed to inference processes",
+           [({"handoff": "zero_copy"}, snapshot["zero_copy_frames"]), ({"handoff": "staged"}, snapshot["staged_frames"])])
+    yield "seedx_inference_failed_batches_total", "counter", "Batches dropped by the pool", [({}, snapshot["failed_jobs"])]
+
+
+@metrics.collector
+def collect_lanes():
+    """Backlog and binding of every camera lane"""
+    queued = batching_engine.lanes
+    yield ("seedx_lane_pending", "gauge", "Images of a lane waiting for a batch",
+           [({"lane": name}, len(queued[name].pending) if name in queued else 0) for name in lanes.lanes])
+    yield ("seedx_lane_bound", "gauge", "Whether a session is sorting on the lane",
+           [({"lane": name}, int(lane.session_id is not None)) for name, lane in lanes.lanes.items()])
+
+
+@metrics.collector
+def collect_persistence():
+    """Result writer and database pool"""
+    yield "seedx_db_rows_written_total", "counter", "Result rows persisted", [({}, result_writer.rows_written)]
+    yield ("seedx_db_rows_dropped_total", "counter", "Result rows dropped because the backlog was full",
+           [({}, result_writer.rows_dropped)])
+    yield "seedx_db_failed_flushes_total", "counter", "Failed result flushes", [({}, result_writer.failed_flushes)]
+    yield "seedx_sampled_images_written_total", "counter", "Sampled images stored", [({}, sample_writer.written)]
+    yield ("seedx_sample_candidates", "gauge", "Seeds held in open sampling reservoirs",
+           [({}, sampler.snapshot()["candidates"])])
+    archive = session_archiver.snapshot()
+    yield "seedx_sessions_archived_total", "counter", "Sessions moved to Parquet", [({}, archive["archived_sessions"])]
+    yield "seedx_archived_rows_total", "counter", "Classification rows moved to Parquet", [({}, archive["archived_rows"])]
+    yield "seedx_archive_failed_runs_total", "counter", "Failed archival runs", [({}, archive["failed_runs"])]
+    checkedout = getattr(engine.pool, "checkedout", None)
+    if checkedout is not None:
+        yield "seedx_db_pool_checked_out", "gauge", "Database connections in use", [({}, checkedout())]
+
+
+@metrics.collector
+def collect_connections():
+    yield "seedx_websocket_connections", "gauge", "Open classification sockets", [({}, manager.get_active_connections_count())]
+
+
+@metrics.collector
+def collect_startup():
+    yield "seedx_ready", "gauge", "Whether the startup warm-up is done", [({}, int(startup.ready))]
+
+
+@monitoring.get("/health/live")
+async def liveness():
+    """The process is up and its event loop responds"""
+    return {"status": "alive", "uptime_seconds": round(startup.uptime, 3)}
+
+
+@monitoring.get("/health/ready")
+async def readiness():
+    """Ready to take traffic: 503 until the database pool and the model are warmed up"""
+    snapshot = startup.snapshot()
+    return JSONResponse(
+        {"status": "ready" if startup.ready else "starting", **snapshot},
+        status_code=200 if startup.ready else 503,
+    )
+
+
+@monitoring.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Prometheus metrics"""
+    return PlainTextResponse(metrics.render(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+
+def admin_denied(token: Optional[str]) -> Optional[JSONResponse]:
+    """Reject admin calls unless ADMIN_TOKEN is configured and given; without it they are disabled"""
+    if not settings.ADMIN_TOKEN:
+        return JSONResponse({"error": "Admin endpoints are disabled, set ADMIN_TOKEN to enable them"}, status_code=403)
+    if token is None or not hmac.compare_digest(token.encode(), settings.ADMIN_TOKEN.encode()):
+        return JSONResponse({"error": "Invalid admin token"}, status_code=403)
+    return None
+
+
+@monitoring.post("/admin/profile")
+async def profile_process(
+    seconds: float = 10.0,
+    interval_ms: float = 5.0,
+    cprofile: bool = True,
+    allocations: bool = True,
+    slow_callback_ms: float = 50.0,
+    top: int = 25,
+    x_admin_token: Optional[str] = Header(None),
+):
+    """Profile the live process for a number of seconds.
+
+    Returns the hottest sampled frames of every thread, the event-loop
+    cProfile summary, top allocation sites and slow event-loop callbacks,
+    with links to the collapsed stacks and pstats dump of the run.
+    """
+    denied = admin_denied(x_admin_token)
+    if denied is not None:
+        return denied
+    if profiler.running:
+        return JSONResponse({"error": "A profiling run is already in progress"}, status_code=409)
+    run = await profiler.run(
+        seconds=max(0.1, seconds),
+        interval_ms=max(1.0, interval_ms),
+        cprofile=cprofile,
+        allocations=allocations,
+        slow_callback_ms=slow_callback_ms,
+        top=max(1, top),
+    )
+    downloads = {"collapsed": f"/admin/profile/{run.id}/collapsed"}
+    if run.pstats is not None:
+        downloads["pstats"] = f"/admin/profile/{run.id}/pstats"
+    return {**run.summary, "downloads": downloads}
+
+
+@monitoring.get("/admin/profile/{run_id}/{artifact}")
+async def download_profile(run_id: str, artifact: str, x_admin_token: Optional[str] = Header(None)):
+    """Download the collapsed stacks (flamegraph input) or pstats dump of a recent run"""
+    denied = admin_denied(x_admin_token)
+    if denied is not None:
+        return denied
+    run = profiler.runs.get(run_id)
+    data = None
+    if run is not None:
+        data = {"collapsed": run.collapsed, "pstats": run.pstats}.get(artifact)
+    if data is None:
+        return JSONResponse({"error": "Profile not found"}, status_code=404)
+    extension = "txt" if artifact == "collapsed" else "pstats"
+    return Response(
+        content=data,
+        media_type="text/plain" if artifact == "collapsed" else "application/octet-stream",
+        headers={"Content-Disposition": f'attachment; filename="profile-{run_id}.{extension}"'},
+    )
+
+
+@monitoring.post("/admin/lanes/{name}/release")
+async def release_lane(name: str, x_admin_token: Optional[str] = Header(None)):
+    """Free a camera lane held by a session that will never be stopped, e.g. after its client crashed.
+
+    The session's clients are disconnected; stopping it afterwards still
+    stores its counters.
+    """
+    denied = admin_denied(x_admin_token)
+    if denied is not None:
+        return denied
+    if name not in lanes.lanes:
+        return JSONResponse({"error": f"Unknown camera lane {name}"}, status_code=404)
+    return {"lane": name, "released_session_id": lanes.release_lane(name)}
@@ -0,0 +1,114 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from classification.services.batching import batching_engine
+from config import settings
+from db.database import warm_pool
+
+
+class WarmupStep:
+    """One step of the startup warm-up, with its outcome for the readiness probe"""
+
+    def __init__(self, name: str, run: Callable[[], Awaitable[None]], retry: bool = False):
+        self.name = name
+        self.run = run
+        self.retry = retry
+        self.status = "pending"
+        self.attempts = 0
+        self.elapsed_ms = 0.0
+        self.error: Optional[str] = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        data = {"status": self.status, "attempts": self.attempts, "elapsed_ms": round(self.elapsed_ms, 3)}
+        if self.error is not None:
+            data["error"] = self.error
+        return data
+
+
+class StartupWarmup:
+    """Warms the process up in the background after startup, and tracks liveness and readiness.
+
+    The API serves as soon as the schema is in place; meanwhile a background
+    task pre-opens the database pool and loads the model and runs a dummy
+    batch through it (in every worker process when the inference pool is
+    enabled). The process is ready once every step succeeded, so a load
+    balancer or orchestrator only routes traffic to it then. A step that
+    keeps failing leaves the process alive but not ready.
+    """
+
+    RETRY_DELAYS: Tuple[float, ...] = (0.5, 1.0, 2.0, 5.0)
+
+    def __init__(self, model: bool = None, timeout: float = None):
+        model = settings.STARTUP_WARMUP if model is None else model
+        self.timeout = timeout or settings.STARTUP_WARMUP_TIMEOUT_SECONDS
+        self.steps: List[WarmupStep] = [WarmupStep("database_pool", warm_pool, retry=True)]
+        if model:
+            self.steps.append(WarmupStep("model", self._warm_model))
+        self.started_at = time.monotonic()
+        self.ready_at: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.ready_at is not None
+
+    @property
+    def uptime(self) -> float:
+        return time.monotonic() - self.started_at
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="startup-warmup")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _warm_model(self):
+        await batching_engine.warmup(self.timeout)
+
+    async def _run(self):
+        for step in self.steps:
+            if not await self._run_step(step):
+                print(f"Startup warm-up failed at {step.name}, not ready")
+                return
+        self.ready_at = time.monotonic()
+        print(f"Warm-up done in {(self.ready_at - self.started_at):.2f}s, ready")
+
+    async def _run_step(self, step: WarmupStep) -> bool:
+        step.status = "running"
+        started = time.perf_counter()
+        delays = list(self.RETRY_DELAYS) if step.retry else []
+        while True:
+            step.attempts += 1
+            try:
+                await step.run()
+                step.status = "done"
+                step.error = None
+                return True
+            except Exception as e:
+                step.error = str(e) or type(e).__name__
+                if not delays:
+                    step.status = "failed"
+                    print(f"Error in warm-up step {step.name}: {step.error}")
+                    return False
+                await asyncio.sleep(delays.pop(0))
+            finally:
+                step.elapsed_ms = (time.perf_counter() - started) * 1000
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "uptime_seconds": round(self.uptime, 3),
+            "warmup_seconds": round(self.ready_at - self.started_at, 3) if self.ready else None,
+            "steps": {step.name: step.snapshot() for step in self.steps},
+        }
+
+
+startup = StartupWarmup()
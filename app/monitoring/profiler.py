@@ -0,0 +1,242 @@
+import asyncio
+import cProfile
+import os
+import pstats
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import Counter, OrderedDict
+from typing import Any, Dict, List, Optional
+
+from config import settings
+
+
+class StackSampler(threading.Thread):
+    """Samples the stack of every thread at a fixed interval into collapsed stacks"""
+
+    def __init__(self, interval: float):
+        super().__init__(name="profiler-sampler", daemon=True)
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        own = threading.get_ident()
+        while not self._stop_event.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def stop(self):
+        self._stop_event.set()
+
+    def collapsed(self) -> str:
+        """Brendan Gregg's collapsed-stack format, ready for flamegraph.pl or speedscope"""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def summary(self, top: int) -> Dict[str, Any]:
+        threads: Counter = Counter()
+        leaves: Counter = Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(";")
+            threads[frames[0]] += count
+            leaves[(frames[0], frames[-1])] += count
+        return {
+            "samples": self.samples,
+            "threads": dict(threads.most_common()),
+            "hot_frames": [
+                {"thread": thread, "frame": frame, "samples": count,
+                 "percent": round(100 * count / self.samples, 2) if self.samples else 0.0}
+                for (thread, frame), count in leaves.most_common(top)
+            ],
+        }
+
+
+class SlowCallbackMonitor:
+    """Times every event-loop callback while installed and reports the slow ones.
+
+    Wraps asyncio.Handle._run rather than enabling asyncio debug mode, which
+    captures a traceback per callback and would distort the profile itself.
+    """
+
+    def __init__(self, threshold: float):
+        self.threshold = threshold
+        self.reports: List[Dict[str, Any]] = []
+        self.callbacks = 0
+        self._original = None
+
+    @staticmethod
+    def describe(handle: asyncio.Handle) -> str:
+        callback = getattr(handle, "_callback", None)
+        owner = getattr(callback, "__self__", None)
+        if isinstance(owner, asyncio.Task):
+            coro = owner.get_coro()
+            frame = getattr(coro, "cr_frame", None)
+            where = f" at {os.path.basename(frame.f_code.co_filename)}:{frame.f_lineno}" if frame else ""
+            return f"Task {owner.get_name()} {getattr(coro, '__qualname__', coro)}{where}"
+        return repr(handle)
+
+    def install(self):
+        monitor = self
+        original = self._original = asyncio.Handle._run
+
+        def _run(handle):
+            started = time.perf_counter()
+            try:
+                return original(handle)
+            finally:
+                elapsed = time.perf_counter() - started
+                monitor.callbacks += 1
+                if elapsed >= monitor.threshold:
+                    monitor.reports.append({"callback": monitor.describe(handle), "ms": round(elapsed * 1000, 3)})
+
+        asyncio.Handle._run = _run
+
+    def uninstall(self):
+        if self._original is not None:
+            asyncio.Handle._run = self._original
+            self._original = None
+
+
+class ProfileRun:
+    """Artifacts and summary of one profiling run"""
+
+    def __init__(self, seconds: float):
+        self.id = uuid.uuid4().hex[:12]
+        self.seconds = seconds
+        self.started_at = time.time()
+        self.summary: Dict[str, Any] = {}
+        self.collapsed: Optional[bytes] = None
+        self.pstats: Optional[bytes] = None
+
+
+class Profiler:
+    """On-demand profiling of the live process.
+
+    Nothing is installed until a run is requested: the stack sampler thread,
+    cProfile on the event-loop thread, tracemalloc and the slow-callback
+    monitor are all switched on for the duration of the run and off again afterwards.
+    Only one run happens at a time; the last few are kept for download.
+    """
+
+    def __init__(self, keep: int = 5):
+        self.keep = keep
+        self.runs: "OrderedDict[str, ProfileRun]" = OrderedDict()
+        self._running = False
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    async def run(
+        self,
+        seconds: float,
+        interval_ms: float = 5.0,
+        cprofile: bool = True,
+        allocations: bool = True,
+        slow_callback_ms: float = 50.0,
+        top: int = 25,
+    ) -> ProfileRun:
+        """Profile the process for `seconds` and return the run"""
+        if self._running:
+            raise RuntimeError("A profiling run is already in progress")
+        self._running = True
+        try:
+            return await self._run(seconds, interval_ms, cprofile, allocations, slow_callback_ms, top)
+        finally:
+            self._running = False
+
+    async def _run(self, seconds, interval_ms, cprofile, allocations, slow_callback_ms, top) -> ProfileRun:
+        run = ProfileRun(min(seconds, settings.PROFILE_MAX_SECONDS))
+
+        sampler = StackSampler(interval_ms / 1000)
+        profile = cProfile.Profile() if cprofile else None
+        started_tracing = allocations and not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start(settings.PROFILE_TRACEMALLOC_FRAMES)
+        slow_callbacks = SlowCallbackMonitor(slow_callback_ms / 1000)
+        slow_callbacks.install()
+
+        sampler.start()
+        if profile is not None:
+            # cProfile only sees the thread it is enabled on: the event loop
+            profile.enable()
+        try:
+            await asyncio.sleep(run.seconds)
+        finally:
+            if profile is not None:
+                profile.disable()
+            sampler.stop()
+            slow_callbacks.uninstall()
+            snapshot = tracemalloc.take_snapshot() if allocations and tracemalloc.is_tracing() else None
+            if started_tracing:
+                tracemalloc.stop()
+        await asyncio.to_thread(sampler.join, 1.0)
+
+        run.collapsed = sampler.collapsed().encode()
+        run.summary = {
+            "id": run.id,
+            "seconds": run.seconds,
+            "sampling": sampler.summary(top),
+            "slow_callbacks": {
+                "threshold_ms": slow_callback_ms,
+                "callbacks": slow_callbacks.callbacks,
+                "count": len(slow_callbacks.reports),
+                "slowest": sorted(slow_callbacks.reports, key=lambda report: report["ms"], reverse=True)[:top],
+            },
+        }
+        if profile is not None:
+            run.pstats = await asyncio.to_thread(self._dump_pstats, profile)
+            run.summary["event_loop_profile"] = self._pstats_summary(profile, top)
+        if snapshot is not None:
+            run.summary["allocations"] = [
+                {"site": str(stat.traceback[0]), "size_kb": round(stat.size / 1024, 1), "count": stat.count}
+                for stat in snapshot.statistics("lineno")[:top]
+            ]
+
+        self.runs[run.id] = run
+        while len(self.runs) > self.keep:
+            self.runs.popitem(last=False)
+        return run
+
+    @staticmethod
+    def _dump_pstats(profile: cProfile.Profile) -> bytes:
+        """Serialize in the format pstats.Stats() and snakeviz load"""
+        fd, path = tempfile.mkstemp(suffix=".pstats")
+        os.close(fd)
+        try:
+            profile.dump_stats(path)
+            with open(path, "rb") as f:
+                return f.read()
+        finally:
+            os.unlink(path)
+
+    @staticmethod
+    def _pstats_summary(profile: cProfile.Profile, top: int) -> List[Dict[str, Any]]:
+        stats = pstats.Stats(profile)
+        rows = sorted(stats.stats.items(), key=lambda item: item[1][2], reverse=True)[:top]
+        return [
+            {
+                "function": f"{name} ({os.path.basename(filename)}:{line})",
+                "calls": calls,
+                "self_ms": round(self_time * 1000, 3),
+                "cumulative_ms": round(cumulative * 1000, 3),
+            }
+            for (filename, line, name), (_, calls, self_time, cumulative, _) in rows
+        ]
+
+
+profiler = Profiler()
@@ -3,8 +3,9 @@ from fastapi.responses import JSONResponse
 
 from sessions.schema import CreateSession
 from sessions.service import create_session, end_session, get_session
+from classification.services.lanes import LaneBusyError
 from db.database import get_db
-from stats.service import get_sampled_images_by_sessionid
+from stats.service import get_sampled_images_by_sessionid, sampled_page
 
 
 
@@ -17,8 +18,13 @@ def read_root(db = Depends(get_db)):
 
 @session.post("/start")
 async def start_session(session: CreateSession, db=Depends(get_db)):
-    """Start a new sorting session"""
-    session_response = await create_session(db, session)
+    """Start a new sorting session on a free camera lane, or on the one requested"""
+    try:
+        session_response = await create_session(db, session)
+    except LaneBusyError as e:
+        return JSONResponse({"error": str(e)}, status_code=409)
+    except KeyError as e:
+        return JSONResponse({"error": e.args[0]}, status_code=404)
     return session_response
     
 
@@ -28,12 +34,14 @@ async def stop_session(session_id: str, db=Depends(get_db)):
     """Stop an active session"""
     session = await end_session(db, session_id)
     
-    # Get sampled data
-    sampled_data = await get_sampled_images_by_sessionid(db, session_id)
+    # Get the first page of sampled data; the rest is paged through /stats/sampled
+    sampled_data = await get_sampled_images_by_sessionid(db, session_id, limit=10)
+    page = sampled_page(sampled_data, limit=10)
     
     return JSONResponse({
         "status": "stopped",
-        "sampled_data": [{"seed_id": s.seed_id, "path": s.image_path} for s in sampled_data]
+        "sampled_data": [{"seed_id": s["seed_id"], "path": s["path"]} for s in page["items"]],
+        "sampled_next_cursor": page["next_cursor"]
     })
 
 @session.get("/{session_id}")
@@ -44,5 +52,6 @@ async def get_session_by_id(session_id: str, db=Depends(get_db)):
         "id": session.id,
         "seed_lot": session.seed_lot,
         "status": session.status,
+        "lane": session.lane,
         "end_time": session.end_time.isoformat() if session.end_time else None
     }
\ No newline at end of file
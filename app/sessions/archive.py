@@ -0,0 +1,186 @@
+import asyncio
+import os
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, NamedTuple, Optional
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sqlalchemy import select, update
+
+from config import settings
+from db.database import engine
+from db.partitions import drop_session_rows
+from models.classification import Classification
+from models.session import Session
+
+ARCHIVE_SCHEMA = pa.schema([
+    ("id", pa.int64()),
+    ("seed_id", pa.int64()),
+    ("classify", pa.string()),
+    ("is_sampled", pa.bool_()),
+    ("image_path", pa.string()),
+    ("timestamp", pa.timestamp("us")),
+])
+ARCHIVE_COLUMNS = [getattr(Classification, name) for name in ARCHIVE_SCHEMA.names]
+
+
+async def stream_classifications(conn, session_id, chunk_rows: int) -> AsyncIterator[pa.Table]:
+    """A session's classifications in id order, as ARCHIVE_SCHEMA tables of up to chunk_rows rows.
+
+    Rows come through a server-side cursor, so memory stays bounded by one
+    chunk however large the session is. On Postgres the cursor lives until
+    the connection's transaction ends.
+    """
+    result = await conn.stream(
+        select(*ARCHIVE_COLUMNS)
+        .where(Classification.session_id == session_id)
+        .order_by(Classification.id)
+        .execution_options(yield_per=chunk_rows)
+    )
+    async for chunk in result.partitions(chunk_rows):
+        yield pa.Table.from_arrays(
+            [pa.array(column, type=field.type) for column, field in zip(zip(*chunk), ARCHIVE_SCHEMA)],
+            schema=ARCHIVE_SCHEMA,
+        )
+
+
+class ArchivedClassification(NamedTuple):
+    """Sampled seed read back from an archive, shaped like the Classification rows the stats API uses"""
+    id: int
+    seed_id: int
+    image_path: Optional[str]
+
+
+class SessionArchiver:
+    """Moves the classifications of ended sessions out of the database.
+
+    A background task picks sessions that ended more than
+    ARCHIVE_AFTER_SECONDS ago, streams their rows with a server-side cursor
+    into one zstd-compressed Parquet file per session, then drops the
+    session's partition and marks it archived in one transaction. The
+    stats API reads archived sessions back from their file.
+    """
+
+    def __init__(self, archive_dir: Path = None, after_seconds: float = None, interval_seconds: float = None):
+        self.archive_dir = Path(archive_dir or settings.ARCHIVE_DIR)
+        self.after_seconds = settings.ARCHIVE_AFTER_SECONDS if after_seconds is None else after_seconds
+        self.interval = settings.ARCHIVE_INTERVAL_SECONDS if interval_seconds is None else interval_seconds
+        self._task: Optional[asyncio.Task] = None
+        self.archived_sessions = 0
+        self.archived_rows = 0
+        self.archived_bytes = 0
+        self.failed_runs = 0
+        self.last_run_ms = 0.0
+
+    def path(self, session_id) -> Path:
+        return self.archive_dir / f"{uuid.UUID(str(session_id))}.parquet"
+
+    def start(self):
+        if self.interval > 0 and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._run(), name="session-archiver")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            started = time.perf_counter()
+            try:
+                await self.archive_due()
+            except Exception as e:
+                self.failed_runs += 1
+                print(f"Error archiving sessions: {str(e)}")
+            self.last_run_ms = (time.perf_counter() - started) * 1000
+
+    async def archive_due(self) -> int:
+        """Archive every session that ended long enough ago; returns how many were archived"""
+        cutoff = datetime.now() - timedelta(seconds=self.after_seconds)
+        async with engine.connect() as conn:
+            session_ids = (await conn.execute(
+                select(Session.id)
+                .where(Session.end_time.is_not(None), Session.end_time <= cutoff, Session.archived_at.is_(None))
+                .order_by(Session.end_time)
+            )).scalars().all()
+        for session_id in session_ids:
+            await self.archive_session(session_id)
+        return len(session_ids)
+
+    async def archive_session(self, session_id) -> int:
+        """Move one session's classifications to its Parquet file; returns the rows archived"""
+        path = self.path(session_id)
+        staging = path.with_suffix(".parquet.tmp")
+        await asyncio.to_thread(self.archive_dir.mkdir, parents=True, exist_ok=True)
+        rows = 0
+        async with engine.connect() as conn:
+            writer = pq.ParquetWriter(staging, ARCHIVE_SCHEMA, compression="zstd")
+            try:
+                async for table in stream_classifications(conn, session_id, settings.ARCHIVE_CHUNK_ROWS):
+                    await asyncio.to_thread(writer.write_table, table)
+                    rows += table.num_rows
+            finally:
+                await asyncio.to_thread(writer.close)
+            # End the read, and with it the cursor, which holds the partition open
+            await conn.commit()
+            # The file is complete before the rows go; a crash in between only
+            # means the session is archived again on the next run
+            await asyncio.to_thread(os.replace, staging, path)
+            await drop_session_rows(conn, session_id)
+            await conn.execute(update(Session).where(Session.id == session_id).values(archived_at=datetime.now()))
+            await conn.commit()
+        self.archived_sessions += 1
+        self.archived_rows += rows
+        self.archived_bytes += path.stat().st_size
+        print(f"Archived {rows} classifications of session {session_id} to {path}")
+        return rows
+
+    async def iter_archive(self, session_id, chunk_rows: int) -> AsyncIterator[pa.Table]:
+        """An archived session's classifications, one chunk of rows at a time"""
+        batches = (await asyncio.to_thread(pq.ParquetFile, self.path(session_id))).iter_batches(batch_size=chunk_rows)
+        while True:
+            batch = await asyncio.to_thread(next, batches, None)
+            if batch is None:
+                break
+            yield pa.Table.from_batches([batch])
+
+    async def _read_sampled(self, session_id, filters) -> List[ArchivedClassification]:
+        table = await asyncio.to_thread(
+            pq.read_table,
+            self.path(session_id),
+            columns=list(ArchivedClassification._fields),
+            filters=[("is_sampled", "==", True)] + filters,
+        )
+        return [ArchivedClassification(**row) for row in table.to_pylist()]
+
+    async def read_sampled(self, session_id, limit: int, cursor: int = None) -> List[ArchivedClassification]:
+        """One page of an archived session's sampled seeds, ordered by id, after the cursor"""
+        # Rows were archived in id order
+        rows = await self._read_sampled(session_id, [("id", ">", cursor)] if cursor is not None else [])
+        return rows[:limit]
+
+    async def read_sampled_image(self, session_id, image_id: int) -> Optional[ArchivedClassification]:
+        rows = await self._read_sampled(session_id, [("id", "==", image_id)])
+        return rows[0] if rows else None
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "after_seconds": self.after_seconds,
+            "interval_seconds": self.interval,
+            "archived_sessions": self.archived_sessions,
+            "archived_rows": self.archived_rows,
+            "archived_bytes": self.archived_bytes,
+            "failed_runs": self.failed_runs,
+            "last_run_ms": round(self.last_run_ms, 3),
+        }
+
+
+session_archiver = SessionArchiver()
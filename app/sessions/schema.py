@@ -1,7 +1,7 @@
 from datetime import datetime
 from fastapi.datastructures import Default
 from pydantic import BaseModel
-from typing import Dict
+from typing import Dict, Optional
 
 class Status(BaseModel):
     accepted: int
@@ -17,3 +17,4 @@ class ActiveSession(BaseModel):
 class CreateSession(BaseModel):
     seed_lot: str
     status: str = "active"
+    lane: Optional[str] = None  # First free camera lane when not given
@@ -8,6 +8,12 @@ from sqlalchemy.exc import SQLAlchemyError
 from utils.session_id_provider import generate_session_id
 from sessions.schema import CreateSession
 from models.session import Session
+from stats.counters import SessionCounters, count_classifications, session_counters
+from classification.services.result_writer import result_writer
+from classification.services.sample_store import sample_writer, segment_store
+from classification.services.lanes import lanes
+from classification.services.sampling import sampler
+from db.partitions import create_session_partition
 
 
 async def get_session(db, session_id: str):
@@ -22,26 +28,34 @@ async def get_session(db, session_id: str):
 
 async def create_session(db, session: CreateSession):
     session_id = generate_session_id()
+    # Raises LaneBusyError or KeyError before anything is written
+    lane = lanes.bind(session_id, session.lane)
     try:
+        await create_session_partition(db, session_id)
         db_session = Session(
             id=session_id,
             seed_lot=session.seed_lot,
             status=session.status,
+            lane=lane.name,
             end_time=None
             )
         db.add(db_session)
         await db.commit()
         await db.refresh(db_session)
+        # Nothing to rebuild when its first client connects
+        session_counters.seed(session_id, SessionCounters())
         
         # Convert SQLAlchemy model to dictionary
         session_dict = {
             "id": db_session.id,
             "seed_lot": db_session.seed_lot,
             "status": db_session.status,
+            "lane": db_session.lane,
             "end_time": db_session.end_time.isoformat() if db_session.end_time else None
         }
         return session_dict
     except SQLAlchemyError as e:
+        lanes.release(session_id)
         await db.rollback()
         raise Exception(f"Database error while creating session: {str(e)}")
 
@@ -51,7 +65,27 @@ async def end_session(db, session_id: str):
         session = await get_session(db, session_id)
         if session is None:
             raise f"Session with id {session_id} not found"
+        # Unbind the lane first: the session's socket stops taking results, so
+        # none arrive while the sample and counters below are being settled
+        lanes.release(session_id)
+        # Store the sample of the last bucket before the counters are persisted,
+        # and have its rows written before the session's samples are listed
+        sampler.close_session(session_id)
+        await sample_writer.drain()
+        await result_writer.drain()
+        counters = session_counters.pop(session_id)
+        if counters is None and session.total_count is None:
+            # Counters were lost (e.g. restart); rebuild them once from the table
+            counters = await count_classifications(db, session_id)
+        if counters is not None:
+            session.total_count = counters.total
+            session.accepted_count = counters.accepted
+            session.rejected_count = counters.rejected
+            session.sampled_count = counters.sampled
+            session.pending_count = counters.pending
         session.end_time = datetime.now()
+        # The lot is over; close its open sampled-image segment
+        segment_store.close_session(session_id)
         await db.commit()
         await db.refresh(session)
         return session
@@ -1,10 +1,22 @@
+import asyncio
 from fastapi import APIRouter, Depends
 from datetime import datetime
+from typing import Optional
 
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 
 from db.database import get_db
-from stats.service import get_sampled_images_by_sessionid, get_stats_by_sessionid
+from config import settings
+from stats.service import (
+    get_sampled_image,
+    get_sampled_images_by_sessionid,
+    get_series_by_sessionid,
+    get_stats_by_sessionid,
+    sampled_page,
+)
+from sessions.service import get_session
+from stats.export import EXPORT_FORMATS, export_session
+from stats.thumbnails import thumbnail_cache
 
 stats = APIRouter(prefix="/stats", tags=["stats"])
 
@@ -22,15 +34,74 @@ async def get_session_stats(session_id: str, db=Depends(get_db)):
         "accepted": session["accepted"],
         "rejected": session["rejected"],
         "sampled": session["sampled"],
+        "pending": session["pending"],
         "total": session["total"],
     }
 
 @stats.get("/sampled/{session_id}")
-async def get_sampled_images(session_id: str, limit: int = 10, db=Depends(get_db)):
-    """Get sampled images for a session"""
+async def get_sampled_images(
+    session_id: str,
+    limit: int = 10,
+    cursor: Optional[int] = None,
+    db=Depends(get_db),
+):
+    """Get a page of sampled images for a session; pass next_cursor to get the following page"""
+    limit = max(1, min(limit, settings.SAMPLED_PAGE_MAX_LIMIT))
     sampled = await get_sampled_images_by_sessionid(
                         db=db,
                         session_id=session_id,
-                        limit=limit
+                        limit=limit,
+                        cursor=cursor
                         )
-    return [{"seed_id": s.seed_id, "path": s.image_path} for s in sampled]
\ No newline at end of file
+    return sampled_page(sampled, limit)
+
+@stats.get("/sampled/{session_id}/{image_id}/thumbnail")
+async def get_sampled_thumbnail(session_id: str, image_id: int, size: Optional[int] = None, db=Depends(get_db)):
+    """Get a downscaled JPEG thumbnail of a sampled image"""
+    sampled = await get_sampled_image(db=db, session_id=session_id, image_id=image_id)
+    if sampled is None or not sampled.image_path:
+        return JSONResponse({"error": "Sampled image not found"}, status_code=404)
+    size = max(16, min(size or settings.THUMBNAIL_SIZE, max(settings.CAMERA_WIDTH, settings.CAMERA_HEIGHT)))
+    try:
+        data = await asyncio.to_thread(thumbnail_cache.get, sampled.image_path, size)
+    except (OSError, ValueError) as e:
+        return JSONResponse({"error": f"Sampled image unavailable: {str(e)}"}, status_code=404)
+    return Response(content=data, media_type="image/jpeg", headers={"Cache-Control": "private, max-age=86400"})
+
+@stats.get("/{session_id}/series")
+async def get_session_series(
+    session_id: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    resolution: Optional[int] = None,
+    points: Optional[int] = None,
+    db=Depends(get_db),
+):
+    """Get the downsampled throughput and accept-rate series of a session"""
+    try:
+        return await get_series_by_sessionid(
+            db=db,
+            session_id=session_id,
+            start=start,
+            end=end,
+            resolution=resolution,
+            points=points,
+        )
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+
+@stats.get("/{session_id}/export")
+async def export_session_results(session_id: str, format: str = "ndjson", db=Depends(get_db)):
+    """Stream every classification of a session as NDJSON, CSV or Parquet, archived or not"""
+    if format not in EXPORT_FORMATS:
+        return JSONResponse({"error": f"format must be one of {list(EXPORT_FORMATS)}"}, status_code=400)
+    try:
+        session = await get_session(db, session_id)
+    except Exception:
+        return JSONResponse({"error": "Session not found"}, status_code=404)
+    export = EXPORT_FORMATS[format]
+    return StreamingResponse(
+        export_session(str(session.id), format, settings.EXPORT_CHUNK_ROWS, archived=session.archived_at is not None),
+        media_type=export["media_type"],
+        headers={"Content-Disposition": f'attachment; filename="session-{session.id}.{export["extension"]}"'},
+    )
@@ -0,0 +1,116 @@
+import uuid
+from typing import Dict, Optional
+
+from sqlalchemy import func, select
+
+from classification.services.result_batch import CLASS_CODES, ResultBatch
+from models.classification import Classification
+
+
+class SessionCounters:
+    """Live classification counters of one session"""
+
+    __slots__ = ("total", "accepted", "rejected", "sampled", "pending")
+
+    def __init__(self, total: int = 0, accepted: int = 0, rejected: int = 0, sampled: int = 0, pending: int = 0):
+        self.total = total
+        self.accepted = accepted
+        self.rejected = rejected
+        self.sampled = sampled
+        self.pending = pending
+
+    def record(self, batch: ResultBatch):
+        """Count a batch of results"""
+        counts = batch.counts()
+        self.total += len(batch)
+        self.accepted += int(counts[CLASS_CODES["accept"]])
+        self.rejected += int(counts[CLASS_CODES["reject"]])
+        self.pending += int(counts[CLASS_CODES["pending"]])
+        self.sampled += int(batch.sampled.sum())
+
+    @classmethod
+    def from_session(cls, session) -> "SessionCounters":
+        """Counters persisted in a session summary row"""
+        return cls(
+            total=session.total_count or 0,
+            accepted=session.accepted_count or 0,
+            rejected=session.rejected_count or 0,
+            sampled=session.sampled_count or 0,
+            pending=session.pending_count or 0,
+        )
+
+    def to_dict(self) -> Dict[str, int]:
+        return {
+            "total": self.total,
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "sampled": self.sampled,
+            "pending": self.pending,
+        }
+
+
+class SessionCounterRegistry:
+    """In-memory counters of every live session, keyed by normalized session id"""
+
+    def __init__(self):
+        self._counters: Dict[str, SessionCounters] = {}
+
+    @staticmethod
+    def _key(session_id) -> str:
+        return str(uuid.UUID(str(session_id)))
+
+    def get(self, session_id) -> Optional[SessionCounters]:
+        return self._counters.get(self._key(session_id))
+
+    def get_or_create(self, session_id) -> SessionCounters:
+        key = self._key(session_id)
+        counters = self._counters.get(key)
+        if counters is None:
+            counters = self._counters[key] = SessionCounters()
+        return counters
+
+    def record(self, session_id, batch: ResultBatch):
+        """Count results as they are produced"""
+        self.get_or_create(session_id).record(batch)
+
+    def seed(self, session_id, counters: SessionCounters) -> SessionCounters:
+        """Install counters rebuilt from the database, e.g. after a restart, unless some are already kept"""
+        return self._counters.setdefault(self._key(session_id), counters)
+
+    async def restore(self, db, session_id) -> SessionCounters:
+        """Counters of a live session, rebuilt once from the table if this process has none (e.g. after a restart)"""
+        counters = self.get(session_id)
+        if counters is None:
+            counters = self.seed(session_id, await count_classifications(db, session_id))
+        return counters
+
+    def pop(self, session_id) -> Optional[SessionCounters]:
+        return self._counters.pop(self._key(session_id), None)
+
+
+async def count_classifications(db, session_id: str) -> SessionCounters:
+    """Rebuild a session's counters from the classification table in one grouped query"""
+    rows = (await db.execute(
+        select(
+            Classification.classify,
+            func.count(Classification.id),
+            func.count(Classification.id).filter(Classification.is_sampled == True),
+        )
+        .filter(Classification.session_id == session_id)
+        .group_by(Classification.classify)
+    )).all()
+
+    counters = SessionCounters()
+    for classify, count, sampled in rows:
+        counters.total += count
+        counters.sampled += sampled
+        if classify == "accept":
+            counters.accepted += count
+        elif classify == "reject":
+            counters.rejected += count
+        else:
+            counters.pending += count
+    return counters
+
+
+session_counters = SessionCounterRegistry()
@@ -0,0 +1,125 @@
+import asyncio
+import io
+import json
+from typing import AsyncIterator, Dict, List
+
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+
+from db.database import engine
+from sessions.archive import ARCHIVE_SCHEMA, session_archiver, stream_classifications
+
+# Exported columns: the stored ones, with classify named as in the result stream
+EXPORT_NAMES = ["classification" if name == "classify" else name for name in ARCHIVE_SCHEMA.names]
+EXPORT_SCHEMA = pa.schema([field.with_name(name) for field, name in zip(ARCHIVE_SCHEMA, EXPORT_NAMES)])
+
+
+class _StreamSink(io.RawIOBase):
+    """Write-only file that hands out what was written so far, for Parquet writers.
+
+    tell() keeps counting across drains, since the Parquet footer records
+    absolute offsets.
+    """
+
+    def __init__(self):
+        self.parts: List[bytes] = []
+        self.position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self.parts.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def drain(self) -> bytes:
+        data = b"".join(self.parts)
+        self.parts.clear()
+        return data
+
+
+class _Encoder:
+    """Turns chunks of rows into the bytes of one export format"""
+
+    def encode(self, table: pa.Table) -> bytes:
+        raise NotImplementedError
+
+    def finish(self) -> bytes:
+        return b""
+
+
+class _NdjsonEncoder(_Encoder):
+    def encode(self, table: pa.Table) -> bytes:
+        lines = []
+        for row in table.to_pylist():
+            # Seed ids as strings, like the result stream, so JavaScript can't round them
+            row["seed_id"] = str(row["seed_id"])
+            row["timestamp"] = row["timestamp"].isoformat() if row["timestamp"] else None
+            lines.append(json.dumps(row, separators=(",", ":")))
+        return ("\n".join(lines) + "\n").encode() if lines else b""
+
+
+class _CsvEncoder(_Encoder):
+    def __init__(self):
+        self.header = True
+
+    def encode(self, table: pa.Table) -> bytes:
+        out = io.BytesIO()
+        pa_csv.write_csv(table, out, pa_csv.WriteOptions(include_header=self.header))
+        self.header = False
+        return out.getvalue()
+
+
+class _ParquetEncoder(_Encoder):
+    def __init__(self):
+        self.sink = _StreamSink()
+        self.writer = pq.ParquetWriter(self.sink, EXPORT_SCHEMA, compression="zstd")
+
+    def encode(self, table: pa.Table) -> bytes:
+        # Every chunk becomes one row group, sent as soon as it is written
+        self.writer.write_table(table)
+        return self.sink.drain()
+
+    def finish(self) -> bytes:
+        self.writer.close()
+        return self.sink.drain()
+
+
+EXPORT_FORMATS: Dict[str, Dict] = {
+    "ndjson": {"media_type": "application/x-ndjson", "extension": "ndjson", "encoder": _NdjsonEncoder},
+    "csv": {"media_type": "text/csv", "extension": "csv", "encoder": _CsvEncoder},
+    "parquet": {"media_type": "application/vnd.apache.parquet", "extension": "parquet", "encoder": _ParquetEncoder},
+}
+
+
+async def _chunks(session_id: str, chunk_rows: int, archived: bool) -> AsyncIterator[pa.Table]:
+    if archived:
+        async for table in session_archiver.iter_archive(session_id, chunk_rows):
+            yield table
+        return
+    # Its own connection: the request's session is closed before the body is sent
+    async with engine.connect() as conn:
+        async for table in stream_classifications(conn, session_id, chunk_rows):
+            yield table
+
+
+async def export_session(session_id: str, format: str, chunk_rows: int, archived: bool) -> AsyncIterator[bytes]:
+    """Stream a session's classifications in an EXPORT_FORMATS format, one chunk of rows at a time.
+
+    Rows come from the session's Parquet archive or a server-side cursor,
+    and chunks are encoded off the event loop, so memory stays bounded by
+    one chunk whatever the size of the lot.
+    """
+    encoder: _Encoder = EXPORT_FORMATS[format]["encoder"]()
+    async for table in _chunks(session_id, chunk_rows, archived):
+        data = await asyncio.to_thread(encoder.encode, table.rename_columns(EXPORT_NAMES))
+        if data:
+            yield data
+    tail = await asyncio.to_thread(encoder.finish)
+    if tail:
+        yield tail
@@ -1,19 +1,40 @@
-from sqlalchemy import func, select
+import math
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+from config import settings
 from models.classification import Classification
+from models.rollup import ClassificationRollup
+from models.session import Session
+from utils.time_buckets import bucket_start, naive_local
+from sessions.archive import session_archiver
 from sessions.service import get_session
+from stats.counters import SessionCounters, session_counters
+
 
+async def is_archived(db, session_id: str) -> bool:
+    """Whether the session's classifications were moved to its Parquet archive"""
+    archived_at = (await db.execute(select(Session.archived_at).filter(Session.id == session_id))).scalar_one_or_none()
+    return archived_at is not None
 
-async def get_sampled_images_by_sessionid(db, session_id: str, limit: int = 10):
+async def get_sampled_images_by_sessionid(db, session_id: str, limit: int = 10, cursor: int = None):
+    """Get one page of a session's sampled seeds, ordered by id, after the given cursor"""
     try:
         if not session_id:
             raise ValueError("session_id cannot be None or empty")
-            
+
+        if await is_archived(db, session_id):
+            return await session_archiver.read_sampled(session_id, limit, cursor)
+
+        query = select(Classification).filter(
+            Classification.session_id == session_id,
+            Classification.is_sampled == True
+        )
+        if cursor is not None:
+            query = query.filter(Classification.id > cursor)
         result = await db.execute(
-            select(Classification)
-            .filter(
-                Classification.session_id == session_id,
-                Classification.is_sampled == True
-            )
+            query
+            .order_by(Classification.id)
             .limit(limit)
         )
         
@@ -24,55 +45,123 @@ async def get_sampled_images_by_sessionid(db, session_id: str, limit: int = 10):
     except Exception as e:
         raise Exception(f"Error in get_sampled_images_by_sessionid: {str(e)}")
 
+async def get_sampled_image(db, session_id: str, image_id: int):
+    """Get a single sampled seed of a session by classification id"""
+    if await is_archived(db, session_id):
+        return await session_archiver.read_sampled_image(session_id, image_id)
+    result = await db.execute(
+        select(Classification).filter(
+            Classification.session_id == session_id,
+            Classification.is_sampled == True,
+            Classification.id == image_id
+        )
+    )
+    return result.scalar_one_or_none()
+
+def sampled_page(sampled, limit: int):
+    """Serialize a page of sampled seeds with the cursor of the next page"""
+    return {
+        "items": [{"id": s.id, "seed_id": str(s.seed_id), "path": s.image_path} for s in sampled],
+        "next_cursor": sampled[-1].id if len(sampled) == limit else None,
+    }
+
 async def get_stats_by_sessionid(db, session_id: str):
-    # try:
     if not session_id:
         raise ValueError("session_id cannot be None or empty")
-        
-    # Get counts
-    total = (await db.execute(
-        select(func.count(Classification.id))
-        .filter(Classification.session_id == session_id)
-    )).scalars().all()
-    if total is None:
-        raise ValueError("Total count query result is None")
-        
-    accepted = (await db.execute(
-        select(func.count(Classification.id))
-        .filter(
-            Classification.session_id == session_id,
-            Classification.classify == "accept"
-        )
-    )).scalars().all()
-    if accepted is None:
-        raise ValueError("Accepted count query result is None")
-        
-    sampled = (await db.execute(
-        select(func.count(Classification.id))
-        .filter(
-            Classification.session_id == session_id,
-            Classification.is_sampled == True
-        )
-    )).scalars().all()
-    if sampled is None:
-        raise ValueError("Sampled count query result is None")
-    
+
     # Get session details
     session = await get_session(db, session_id)
+    if session is None:
+        raise ValueError("Session not found")
+
     def to_dict(obj):
         return {column.name: getattr(obj, column.name) for column in obj.__table__.columns}
 
     session_dict = to_dict(session)
 
-    if session is None:
-        raise ValueError("Session not found")
-    
+    # Finished sessions are answered from their summary row, live ones from the
+    # in-memory counters; neither touches the classification table
+    if session.total_count is not None:
+        counters = SessionCounters.from_session(session)
+    else:
+        # Rebuilt once from the table if they were lost (e.g. restart)
+        counters = await session_counters.restore(db, session_id)
+
     return {
-        "total": sum(total),
-        "accepted": sum(accepted),
-        "rejected": sum(total) - sum(accepted),
-        "sampled": sum(sampled),
+        **counters.to_dict(),
         "session": session_dict
     }
-    # except Exception as e:
-    #     raise Exception(f"Error in get_stats_by_sessionid: {str(e)}")
\ No newline at end of file
+
+
+def choose_series_step(span_seconds: float, points: int, resolution: int = None):
+    """Pick the rollup resolution to read and the step of the downsampled series"""
+    resolutions = sorted(settings.ROLLUP_RESOLUTIONS)
+    step = max(span_seconds / max(points, 1), resolutions[0])
+    if resolution is None:
+        # Coarsest rollup that still fits the requested step
+        resolution = max(r for r in resolutions if r <= step)
+    elif resolution not in resolutions:
+        raise ValueError(f"resolution must be one of {resolutions}")
+    step = math.ceil(step / resolution) * resolution
+    return resolution, step
+
+
+async def get_series_by_sessionid(
+    db,
+    session_id: str,
+    start: datetime = None,
+    end: datetime = None,
+    resolution: int = None,
+    points: int = None,
+):
+    """Downsampled throughput and yield series, read from the rollup buckets"""
+    if not session_id:
+        raise ValueError("session_id cannot be None or empty")
+
+    session = await get_session(db, session_id)
+    # Stored timestamps are naive local time; an aware bound (e.g. "...Z") is converted to it
+    start = naive_local(start) if start else session.start_time
+    end = naive_local(end) if end else session.end_time or datetime.now()
+    if end <= start:
+        raise ValueError("end must be after start")
+
+    resolution, step = choose_series_step(
+        (end - start).total_seconds(), points or settings.SERIES_MAX_POINTS, resolution
+    )
+    start = bucket_start(start, resolution)
+    buckets = (await db.execute(
+        select(ClassificationRollup)
+        .filter(
+            ClassificationRollup.session_id == session_id,
+            ClassificationRollup.resolution == resolution,
+            ClassificationRollup.bucket_start >= start,
+            ClassificationRollup.bucket_start < end,
+        )
+        .order_by(ClassificationRollup.bucket_start)
+    )).scalars().all()
+
+    series = {}
+    for bucket in buckets:
+        index = int((bucket.bucket_start - start).total_seconds() // step)
+        point = series.setdefault(index, {"total": 0, "accepted": 0, "rejected": 0, "sampled": 0})
+        point["total"] += bucket.total
+        point["accepted"] += bucket.accepted
+        point["rejected"] += bucket.rejected
+        point["sampled"] += bucket.sampled
+
+    return {
+        "session_id": str(session.id),
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "resolution_seconds": resolution,
+        "step_seconds": step,
+        "points": [
+            {
+                "start": (start + timedelta(seconds=index * step)).isoformat(),
+                **point,
+                "accept_rate": round(point["accepted"] / point["total"], 4) if point["total"] else None,
+                "seeds_per_second": round(point["total"] / step, 3),
+            }
+            for index, point in sorted(series.items())
+        ],
+    }
@@ -0,0 +1,147 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from classification.services.sample_store import SegmentStore, segment_store
+from config import settings
+from utils.lazy_import import lazy_import
+
+cv2 = lazy_import("cv2")
+
+
+class ThumbnailCache:
+    """Downscaled JPEG thumbnails of sampled images behind a two-level LRU cache.
+
+    Thumbnails are looked up in a byte-bounded in-memory LRU, then in a
+    byte-bounded on-disk LRU, and only rendered from the segment store on a
+    miss, so the full frame is decoded at most once per size.
+    """
+
+    def __init__(
+        self,
+        store: SegmentStore = None,
+        directory: Path = None,
+        memory_bytes: int = None,
+        disk_bytes: int = None,
+    ):
+        self.store = store or segment_store
+        self.directory = Path(directory or settings.THUMBNAIL_DIR)
+        self.memory_bytes = memory_bytes or settings.THUMBNAIL_MEMORY_CACHE_BYTES
+        self.disk_bytes = disk_bytes or settings.THUMBNAIL_DISK_CACHE_BYTES
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._memory_size = 0
+        self._disk: Optional["OrderedDict[str, int]"] = None
+        self._disk_size = 0
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(image_ref: str, size: int) -> str:
+        return hashlib.sha1(f"{image_ref}@{size}".encode()).hexdigest()
+
+    def _load_disk_index(self):
+        """Index the disk cache, oldest first, the first time it is used"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        entries = sorted(self.directory.glob("*.jpg"), key=lambda path: path.stat().st_mtime)
+        self._disk = OrderedDict((path.stem, path.stat().st_size) for path in entries)
+        self._disk_size = sum(self._disk.values())
+
+    def _remember(self, key: str, data: bytes):
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            return
+        self._memory[key] = data
+        self._memory_size += len(data)
+        while self._memory_size > self.memory_bytes and self._memory:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_size -= len(evicted)
+
+    def _store_on_disk(self, key: str, data: bytes):
+        path = self.directory / f"{key}.jpg"
+        tmp = path.with_suffix(".tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+        self._disk[key] = len(data)
+        self._disk_size += len(data)
+        while self._disk_size > self.disk_bytes and self._disk:
+            evicted, evicted_size = self._disk.popitem(last=False)
+            self._disk_size -= evicted_size
+            (self.directory / f"{evicted}.jpg").unlink(missing_ok=True)
+
+    def render(self, image_ref: str, size: int) -> bytes:
+        """Decode a sampled image at reduced resolution and encode its thumbnail"""
+        data = np.frombuffer(self.store.read(image_ref), np.uint8)
+        # Let the JPEG decoder downscale by the largest factor that keeps enough pixels
+        frame_size = max(settings.CAMERA_WIDTH, settings.CAMERA_HEIGHT)
+        flag = cv2.IMREAD_COLOR
+        reductions = (
+            (8, cv2.IMREAD_REDUCED_COLOR_8),
+            (4, cv2.IMREAD_REDUCED_COLOR_4),
+            (2, cv2.IMREAD_REDUCED_COLOR_2),
+        )
+        for factor, reduced in reductions:
+            if frame_size // factor >= size:
+                flag = reduced
+                break
+        image = cv2.imdecode(data, flag)
+        if image is None:
+            raise ValueError(f"Unreadable image {image_ref}")
+        height, width = image.shape[:2]
+        scale = size / max(height, width)
+        if scale < 1:
+            image = cv2.resize(image, (max(1, int(width * scale)), max(1, int(height * scale))),
+                               interpolation=cv2.INTER_AREA)
+        _, buffer = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, settings.THUMBNAIL_QUALITY])
+        return buffer.tobytes()
+
+    def get(self, image_ref: str, size: int = None) -> bytes:
+        """Get a thumbnail, rendering and caching it on a miss (blocking; run it in a thread)"""
+        size = size or settings.THUMBNAIL_SIZE
+        key = self._key(image_ref, size)
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return data
+            if self._disk is None:
+                self._load_disk_index()
+            if key in self._disk:
+                try:
+                    data = (self.directory / f"{key}.jpg").read_bytes()
+                    self._disk.move_to_end(key)
+                    self.disk_hits += 1
+                    self._remember(key, data)
+                    return data
+                except FileNotFoundError:
+                    self._disk_size -= self._disk.pop(key)
+
+        data = self.render(image_ref, size)
+        with self._lock:
+            self.misses += 1
+            self._remember(key, data)
+            if key not in self._disk:
+                self._store_on_disk(key, data)
+        return data
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_size,
+                "disk_entries": len(self._disk) if self._disk is not None else None,
+                "disk_bytes": self._disk_size,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+            }
+
+
+thumbnail_cache = ThumbnailCache()
@@ -0,0 +1,38 @@
+import asyncio
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+# Modules import each other from the app directory, as in the container
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# Settings are read at import time: point the app at a throwaway SQLite
+# database and data directory before any test imports it
+DATA_DIR = tempfile.mkdtemp(prefix="seedx-tests-")
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{DATA_DIR}/seedx.db"
+os.environ["DATABASE_ECHO"] = "false"
+os.environ["DATA_DIR"] = DATA_DIR
+os.environ["USE_MOCK_CAMERA"] = "true"
+
+
+@pytest.fixture
+def run_db():
+    """Runs `scenario(db)` on its own event loop, against a schema brought up to date"""
+    from db.database import AsyncSessionLocal, engine, init_db
+
+    def run(scenario):
+        async def main():
+            try:
+                await init_db()
+                async with AsyncSessionLocal() as db:
+                    return await scenario(db)
+            finally:
+                # Pooled connections belong to this loop
+                await engine.dispose()
+
+        return asyncio.run(main())
+
+    return run
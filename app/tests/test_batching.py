@@ -0,0 +1,123 @@
+import asyncio
+import time
+
+import numpy as np
+
+from classification.services.batching import BatchingEngine
+from classification.services.result_batch import ResultBatch
+
+
+class RecordingClassifier:
+    """Stands in for the model: remembers the images of every batch"""
+
+    def __init__(self):
+        self.batches = []
+
+    def classify_batch(self, images):
+        self.batches.append(list(images))
+        return ResultBatch(np.ones(len(images), dtype=np.uint8))
+
+
+class GatedWorker:
+    """Runs batches on the loop, each once the gate opens"""
+
+    def __init__(self, opened: bool = True):
+        self.gate = asyncio.Event()
+        if opened:
+            self.gate.set()
+
+    async def submit(self, fn, *args):
+        await self.gate.wait()
+        return fn(*args)
+
+
+def make_engine(max_batch_size=8, max_latency_ms=20, max_in_flight=2, worker=None):
+    classifier = RecordingClassifier()
+    engine = BatchingEngine(
+        classifier=classifier,
+        worker=worker or GatedWorker(),
+        max_batch_size=max_batch_size,
+        max_latency_ms=max_latency_ms,
+        max_in_flight=max_in_flight,
+    )
+    return engine, classifier
+
+
+def test_partial_batch_flushes_on_deadline():
+    async def scenario():
+        engine, classifier = make_engine(max_batch_size=8, max_latency_ms=20)
+        started = time.perf_counter()
+        results = await asyncio.gather(*(engine.classify(i) for i in range(3)))
+        return engine, classifier, results, time.perf_counter() - started
+
+    engine, classifier, results, elapsed = asyncio.run(scenario())
+    assert classifier.batches == [[0, 1, 2]]
+    assert [row for _, row in results] == [0, 1, 2]
+    assert engine.deadline_flushes == 1
+    assert engine.size_flushes == 0
+    assert elapsed >= 0.02
+
+
+def test_full_batch_flushes_without_waiting_for_the_deadline():
+    async def scenario():
+        engine, classifier = make_engine(max_batch_size=4, max_latency_ms=10_000)
+        results = await asyncio.wait_for(asyncio.gather(*(engine.classify(i) for i in range(4))), 1.0)
+        return engine, classifier, results
+
+    engine, classifier, results = asyncio.run(scenario())
+    assert classifier.batches == [[0, 1, 2, 3]]
+    assert all(batch is results[0][0] for batch, _ in results)
+    assert engine.size_flushes == 1
+    assert engine.deadline_flushes == 0
+
+
+def test_deadline_is_kept_by_leftovers_of_a_full_batch():
+    async def scenario():
+        engine, classifier = make_engine(max_batch_size=4, max_latency_ms=20)
+        await asyncio.gather(*(engine.classify(i) for i in range(6)))
+        return engine, classifier
+
+    engine, classifier = asyncio.run(scenario())
+    assert classifier.batches == [[0, 1, 2, 3], [4, 5]]
+    assert engine.size_flushes == 1
+    assert engine.deadline_flushes == 1
+
+
+def test_saturated_batches_are_shared_by_lane_weight():
+    async def scenario():
+        worker = GatedWorker(opened=False)
+        engine, classifier = make_engine(max_batch_size=4, max_latency_ms=5, max_in_flight=1, worker=worker)
+        engine.set_lane_weight("fast", 3.0)
+        engine.set_lane_weight("slow", 1.0)
+        # Occupies the only batch slot while both lanes queue up
+        blocker = asyncio.ensure_future(engine.classify(("blocker", 0), "fast"))
+        await asyncio.sleep(0.01)
+        pending = [asyncio.ensure_future(engine.classify(("fast", i), "fast")) for i in range(24)]
+        pending += [asyncio.ensure_future(engine.classify(("slow", i), "slow")) for i in range(24)]
+        await asyncio.sleep(0)
+        worker.gate.set()
+        await asyncio.gather(blocker, *pending)
+        return engine, classifier
+
+    engine, classifier = asyncio.run(scenario())
+    batches = classifier.batches[1:]
+    # Both lanes stay backlogged for the first 8 batches: 3 fast seeds to 1 slow one in each
+    for batch in batches[:8]:
+        lanes = [lane for lane, _ in batch]
+        assert sorted(lanes) == ["fast", "fast", "fast", "slow"]
+    # Every lane keeps its own order
+    for name in ("fast", "slow"):
+        order = [i for batch in batches for lane, i in batch if lane == name]
+        assert order == sorted(order) == list(range(24))
+    assert engine.saturated_flushes >= 8
+
+
+def test_idle_lane_banks_no_credit():
+    async def scenario():
+        engine, classifier = make_engine(max_batch_size=4, max_latency_ms=5)
+        engine.set_lane_weight("slow", 0.5)
+        await engine.classify(("slow", 0), "slow")
+        return engine
+
+    engine = asyncio.run(scenario())
+    assert all(lane.credit == 0.0 for lane in engine.lanes.values())
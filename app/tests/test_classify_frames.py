@@ -0,0 +1,47 @@
+import asyncio
+from types import SimpleNamespace
+
+import numpy as np
+
+from classification.services.result_batch import ResultBatch
+from classification.services.stream_sorter import classify_frames
+
+
+class FakeSubscription:
+    def __init__(self, frames):
+        self.frames = frames
+        self.closed = False
+
+    async def __aiter__(self):
+        for frame in self.frames:
+            await asyncio.sleep(0)
+            yield frame
+
+    def close(self):
+        self.closed = True
+
+
+class FailingEngine:
+    """Raises for the frames whose image is "bad", like a batch whose inference failed"""
+
+    max_batch_size = 2
+
+    async def classify(self, image, lane):
+        await asyncio.sleep(0)
+        if image == "bad":
+            raise RuntimeError("model exploded")
+        return ResultBatch(np.ones(1, dtype=np.uint8)), 0
+
+
+def test_failed_batch_skips_its_frames_and_keeps_streaming():
+    frames = [SimpleNamespace(index=i, image=image) for i, image in enumerate(["ok", "bad", "bad", "ok", "ok"])]
+    subscription = FakeSubscription(frames)
+    lane = SimpleNamespace(name="test", producer=SimpleNamespace(subscribe=lambda preview: subscription))
+
+    async def scenario():
+        return [group async for groups in classify_frames(FailingEngine(), lane) for group in groups]
+
+    groups = asyncio.run(scenario())
+    assert [frame.index for frame, _ in groups] == [0, 1, 2, 3, 4]
+    assert [row is None for _, row in groups] == [False, True, True, False, False]
+    assert subscription.closed
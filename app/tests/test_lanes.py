@@ -0,0 +1,90 @@
+import pytest
+
+from classification.services import lanes as lanes_module
+from classification.services.lanes import CameraLane, LaneBusyError, LaneRegistry, parse_lanes
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(lanes_module.time, "monotonic", lambda: now[0])
+    return now
+
+
+def registry(idle_release_seconds=60.0, count=1):
+    return LaneRegistry(
+        [CameraLane(f"lane{i}", str(i), index=i) for i in range(count)], idle_release_seconds=idle_release_seconds
+    )
+
+
+def test_bound_lane_is_refused_to_another_session(clock):
+    lanes = registry()
+    lanes.bind("a")
+    with pytest.raises(LaneBusyError):
+        lanes.bind("b")
+    with pytest.raises(LaneBusyError):
+        lanes.bind("b", "lane0")
+    assert lanes.bind("a", "lane0").session_id == "a"
+
+
+def test_lane_without_clients_is_taken_over_once_idle(clock):
+    lanes = registry(idle_release_seconds=60)
+    lanes.bind("a")
+    clock[0] += 59
+    with pytest.raises(LaneBusyError):
+        lanes.bind("b")
+    clock[0] += 1
+    assert lanes.bind("b").session_id == "b"
+    # The old session's late clients can't get it back
+    with pytest.raises(LaneBusyError):
+        lanes.bind("a", "lane0")
+
+
+def test_lane_with_a_client_is_never_idle(clock):
+    lanes = registry(idle_release_seconds=60)
+    lane = lanes.bind("a")
+    lanes.attach(lane, "a")
+    clock[0] += 3600
+    with pytest.raises(LaneBusyError):
+        lanes.bind("b")
+    lanes.detach(lane, "a")
+    clock[0] += 60
+    assert lanes.bind("b").session_id == "b"
+
+
+def test_free_lane_is_preferred_to_an_idle_one(clock):
+    lanes = registry(count=2)
+    lanes.bind("a", "lane0")
+    clock[0] += 3600
+    assert lanes.bind("b").name == "lane1"
+
+
+def test_idle_release_can_be_disabled(clock):
+    lanes = registry(idle_release_seconds=0)
+    lanes.bind("a")
+    clock[0] += 10 ** 6
+    with pytest.raises(LaneBusyError):
+        lanes.bind("b")
+
+
+def test_clients_of_a_released_session_leave_the_new_binding_alone(clock):
+    lanes = registry()
+    lane = lanes.bind("a")
+    lanes.attach(lane, "a")
+    assert lanes.release_lane("lane0") == "a"
+    lanes.bind("b")
+    lanes.attach(lane, "b")
+    lanes.detach(lane, "a")
+    assert lane.clients == 1
+
+
+@pytest.mark.parametrize("spec", ["left@2", "left=", "le ft=0", "left@x=0", "left@0=0", "a=0,a=1"])
+def test_malformed_lane_specs_are_refused(spec):
+    with pytest.raises(ValueError):
+        parse_lanes(spec)
+
+
+def test_lane_spec_keeps_the_device_verbatim():
+    left, right = parse_lanes("left@2.5=0, right=rtsp://user:pw@cam:554/stream")
+    assert (left.name, left.weight, left.device) == ("left", 2.5, "0")
+    assert (right.name, right.weight, right.device) == ("right", 1.0, "rtsp://user:pw@cam:554/stream")
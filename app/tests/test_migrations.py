@@ -0,0 +1,158 @@
+import asyncio
+import uuid
+
+import pytest
+from sqlalchemy import insert, inspect, select, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from config import settings
+
+from db import database
+from db.database import init_db
+from models.base import Base
+from models.rollup import ClassificationRollup
+from models.schema_version import SchemaVersion
+from models.session import Session
+
+
+async def add_session(db) -> uuid.UUID:
+    session_id = uuid.uuid4()
+    await db.execute(insert(Session).values(id=session_id, seed_lot="lot", status="active"))
+    await db.commit()
+    return session_id
+
+
+async def applied_versions(db):
+    return (await db.execute(select(SchemaVersion.version).order_by(SchemaVersion.version))).scalars().all()
+
+
+async def has_session(db, session_id) -> bool:
+    return (await db.execute(select(Session.id).filter(Session.id == session_id))).scalar_one_or_none() is not None
+
+
+def test_version_bump_applies_only_the_new_migration_and_keeps_data(run_db, monkeypatch):
+    calls = []
+
+    async def add_lot_notes(conn):
+        calls.append(1)
+        await conn.execute(text("CREATE TABLE lot_notes (id INTEGER PRIMARY KEY, note VARCHAR)"))
+
+    shipped = sorted(database.MIGRATIONS)
+    version = database.SCHEMA_VERSION + 1
+    migrations = dict(database.MIGRATIONS)
+    migrations[version] = ("Lot notes", add_lot_notes)
+
+    async def scenario(db):
+        session_id = await add_session(db)
+        before = await applied_versions(db)
+        monkeypatch.setattr(database, "MIGRATIONS", migrations)
+        monkeypatch.setattr(database, "SCHEMA_VERSION", version)
+        await init_db()
+        await init_db()
+        await db.execute(text("INSERT INTO lot_notes (note) VALUES ('ok')"))
+        return before, await applied_versions(db), await has_session(db, session_id)
+
+    before, after, kept = run_db(scenario)
+    assert before == shipped
+    assert after == shipped + [version]
+    assert calls == [1]
+    assert kept
+
+
+def test_restart_without_new_versions_changes_nothing(run_db):
+    async def scenario(db):
+        session_id = await add_session(db)
+        before = await applied_versions(db)
+        await init_db()
+        return before, await applied_versions(db), await has_session(db, session_id)
+
+    before, after, kept = run_db(scenario)
+    assert after == before
+    assert kept
+
+
+@pytest.fixture
+def legacy_engine(tmp_path, monkeypatch):
+    """A fresh database of its own, for init_db to find as it was left by an older release"""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/legacy.db")
+    monkeypatch.setattr(database, "engine", engine)
+    return engine
+
+
+# The schema of releases before versioning, which recreated it on every start
+ORIGINAL_SCHEMA = (
+    "CREATE TABLE sessions (id CHAR(32) PRIMARY KEY, seed_lot VARCHAR, start_time DATETIME,"
+    " end_time DATETIME, status VARCHAR NOT NULL)",
+    "CREATE TABLE classifications (id INTEGER PRIMARY KEY, seed_id VARCHAR, classify VARCHAR,"
+    " is_sampled BOOLEAN, image_path VARCHAR, timestamp DATETIME, session_id CHAR(32) REFERENCES sessions (id))",
+    "INSERT INTO sessions (id, seed_lot, status) VALUES ('0123456789abcdef0123456789abcdef', 'old', 'active')",
+)
+
+
+def run_on(engine, scenario):
+    async def main():
+        try:
+            return await scenario()
+        finally:
+            await engine.dispose()
+
+    return asyncio.run(main())
+
+
+async def table_names(engine):
+    async with engine.connect() as conn:
+        return await conn.run_sync(lambda sync_conn: set(inspect(sync_conn).get_table_names()))
+
+
+def test_original_schema_is_refused_with_the_mismatches(legacy_engine):
+    async def scenario():
+        async with legacy_engine.begin() as conn:
+            for statement in ORIGINAL_SCHEMA:
+                await conn.execute(text(statement))
+        with pytest.raises(RuntimeError) as refused:
+            await init_db()
+        return str(refused.value), await table_names(legacy_engine)
+
+    message, tables = run_on(legacy_engine, scenario)
+    assert "classifications.seed_id is VARCHAR, not an integer" in message
+    assert "sessions.archived_at is missing" in message
+    assert "DB_RESET_ON_STARTUP" in message
+    assert SchemaVersion.__tablename__ not in tables
+
+
+def test_original_schema_is_recreated_on_reset(legacy_engine, monkeypatch):
+    monkeypatch.setattr(settings, "DB_RESET_ON_STARTUP", True)
+
+    async def scenario():
+        async with legacy_engine.begin() as conn:
+            for statement in ORIGINAL_SCHEMA:
+                await conn.execute(text(statement))
+        await init_db()
+        async with legacy_engine.connect() as conn:
+            versions = (await conn.execute(select(SchemaVersion.version))).scalars().all()
+            sessions = (await conn.execute(select(Session.id))).scalars().all()
+        return versions, sessions, await table_names(legacy_engine)
+
+    versions, sessions, tables = run_on(legacy_engine, scenario)
+    assert versions == sorted(database.MIGRATIONS)
+    assert sessions == []
+    assert ClassificationRollup.__tablename__ in tables
+
+
+def test_unversioned_database_matching_the_baseline_is_adopted(legacy_engine):
+    session_id = uuid.uuid4()
+
+    async def scenario():
+        async with legacy_engine.begin() as conn:
+            tables = [table for table in Base.metadata.sorted_tables if table.name != SchemaVersion.__tablename__]
+            await conn.run_sync(Base.metadata.create_all, tables=tables)
+            await conn.execute(insert(Session).values(id=session_id, seed_lot="lot", status="active"))
+        await init_db()
+        async with legacy_engine.connect() as conn:
+            versions = (await conn.execute(select(SchemaVersion.version))).scalars().all()
+            sessions = (await conn.execute(select(Session.id))).scalars().all()
+        return versions, sessions
+
+    versions, sessions = run_on(legacy_engine, scenario)
+    assert versions == sorted(database.MIGRATIONS)
+    assert sessions == [session_id]
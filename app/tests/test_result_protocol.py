@@ -0,0 +1,63 @@
+import json
+import zlib
+
+import numpy as np
+import pytest
+
+from classification.services.result_batch import CLASS_CODES, ResultBatch
+from classification.services.result_protocol import (
+    COMPRESSED_MAGIC,
+    FLAG_SAMPLED,
+    HEADER,
+    PROTOCOL_VERSION,
+    RECORD,
+    RESULT_MAGIC,
+    ResultEncoder,
+    encode_binary,
+)
+
+
+def make_batch():
+    batch = ResultBatch(
+        np.array([CLASS_CODES["accept"], CLASS_CODES["reject"], CLASS_CODES["accept"]], dtype=np.uint8)
+    )
+    batch.tie_to_frames([7, 7, 2**32 + 5], [1.0, 1.0, 2.0], np.array([101, 102, 2**62 + 3], dtype=np.int64))
+    batch.sampled = np.array([False, True, False])
+    return batch
+
+
+def test_binary_message_layout():
+    message = encode_binary(make_batch())
+    magic, version, count, record_size = HEADER.unpack_from(message)
+    assert (magic, version, count, record_size) == (RESULT_MAGIC, PROTOCOL_VERSION, 3, RECORD.size)
+    assert len(message) == HEADER.size + count * RECORD.size
+    records = [RECORD.unpack_from(message, HEADER.size + i * RECORD.size) for i in range(count)]
+    assert records == [
+        (7, 101, CLASS_CODES["accept"], 0),
+        (7, 102, CLASS_CODES["reject"], FLAG_SAMPLED),
+        # Frame indexes wrap at 32 bits
+        (5, 2**62 + 3, CLASS_CODES["accept"], 0),
+    ]
+
+
+def test_binary_message_of_an_empty_batch_is_a_bare_header():
+    message = encode_binary(ResultBatch(np.zeros(0, dtype=np.uint8)))
+    assert message == HEADER.pack(RESULT_MAGIC, PROTOCOL_VERSION, 0, RECORD.size)
+
+
+def test_compressed_json_batch_round_trips():
+    batch = make_batch()
+    message = ResultEncoder("json-batch", "zlib").encode(batch)
+    assert message[:3] == COMPRESSED_MAGIC and message[3] == PROTOCOL_VERSION
+    assert json.loads(zlib.decompress(message[4:])) == json.loads(ResultEncoder("json-batch").encode(batch))
+
+
+def test_clients_with_the_same_protocol_share_messages():
+    assert ResultEncoder("binary").key == ResultEncoder("binary").key
+    assert ResultEncoder("json-batch").key != ResultEncoder("json-batch", "zlib").key
+
+
+@pytest.mark.parametrize("protocol, compress", [("xml", None), ("binary", "gzip")])
+def test_unknown_protocols_are_refused(protocol, compress):
+    with pytest.raises(ValueError):
+        ResultEncoder(protocol, compress)
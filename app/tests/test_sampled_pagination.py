@@ -0,0 +1,95 @@
+import uuid
+from datetime import datetime
+
+from sqlalchemy import insert
+
+from models.classification import Classification
+from models.session import Session
+from sessions.archive import session_archiver
+from stats.service import get_sampled_images_by_sessionid, sampled_page
+
+
+async def add_session(db, status="active", end_time=None) -> uuid.UUID:
+    session_id = uuid.uuid4()
+    await db.execute(insert(Session).values(id=session_id, seed_lot="lot", status=status, end_time=end_time))
+    await db.commit()
+    return session_id
+
+
+async def add_rows(db, session_id, count: int, sampled_every: int = 3):
+    await db.execute(insert(Classification), [
+        {
+            "session_id": session_id,
+            "seed_id": i,
+            "classify": "accept",
+            "is_sampled": i % sampled_every == 0,
+            "image_path": f"segment:{i}:1" if i % sampled_every == 0 else None,
+        }
+        for i in range(count)
+    ])
+    await db.commit()
+
+
+async def sampled_ids(db, session_id):
+    rows = await get_sampled_images_by_sessionid(db, session_id, limit=1000)
+    return [row.id for row in rows]
+
+
+async def read_pages(db, session_id, limit: int, cursor: int = None):
+    """Follow next_cursor from the given page to the last"""
+    pages = []
+    while True:
+        page = sampled_page(await get_sampled_images_by_sessionid(db, session_id, limit=limit, cursor=cursor), limit)
+        pages.append([item["id"] for item in page["items"]])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return pages
+
+
+def test_pages_cover_every_sampled_seed_once_in_id_order(run_db):
+    async def scenario(db):
+        session_id = await add_session(db)
+        other = await add_session(db)
+        await add_rows(db, session_id, 25)
+        await add_rows(db, other, 25)
+        return await sampled_ids(db, session_id), await read_pages(db, session_id, limit=4)
+
+    expected, pages = run_db(scenario)
+    assert len(expected) == 9
+    assert [len(page) for page in pages] == [4, 4, 1]
+    assert [seed for page in pages for seed in page] == expected == sorted(expected)
+
+
+def test_full_last_page_is_followed_by_an_empty_one(run_db):
+    async def scenario(db):
+        session_id = await add_session(db)
+        await add_rows(db, session_id, 24)  # 8 sampled
+        return await read_pages(db, session_id, limit=4)
+
+    assert [len(page) for page in run_db(scenario)] == [4, 4, 0]
+
+
+def test_rows_added_while_paging_are_neither_skipped_nor_repeated(run_db):
+    async def scenario(db):
+        session_id = await add_session(db)
+        await add_rows(db, session_id, 12)
+        first = sampled_page(await get_sampled_images_by_sessionid(db, session_id, limit=3), 3)
+        await add_rows(db, session_id, 12)
+        rest = await read_pages(db, session_id, limit=3, cursor=first["next_cursor"])
+        return first, rest, await sampled_ids(db, session_id)
+
+    first, rest, expected = run_db(scenario)
+    seen = [item["id"] for item in first["items"]] + [seed for page in rest for seed in page]
+    assert seen == expected
+
+
+def test_archived_session_pages_like_a_live_one(run_db):
+    async def scenario(db):
+        session_id = await add_session(db, status="completed", end_time=datetime.now())
+        await add_rows(db, session_id, 25)
+        live = await read_pages(db, session_id, limit=4)
+        await session_archiver.archive_session(session_id)
+        return live, await read_pages(db, session_id, limit=4)
+
+    live, archived = run_db(scenario)
+    assert archived == live
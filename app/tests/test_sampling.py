@@ -0,0 +1,111 @@
+import uuid
+
+import numpy as np
+import pytest
+
+from classification.services import sampling
+from classification.services.result_batch import ResultBatch
+from classification.services.sampling import Reservoir, TokenBucket
+from stats.counters import SessionCounters, session_counters
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def frames(count, shape=(2, 2, 3)):
+    return [np.full(shape, i, dtype=np.uint8) for i in range(count)]
+
+
+def test_reservoir_fills_before_replacing():
+    reservoir = Reservoir(4, np.random.default_rng(0))
+    batch = ResultBatch(np.ones(3, dtype=np.uint8))
+    assert reservoir.offer(batch, np.arange(3), frames(3)) == []
+    assert [row for _, row, _ in reservoir.items] == [0, 1, 2]
+    assert reservoir.seen == 3
+
+
+def test_reservoir_sample_is_uniform():
+    size, stream, trials = 4, 20, 4000
+    rng = np.random.default_rng(1)
+    kept = np.zeros(stream)
+    for _ in range(trials):
+        reservoir = Reservoir(size, rng)
+        # Fed in uneven batches, like frames with varying seed counts
+        for start, stop in ((0, 3), (3, 11), (11, 12), (12, 20)):
+            batch = ResultBatch(np.ones(stop - start, dtype=np.uint8), seed_ids=np.arange(start, stop))
+            reservoir.offer(batch, np.arange(stop - start), frames(stop - start))
+        for batch, row, _ in reservoir.items:
+            kept[batch.seed_ids[row]] += 1
+        assert len(reservoir.items) == size
+    # Every seed is kept with probability size / stream
+    np.testing.assert_allclose(kept / trials, size / stream, atol=0.03)
+
+
+def test_reservoir_returns_evicted_candidates_of_earlier_batches():
+    reservoir = Reservoir(2, np.random.default_rng(2))
+    first = ResultBatch(np.ones(2, dtype=np.uint8))
+    reservoir.offer(first, np.arange(2), frames(2))
+    second = ResultBatch(np.ones(50, dtype=np.uint8))
+    evicted = reservoir.offer(second, np.arange(50), frames(50))
+    # Replaced within the same batch, a candidate is not reported
+    assert all(batch is first for batch, _, _ in evicted)
+    survivors = [row for batch, row, _ in reservoir.items if batch is first]
+    assert sorted(survivors + [row for _, row, _ in evicted]) == [0, 1]
+
+
+def test_reservoir_copies_admitted_frames():
+    reservoir = Reservoir(2, np.random.default_rng(3))
+    images = frames(2)
+    reservoir.offer(ResultBatch(np.ones(2, dtype=np.uint8)), np.arange(2), images)
+    images[0][:] = 255
+    _, _, kept = reservoir.items[0]
+    assert kept is not images[0]
+    assert (kept == 0).all()
+
+
+def test_token_bucket_bursts_up_to_capacity_then_refills_at_rate(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(sampling.time, "monotonic", clock)
+    bucket = TokenBucket(rate=2.0, capacity=5.0)
+    assert bucket.take(8) == 5
+    assert bucket.take(1) == 0
+    clock.now += 1.25
+    assert bucket.take(8) == 2
+    # Half a token is left over for later
+    clock.now += 0.25
+    assert bucket.take(1) == 1
+    clock.now += 100
+    assert bucket.take(100) == 5
+
+
+def test_token_bucket_refund_is_capped(monkeypatch):
+    monkeypatch.setattr(sampling.time, "monotonic", FakeClock())
+    bucket = TokenBucket(rate=1.0, capacity=3.0)
+    assert bucket.take(3) == 3
+    bucket.refund(2)
+    assert bucket.take(3) == 2
+    bucket.refund(10)
+    assert bucket.tokens == pytest.approx(3.0)
+
+
+def test_token_bucket_without_rate_grants_everything():
+    bucket = TokenBucket(rate=0, capacity=1.0)
+    assert bucket.take(1000) == 1000
+    bucket.refund(5)
+    assert bucket.take(1000) == 1000
+
+
+def test_sample_settling_after_its_session_ended_leaves_no_counters():
+    strategy = sampling.SamplingStrategy(reservoir_size=2, bucket_seconds=60, max_per_second=0)
+    live, ended = str(uuid.uuid4()), str(uuid.uuid4())
+    session_counters.seed(live, SessionCounters())
+    strategy._settled(live, True)
+    strategy._settled(ended, True)
+    assert session_counters.pop(live).sampled == 1
+    assert session_counters.get(ended) is None
+    assert strategy.kept == 2
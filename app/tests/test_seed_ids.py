@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from utils import seed_id_provider
+from utils.seed_id_provider import (
+    LANE_BITS,
+    SEED_ID_EPOCH_MS,
+    SEQUENCE_BITS,
+    SEQUENCE_SIZE,
+    SeedIdGenerator,
+    WORKER_BITS,
+    seed_id_time,
+)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Frozen wall clock, in seconds, the test moves by hand"""
+    now = [SEED_ID_EPOCH_MS / 1000 + 3600.0]
+    monkeypatch.setattr(seed_id_provider.time, "time", lambda: now[0])
+    return now
+
+
+def test_ids_strictly_increase_within_and_across_batches(clock):
+    generator = SeedIdGenerator(lane=3, worker=5)
+    ids = np.concatenate([generator.next_ids(count) for count in (1, 7, 300, 2)])
+    assert (np.diff(ids) > 0).all()
+    assert ids.dtype == np.int64 and (ids > 0).all()
+
+
+def test_exhausted_sequence_borrows_the_next_millisecond(clock):
+    generator = SeedIdGenerator()
+    ids = generator.next_ids(SEQUENCE_SIZE + 10)
+    assert (np.diff(ids) > 0).all()
+    millis = ids >> (SEQUENCE_BITS + LANE_BITS + WORKER_BITS)
+    assert millis[-1] - millis[0] == 1
+    # Still ahead of the clock, the next batch keeps counting from there
+    assert generator.next_id() > ids[-1]
+
+
+def test_clock_stepping_back_never_reissues_ids(clock):
+    generator = SeedIdGenerator()
+    before = generator.next_ids(5)
+    clock[0] -= 10
+    after = generator.next_ids(5)
+    assert after[0] > before[-1]
+
+
+def test_id_carries_time_worker_and_lane(clock):
+    seed_id = SeedIdGenerator(lane=9, worker=42).next_id()
+    assert seed_id_time(seed_id) == pytest.approx(clock[0])
+    node = seed_id >> SEQUENCE_BITS & ((1 << (LANE_BITS + WORKER_BITS)) - 1)
+    assert node == 42 << LANE_BITS | 9
+
+
+def test_generators_of_other_lanes_never_collide(clock):
+    ids = np.concatenate([SeedIdGenerator(lane=lane).next_ids(100) for lane in range(4)])
+    assert len(np.unique(ids)) == len(ids)
+
+
+@pytest.mark.parametrize("lane, worker", [(16, 0), (-1, 0), (0, 64)])
+def test_out_of_range_lane_or_worker_is_refused(lane, worker):
+    with pytest.raises(ValueError):
+        SeedIdGenerator(lane=lane, worker=worker)
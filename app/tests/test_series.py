@@ -0,0 +1,36 @@
+import time
+import uuid
+
+import numpy as np
+import pytest
+from sqlalchemy import insert
+
+from classification.services.result_batch import ResultBatch
+from classification.services.result_writer import upsert_rollups
+from models.session import Session
+from stats.service import get_series_by_sessionid
+
+
+@pytest.fixture
+def west_of_utc(monkeypatch):
+    """Run in a timezone with a negative UTC offset, where UTC and local wall-clock time differ"""
+    monkeypatch.setenv("TZ", "America/New_York")
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+def test_default_window_starts_with_the_session(run_db, west_of_utc):
+    async def scenario(db):
+        session_id = uuid.uuid4()
+        await db.execute(insert(Session).values(id=session_id, seed_lot="lot", status="active"))
+        await db.commit()
+        batch = ResultBatch(np.ones(3, dtype=np.uint8))
+        batch.captured_at = np.full(3, time.time())
+        await upsert_rollups(await db.connection(), [(session_id, batch)])
+        await db.commit()
+        return await get_series_by_sessionid(db, str(session_id))
+
+    series = run_db(scenario)
+    assert sum(point["total"] for point in series["points"]) == 3
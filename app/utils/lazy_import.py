@@ -0,0 +1,38 @@
+import importlib
+import sys
+import threading
+import types
+
+
+class LazyModule(types.ModuleType):
+    """Stand-in for a module that is only imported when one of its attributes is first used.
+
+    The first use, from whichever thread, imports the real module under a
+    lock and copies its namespace in, so later lookups cost what a normal
+    module attribute does.
+    """
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.__dict__["_lazy_lock"] = threading.Lock()
+        self.__dict__["_lazy_loaded"] = False
+
+    def __getattr__(self, attr: str):
+        with self.__dict__["_lazy_lock"]:
+            if not self.__dict__["_lazy_loaded"]:
+                self.__dict__.update(vars(importlib.import_module(self.__name__)))
+                self.__dict__["_lazy_loaded"] = True
+        try:
+            return self.__dict__[attr]
+        except KeyError:
+            raise AttributeError(f"module {self.__name__!r} has no attribute {attr!r}") from None
+
+
+def lazy_import(name: str) -> types.ModuleType:
+    """The named module, or a LazyModule standing in for it if it isn't imported yet.
+
+    Meant for heavy dependencies such as OpenCV that only some routes use,
+    so they stay out of the startup path.
+    """
+    return sys.modules.get(name) or LazyModule(name)
+
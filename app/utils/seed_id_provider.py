@@ -1,11 +1,64 @@
-import uuid
+import threading
+import time
 
+import numpy as np
 
-def generate_seed_id():
-    """
-    Generates a unique seed ID using UUID4.
+from config import settings
+
+# 63-bit seed ids, so they fit a signed BIGINT:
+#   41 bits  milliseconds since SEED_ID_EPOCH_MS (about 69 years)
+#    6 bits  worker: the app instance (SEED_ID_WORKER)
+#    4 bits  camera lane
+#   12 bits  sequence within the millisecond
+SEED_ID_EPOCH_MS = 1704067200000  # 2024-01-01T00:00:00Z
+WORKER_BITS = 6
+LANE_BITS = 4
+SEQUENCE_BITS = 12
+MAX_WORKERS = 1 << WORKER_BITS
+MAX_LANES = 1 << LANE_BITS
+SEQUENCE_SIZE = 1 << SEQUENCE_BITS
+
+
+class SeedIdGenerator:
+    """Time-ordered 64-bit seed ids (snowflake layout), generated a batch at a time.
 
-    Returns:
-        str: A unique seed ID as a string.
+    Ids of one generator strictly increase, so they are appended to the end
+    of the seed_id index. When a millisecond's sequence runs out the ids
+    borrow the next millisecond rather than waiting for it, and a clock that
+    steps back is ignored until it catches up.
     """
-    return str(uuid.uuid4())
\ No newline at end of file
+
+    def __init__(self, lane: int = 0, worker: int = None):
+        worker = settings.SEED_ID_WORKER if worker is None else worker
+        if not 0 <= worker < MAX_WORKERS:
+            raise ValueError(f"Seed id worker must be in [0, {MAX_WORKERS})")
+        if not 0 <= lane < MAX_LANES:
+            raise ValueError(f"Seed id lane must be in [0, {MAX_LANES})")
+        self.node = (worker << LANE_BITS | lane) << SEQUENCE_BITS
+        self._lock = threading.Lock()
+        self._last = -1  # Last id issued, as milliseconds * SEQUENCE_SIZE + sequence
+
+    def next_ids(self, count: int) -> np.ndarray:
+        """`count` consecutive ids as an int64 array"""
+        with self._lock:
+            now = (int(time.time() * 1000) - SEED_ID_EPOCH_MS) * SEQUENCE_SIZE
+            first = max(now, self._last + 1)
+            self._last = first + count - 1
+        ticks = np.arange(first, first + count, dtype=np.int64)
+        return (ticks >> SEQUENCE_BITS << (WORKER_BITS + LANE_BITS + SEQUENCE_BITS)) | self.node | (ticks & (SEQUENCE_SIZE - 1))
+
+    def next_id(self) -> int:
+        return int(self.next_ids(1)[0])
+
+
+def seed_id_time(seed_id: int) -> float:
+    """Unix time, in seconds, at which a seed id was generated"""
+    return ((seed_id >> (WORKER_BITS + LANE_BITS + SEQUENCE_BITS)) + SEED_ID_EPOCH_MS) / 1000
+
+
+_default_generator = SeedIdGenerator()
+
+
+def generate_seed_id() -> int:
+    """A single seed id from the default (lane 0) generator"""
+    return _default_generator.next_id()
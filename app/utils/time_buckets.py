@@ -0,0 +1,32 @@
+from datetime import datetime, timedelta
+
+
+def bucket_start(timestamp: datetime, resolution: int) -> datetime:
+    """
+    Aligns a timestamp to the start of its time bucket.
+
+    Args:
+        timestamp (datetime): The timestamp to align.
+        resolution (int): Bucket width in seconds; must divide a day.
+
+    Returns:
+        datetime: The start of the bucket containing the timestamp.
+    """
+    midnight = timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+    seconds = int((timestamp - midnight).total_seconds())
+    return midnight + timedelta(seconds=seconds - seconds % resolution)
+
+
+def naive_local(timestamp: datetime) -> datetime:
+    """
+    Converts a timezone-aware timestamp to the naive local time timestamps are stored in.
+
+    Args:
+        timestamp (datetime): The timestamp, naive (already local) or aware.
+
+    Returns:
+        datetime: The same instant as a naive local timestamp.
+    """
+    if timestamp.tzinfo is None:
+        return timestamp
+    return timestamp.astimezone().replace(tzinfo=None)
@@ -24,7 +24,8 @@ async def create_session(seed_lot):
         st.success(f"Session created: {session_id}")
         return session_id
     else:
-        st.error("Failed to create session")
+        # e.g. every camera lane is already sorting another lot
+        st.error(f"Failed to create session: {response.json().get('error', response.status_code)}")
         return None
 
 async def stop_session(session_id):